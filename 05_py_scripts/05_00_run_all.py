@@ -1,36 +1,65 @@
-import subprocess
-import time
+# ----------------------------------------------------------------------------------------
+# NOTE:
+# Runs the whole inventory pipeline (the steps of 05_01 to 05_05) in this one Python process
+# as a dependency graph: ocr -> organize -> publish / labels / counts, plus the reorder queue.
+# Organized entries are passed between stages in memory, SDKs are imported and Firebase is
+# initialized once, and a stage whose input files have not changed since its last
+# successful run is skipped. A table of per-stage timings is printed at the end.
+# Resetting the reorder queue is interactive and stays in 05_05.
+# Usage: python 05_00_run_all.py [--force] [--stages organize labels]
+# ----------------------------------------------------------------------------------------
+
+import argparse
+import logging
 import os
+import sys
+
+# Make the shared lab_inventory package (repository root) importable.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lab_inventory.local_storage import open_bucket  # noqa: E402
+from lab_inventory.pipeline.dag import FAILED, BLOCKED, INCOMPLETE, PipelineRunner, format_report  # noqa: E402
+from lab_inventory.pipeline.paths import PipelinePaths  # noqa: E402
+from lab_inventory.pipeline.stages import PipelineContext, build_stages  # noqa: E402
 
 # ANSI escape codes for green and reset (normal)
 GREEN = "\033[32m"
 RESET = "\033[0m"
+DIVIDER = "----------------------------------------------------------------------------------------"
+
+# Repository folder holding the numbered pipeline folders (01_..., 03_..., 04_...):
+ROOT_DIR = "/Users/abasaltbahrami/Desktop/lab-electronics-inventory"
+VISION_CREDENTIALS = "/Users/abasaltbahrami/Desktop/json/aharonilab-8a8c472b70e5.json"
+FIREBASE_CREDENTIALS = '/Users/abasaltbahrami/Desktop/json/aharonilabinventory-firebase-adminsdk-fu6uk-d6f7531b46.json'
+FIREBASE_BUCKET = 'aharonilabinventory.appspot.com'
+
 
-# Directory where all the scripts are located:
-SCRIPTS_DIR = "/Users/abasaltbahrami/Desktop/lab-electronics-inventory/05_py_scripts"
+def print_banner(stage):
+    print(f"{GREEN}{DIVIDER}")
+    print(f"Running stage: {stage.name}")
+    print(f"{DIVIDER}{RESET}")
 
-scripts = [
-    "05_01_ext_txt_from_photos.py",
-    "05_02_org_text_update_inv.py",
-    "05_03_label_print_storage_box.py",
-    "05_04_check_file_counts.py",
-    "05_05_firebase_order_check.py"
-]
 
-for script in scripts:
-    # Define divider line
-    divider = "----------------------------------------------------------------------------------------"
+def main():
+    parser = argparse.ArgumentParser(description="Run the inventory pipeline in one process")
+    parser.add_argument("--stages", nargs="+", help="run only these stages")
+    parser.add_argument("--force", action="store_true",
+                        help="run stages even if their inputs are unchanged")
+    args = parser.parse_args()
 
-    # Print divider and header in green
-    print(f"{GREEN}{divider}")
-    print(f"Running script: {script}")
-    print(f"{divider}{RESET}")
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    os.environ.setdefault("GOOGLE_APPLICATION_CREDENTIALS", VISION_CREDENTIALS)
+    paths = PipelinePaths.in_directory(ROOT_DIR)
+    context = PipelineContext(
+        paths, lambda: open_bucket(None, FIREBASE_CREDENTIALS, FIREBASE_BUCKET),
+        os.environ.get("INVENTORY_SERVICE_URL"))
+    runner = PipelineRunner(build_stages(context), paths.run_state_file)
 
-    # Build the full path to the script
-    full_path = os.path.join(SCRIPTS_DIR, script)
+    reports = runner.run(args.stages, args.force, on_start=print_banner)
+    print(f"{GREEN}{DIVIDER}{RESET}")
+    print(format_report(reports))
+    if any(report.status in (FAILED, BLOCKED, INCOMPLETE) for report in reports):
+        sys.exit(1)
 
-    # Run the script
-    subprocess.run(["python", full_path], check=True)
 
-    # Wait for 1 second before proceeding to the next script
-    time.sleep(1)
+if __name__ == "__main__":
+    main()
@@ -3,21 +3,23 @@
 # This script processes HEIC image files by converting them to JPEG and then extracting text from them
 # using the Google Cloud Vision API. It checks for previously processed files via an output log file,
 # converts any new HEIC files to JPEG, extracts text from the converted images, and appends the results
-# to the output file.
+# to the output file. The stage itself lives in lab_inventory.pipeline.ocr, which the ingest worker
+# (lab_inventory.pipeline.ingest) also runs on photos uploaded through the web app.
+# Each Vision result is staged in 04_extracted_info/checkpoints before it is appended, so a
+# rerun after a crash or an API error resumes without paying for a photo twice.
 # Author: Abasalt Bahrami
 # ----------------------------------------------------------------------------------------
 
 
+import logging
 import os
-import time
-from google.cloud import vision
-from google.api_core.exceptions import GoogleAPICallError
-from PIL import Image
-import pillow_heif
+import sys
 
-# =============== Register HEIC Support ============================================================
-# Register pillow-heif so that Pillow can handle HEIC files.
-pillow_heif.register_heif_opener()
+# Make the shared lab_inventory package (repository root) importable.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lab_inventory.pipeline.checkpoint import CheckpointStore  # noqa: E402
+from lab_inventory.pipeline.dag import IncompleteRun  # noqa: E402
+from lab_inventory.pipeline.ocr import ocr_images, vision_text_extractor  # noqa: E402
 
 # =============== Set Google Cloud Credentials =====================================================
 # Set the environment variable for your Google Cloud Vision API credentials.
@@ -29,106 +31,30 @@ os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = "/Users/abasaltbahrami/Desktop/js
 heic_source_directory = '/Users/abasaltbahrami/Desktop/lab-electronics-inventory/01_inventory_original_files'
 converted_image_directory = '/Users/abasaltbahrami/Desktop/lab-electronics-inventory/03_converted_to_jpeg'
 output_txt_file = '/Users/abasaltbahrami/Desktop/lab-electronics-inventory/04_extracted_info/extracted_texts.txt'
-
-# Ensure that the directory for JPEG files exists.
-os.makedirs(converted_image_directory, exist_ok=True)
-
-# =============== Load Processed Files Function ======================================================
-
-
-def load_processed_files(output_file):
-    """
-    Load the list of processed file names from the output file.
-    This function reads through the output file and collects names of images that have already been processed.
-    """
-    processed = set()
-    if os.path.exists(output_file):
-        with open(output_file, 'r') as f:
-            for line in f:
-                if line.startswith("Image: "):
-                    filename = line.strip().split("Image: ")[1]
-                    processed.add(filename)
-    return processed
-
-# =============== Convert HEIC to JPEG Function ========================================================
-
-
-def convert_heic_to_jpg(heic_path, jpg_path):
-    """
-    Convert a HEIC file to JPEG using Pillow (with pillow-heif support).
-    This function opens a HEIC file and saves it as a JPEG file.
-    """
-    image = Image.open(heic_path)
-    image.save(jpg_path, "JPEG")
-
-# =============== Extract Text from Image Function ===============
-
-
-def extract_text_from_image(image_path):
-    """
-    Extract text from the given image using the Google Cloud Vision API.
-    This function reads the image, sends it to the Vision API, and returns any detected text.
-    """
-    client = vision.ImageAnnotatorClient()
-    with open(image_path, 'rb') as image_file:
-        content = image_file.read()
-    image = vision.Image(content=content)
-    retries = 3
-    for i in range(retries):
-        try:
-            response = client.text_detection(image=image)
-            if response.full_text_annotation:
-                return response.full_text_annotation.text
-            return None
-        except GoogleAPICallError as e:
-            print(f"Error: {e}. Retrying {i+1}/{retries}...")
-            time.sleep(2 ** i)
-        except Exception as e:
-            print(f"Unexpected error: {e}")
-            break
-    return None
+# Paid results staged until they are committed to the output file (shared with 05_02).
+checkpoint_directory = '/Users/abasaltbahrami/Desktop/lab-electronics-inventory/04_extracted_info/checkpoints'
 
 # =============== Process HEIC Images Function =========================================================
 
 
 def process_heic_images():
     """
-    Process all HEIC files in the source directory:
-    - Load the list of already processed files.
-    - For each HEIC file that hasn't been processed:
-      - Convert it to JPEG.
-      - Extract text using the Vision API.
-      - Append the results to the output file.
+    Process all HEIC files in the source directory: each file that hasn't been processed is
+    converted to JPEG, its text is extracted with the Vision API and appended to the output file.
     """
-    processed_files = load_processed_files(output_txt_file)
-
-    with open(output_txt_file, 'a') as f_output:
-        for filename in os.listdir(heic_source_directory):
-            if filename.lower().endswith('.heic'):
-                # Skip file if it has already been processed
-                if filename in processed_files:
-                    print(f"{filename}: Already processed, skipping.")
-                    continue
-
-                # Define the full paths for the HEIC and JPEG files
-                heic_path = os.path.join(heic_source_directory, filename)
-                jpg_filename = os.path.splitext(filename)[0] + '.jpg'
-                jpg_path = os.path.join(
-                    converted_image_directory, jpg_filename)
-
-                # =============== Convert HEIC to JPEG ===============
-                convert_heic_to_jpg(heic_path, jpg_path)
-
-                # =============== Extract Text from JPEG ===============
-                extracted_text = extract_text_from_image(jpg_path)
-                if extracted_text:
-                    f_output.write(f"Image: {filename}\n")
-                    f_output.write(f"Extracted Text:\n{extracted_text}\n\n")
-                    print(f"{filename}: Converted to JPEG and extracted text.")
-                else:
-                    print(f"{filename}: Converted to JPEG, but no text was found.")
+    heic_paths = [os.path.join(heic_source_directory, filename)
+                  for filename in sorted(os.listdir(heic_source_directory))
+                  if filename.lower().endswith('.heic')]
+    try:
+        ocr_images(heic_paths, converted_image_directory, output_txt_file,
+                   vision_text_extractor(), checkpoint=CheckpointStore(checkpoint_directory))
+    except IncompleteRun as e:
+        # The photos that were read are saved; run the script again for the rest
+        logging.warning(f"Not every photo was read: {e}")
+        sys.exit(1)
 
 
 # =============== Main Execution ===============
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     process_heic_images()
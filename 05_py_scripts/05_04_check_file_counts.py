@@ -6,7 +6,12 @@
 """
 
 import os
-import re
+import sys
+
+# Make the shared lab_inventory package (repository root) importable.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lab_inventory.pipeline.counts import image_files, missing_images, organized_images  # noqa: E402
+from lab_inventory.pipeline.organize import split_entries  # noqa: E402
 
 # ----------------------------------------------------------------------------------------
 # Define paths for the processed text file and the inventory directory.
@@ -15,43 +20,12 @@ processed_text_file_path = '/Users/abasaltbahrami/Desktop/lab-electronics-invent
 directory_path = '/Users/abasaltbahrami/Desktop/lab-electronics-inventory/01_inventory_original_files'
 
 # ----------------------------------------------------------------------------------------
-# Function to extract processed image filenames from the text file.
-# ----------------------------------------------------------------------------------------
-
-
-def get_processed_images(file_path):
-    processed_files = set()
-    with open(file_path, 'r') as file:
-        for line in file:
-            if line.startswith("Image: "):
-                filename = line.strip().split(": ")[1]
-                processed_files.add(filename)
-    return processed_files
-
-# ----------------------------------------------------------------------------------------
-# Function to retrieve all image files in the directory (and subdirectories)
-# with their relative paths.
-# ----------------------------------------------------------------------------------------
-
-
-def get_all_image_files(directory_path):
-    image_extensions = {'.heic', '.jpg',
-                        '.jpeg', '.png', '.gif', '.bmp', '.tiff'}
-    all_files = {}
-    for root, _, files in os.walk(directory_path):
-        for file in files:
-            if os.path.splitext(file.lower())[1] in image_extensions:
-                relative_path = os.path.relpath(
-                    os.path.join(root, file), directory_path)
-                all_files[file] = relative_path
-    return all_files
-
-
-# ----------------------------------------------------------------------------------------
-# Run functions to collect data and compare processed images with available images.
+# Collect all image files in the directory (and subdirectories) with their relative paths,
+# and the image filenames already processed.
 # ----------------------------------------------------------------------------------------
-all_image_files = get_all_image_files(directory_path)
-processed_image_files = get_processed_images(processed_text_file_path)
+all_image_files = image_files(directory_path)
+with open(processed_text_file_path, 'r') as file:
+    processed_image_files = organized_images(split_entries(file.read()))
 
 print(f"Number of images in directory: {len(all_image_files)}")
 print(f"Number of images processed: {len(processed_image_files)}")
@@ -59,11 +33,11 @@ print(f"Number of images processed: {len(processed_image_files)}")
 # ----------------------------------------------------------------------------------------
 # Identify and list missing image files.
 # ----------------------------------------------------------------------------------------
-missing_files = set(all_image_files.keys()) - processed_image_files
+missing_files = missing_images(all_image_files, processed_image_files)
 if missing_files:
     print("Some files are missing in the processed text file.")
     print("Missing files:")
-    for file in missing_files:
-        print(f"{file} (Subfolder: {all_image_files[file]})")
+    for file, relative_path in missing_files.items():
+        print(f"{file} (Subfolder: {relative_path})")
 else:
     print("All files have been processed.")
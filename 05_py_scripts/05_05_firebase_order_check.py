@@ -1,9 +1,15 @@
 # -------------------------------------------------------------------------
 # Import required modules from firebase_admin and firebase_admin itself.
 # -------------------------------------------------------------------------
+import os
+import sys
 from firebase_admin import credentials, storage, initialize_app
 import firebase_admin
 
+# Make the shared lab_inventory package (repository root) importable.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lab_inventory import reorders  # noqa: E402
+
 # -------------------------------------------------------------------------
 # Set the path to your Firebase Admin SDK JSON file.
 # -------------------------------------------------------------------------
@@ -20,66 +26,68 @@ if not firebase_admin._apps:
     })
 
 # -------------------------------------------------------------------------
-# Check if 'to_be_ordered.txt' exists in Firebase Storage and print its content.
-# Additionally, print a message indicating that the file has been read.
+# List the reorder requests queued under 'reorder_requests/' in Firebase Storage.
+# Requests still sitting in the legacy 'to_be_ordered.txt' file are moved into
+# the queue first. Additionally, print a message indicating that the queue has been read.
 # -------------------------------------------------------------------------
 
 
 def check_and_read_reorder_file():
     """
-    Check if 'to_be_ordered.txt' exists in Firebase Storage, print its content,
-    and indicate that the file has been read.
+    Print every queued reorder request (one object per request under 'reorder_requests/')
+    and indicate that the queue has been read.
     """
     # Access the default Firebase Storage bucket.
     bucket = storage.bucket()
-    # Create a blob object representing 'to_be_ordered.txt'.
-    blob = bucket.blob('to_be_ordered.txt')
 
-    # Check if the file exists in the bucket.
-    if blob.exists():
-        # Download the file's content as text.
-        content = blob.download_as_text()
-        print("Reading file 'to_be_ordered.txt'...\n")
-        print("Contents of 'to_be_ordered.txt':\n")
-        print(content)
-        print("\nFile has been read successfully.")
+    # Move any requests left in the legacy 'to_be_ordered.txt' into the queue.
+    migrated = reorders.migrate_legacy_file(bucket)
+    if migrated:
+        print(f"Moved {migrated} request(s) from '{reorders.LEGACY_REORDER_FILE}' into the queue.")
+
+    requests = reorders.list_requests(bucket)
+    if requests:
+        print("Reading reorder queue...\n")
+        print(f"Queued reorder requests ({len(requests)}):\n")
+        for request in requests:
+            print(request.to_line())
+        print("\nQueue has been read successfully.")
     else:
-        print("File 'to_be_ordered.txt' does not exist in Firebase Storage.")
+        print("The reorder queue is empty.")
 
 # -------------------------------------------------------------------------
-# Reset 'to_be_ordered.txt' in Firebase Storage to be empty by overwriting it
-# with an empty string.
+# Reset the reorder queue by deleting every queued request object.
 # -------------------------------------------------------------------------
 
 
 def reset_reorder_file():
     """
-    Reset 'to_be_ordered.txt' in Firebase Storage to be empty.
+    Reset the reorder queue in Firebase Storage to be empty.
     """
     # Access the default Firebase Storage bucket.
     bucket = storage.bucket()
-    # Create a blob object representing 'to_be_ordered.txt'.
-    blob = bucket.blob('to_be_ordered.txt')
-    # Overwrite the file with an empty string (clearing its contents).
-    blob.upload_from_string("", content_type="text/plain")
-    print("File 'to_be_ordered.txt' has been reset to empty.")
+    # Delete each request object (requests submitted after the listing are kept).
+    deleted = reorders.clear_requests(bucket)
+    # Resynchronize the dashboard counter with what is actually left in the queue.
+    remaining = reorders.recount_requests(bucket)
+    print(f"Reorder queue has been reset ({deleted} request(s) deleted, {remaining} remaining).")
 
 
 # -------------------------------------------------------------------------
-# Main block: read file content, then prompt the user for the reset operation.
+# Main block: read the queue, then prompt the user for the reset operation.
 # -------------------------------------------------------------------------
 if __name__ == "__main__":
-    # First, check and print the file content along with a message indicating it has been read.
+    # First, check and print the queued requests along with a message indicating they have been read.
     check_and_read_reorder_file()
 
-    # Prompt the user to decide if they want to reset the file.
-    user_input = input("\nDo you want to reset 'to_be_ordered.txt'? (Y/N): ")
+    # Prompt the user to decide if they want to reset the queue.
+    user_input = input("\nDo you want to reset the reorder queue? (Y/N): ")
 
-    # If the user enters 'Y' or 'y', reset the file.
+    # If the user enters 'Y' or 'y', reset the queue.
     if user_input.lower() == 'y':
         reset_reorder_file()
-        # Optionally, check and print the file content again to confirm the reset.
+        # Optionally, check and print the queue again to confirm the reset.
         print("\nAfter reset:")
         check_and_read_reorder_file()
     else:
-        print("File reset aborted.")
+        print("Queue reset aborted.")
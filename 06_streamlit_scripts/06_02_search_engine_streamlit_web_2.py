@@ -2,19 +2,60 @@ import streamlit as st
 from datetime import datetime
 import requests
 import re
+import os
+import sys
 import pandas as pd
+import pyarrow as pa
 import firebase_admin
 from firebase_admin import credentials, storage
 import time
 import logging
-from typing import Optional, List, Tuple, Dict
+from typing import Callable, Optional, List, Tuple, Dict
 from dataclasses import dataclass
 import hashlib
+import io
+import json
+
+try:
+    # Debounced input that reruns the app while typing; optional, Enter-to-search otherwise
+    from st_keyup import st_keyup
+except ImportError:
+    st_keyup = None
+
+# Make the shared lab_inventory package (repository root) importable.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lab_inventory import reorders  # noqa: E402
+from lab_inventory.bom import BomMatch, compact_part_number, read_bom  # noqa: E402
+from lab_inventory.catalog import (  # noqa: E402
+    SNAPSHOT_BLOB, SUMMARY_BLOB, CatalogState, InventoryCatalog, ScanMatch)
+from lab_inventory.images import (  # noqa: E402
+    DEFAULT_MAX_DIMENSION, ImageOptions, is_photo, process_photos, supported_formats,
+    thumbnail_object_name)
+from lab_inventory.index import FACET_FIELDS, InventoryIndex, bits_from_indices  # noqa: E402
+from lab_inventory.semantic import SemanticIndex  # noqa: E402
+from lab_inventory.snapshot import normalize_search_key, summarize_snapshot  # noqa: E402
+from lab_inventory.uploads import (  # noqa: E402
+    PendingUpload, UploadProgress, unique_file_names, upload_files, upload_object_name)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+REORDER_COLUMNS = ["request_id", "date_time", "manufacturer_pn",
+                   "description", "requester_name", "generation"]
+REORDER_PAGE_SIZES = [25, 50, 100]
+RANKED_SEARCH_MODE = "Ranked (all fields)"
+FIELD_SEARCH_MODE = "Match by field"
+PREFIX_SEARCH_MODE = "As you type (part number)"
+SEMANTIC_SEARCH_MODE = "Semantic (by meaning)"
+BOM_SEARCH_MODE = "BOM check (CSV/XLSX)"
+SCAN_SEARCH_MODE = "Scan box label"
+PHOTO_MAX_DIMENSIONS = [1024, 1600, DEFAULT_MAX_DIMENSION, 3072]
+# Milliseconds of typing pause before the as-you-type search reruns
+KEYUP_DEBOUNCE_MS = 250
+# Seconds between checks for a newly published snapshot (reruns in between reuse the loaded one)
+CATALOG_REFRESH_INTERVAL = 30.0
+
 
 @dataclass
 class InventoryItem:
@@ -26,11 +67,30 @@ class InventoryItem:
     company_made: str
 
 
+@st.cache_resource(show_spinner=False)
+def _inventory_catalog(_bucket) -> InventoryCatalog:
+    """One search catalog per server process, shared by all sessions (reloads on publish)"""
+    return InventoryCatalog(_bucket, min_refresh_interval=CATALOG_REFRESH_INTERVAL)
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _load_reorder_frame(_inventory_manager) -> pd.DataFrame:
+    """Parse the reorder queue once into a DataFrame (cached until a submit/delete or the TTL)"""
+    requests = _inventory_manager.list_reorder_requests()
+    df = pd.DataFrame(
+        [dict(request.fields(), generation=request.generation)
+         for request in requests],
+        columns=REORDER_COLUMNS)
+    df["submitted"] = pd.to_datetime(df["date_time"], errors="coerce")
+    return df
+
+
 class InventoryManager:
     """Main class for inventory management operations"""
 
     def __init__(self):
         self.bucket = None
+        self._catalog_state = None
         self._initialize_firebase()
 
     def _initialize_firebase(self) -> None:
@@ -84,6 +144,28 @@ class InventoryManager:
             logger.error(f"Failed to fetch inventory data: {e}")
             return None
 
+    def load_catalog(self) -> Optional[CatalogState]:
+        """The current snapshot and its indexes, downloaded only when a new one is published
+        (checked at most every CATALOG_REFRESH_INTERVAL seconds, not on every rerun)"""
+        if self._catalog_state is None and self.bucket:
+            self._catalog_state = _inventory_catalog(self.bucket).refresh()
+        return self._catalog_state
+
+    def load_snapshot(self) -> Optional[pa.Table]:
+        """Load the precomputed inventory snapshot"""
+        state = self.load_catalog()
+        return state.table if state else None
+
+    def load_index(self) -> Optional[InventoryIndex]:
+        """Load the search index for the current snapshot"""
+        state = self.load_catalog()
+        return state.index if state else None
+
+    def load_semantic_index(self) -> Optional[SemanticIndex]:
+        """Load the semantic embeddings if they were published for the current snapshot"""
+        state = self.load_catalog()
+        return state.semantic_index if state else None
+
     def parse_inventory_block(self, block: str) -> Optional[InventoryItem]:
         """Parse a single inventory block into an InventoryItem"""
         try:
@@ -107,8 +189,57 @@ class InventoryManager:
             logger.warning(f"Failed to parse inventory block: {e}")
             return None
 
-    def search_inventory(self, part_query: str = "", value_query: str = "") -> List[InventoryItem]:
-        """Search inventory based on part number and/or value"""
+    def search_inventory(self, part_query: str = "", value_query: str = "",
+                         facet_selections: Optional[Dict[str, List[str]]] = None) -> List[InventoryItem]:
+        """Search inventory based on part number and/or value, narrowed by facet selections"""
+        if self.load_catalog() is None:
+            return self._search_inventory_text(part_query, value_query)
+        catalog = _inventory_catalog(self.bucket)
+        return [InventoryItem(**row)
+                for row in catalog.search(part_query, value_query, facet_selections)]
+
+    def rank_inventory(self, query: str,
+                       facet_selections: Optional[Dict[str, List[str]]] = None) -> List[Tuple[InventoryItem, float]]:
+        """Ranked search across description, part numbers and footprint, best matches first"""
+        if self.load_catalog() is None:
+            # No snapshot yet: unranked description match on the plain-text inventory
+            return [(item, 0.0) for item in self._search_inventory_text(value_query=query)]
+        catalog = _inventory_catalog(self.bucket)
+        return [(InventoryItem(**row), score)
+                for row, score in catalog.rank(query, facet_selections)]
+
+    def semantic_search_inventory(self, query: str,
+                                  facet_selections: Optional[Dict[str, List[str]]] = None) -> List[Tuple[InventoryItem, float]]:
+        """Items whose descriptions are closest in meaning to the query, most similar first"""
+        if self.load_catalog() is None:
+            return self.rank_inventory(query, facet_selections)
+        # Falls back to ranked search when no embeddings match the snapshot
+        catalog = _inventory_catalog(self.bucket)
+        return [(InventoryItem(**row), score)
+                for row, score in catalog.semantic_search(query, facet_selections)]
+
+    def check_bom(self, data: bytes, filename: str) -> Optional[List[BomMatch]]:
+        """Resolve every line of a BOM file against the inventory in one batch"""
+        if self.load_catalog() is None:
+            return None
+        return _inventory_catalog(self.bucket).resolve_bom(read_bom(data, filename))
+
+    def prefix_search_inventory(self, prefix: str,
+                                facet_selections: Optional[Dict[str, List[str]]] = None) -> List[InventoryItem]:
+        """Items whose manufacturer or internal part number starts with 'prefix'"""
+        if self.load_catalog() is None:
+            return self._search_inventory_text(part_query=prefix)
+        catalog = _inventory_catalog(self.bucket)
+        return [InventoryItem(**row) for row in catalog.prefix_search(prefix, facet_selections)]
+
+    def scan_label(self, code: str) -> Optional[ScanMatch]:
+        """The inventory rows of a scanned storage box label (None without a snapshot)"""
+        if self.load_catalog() is None:
+            return None
+        return _inventory_catalog(self.bucket).scan(code)
+
+    def _search_inventory_text(self, part_query: str = "", value_query: str = "") -> List[InventoryItem]:
+        """Search the plain-text inventory (used when no snapshot has been published)"""
         inventory_data = self.fetch_inventory_data()
         if not inventory_data:
             return []
@@ -154,27 +285,14 @@ class InventoryManager:
     @staticmethod
     def _normalize_text(text: str) -> str:
         """Normalize text for search operations"""
-        return re.sub(r'\s+', '', text.strip().lower()) if text else ""
+        return normalize_search_key(text)
 
     def submit_reorder_request(self, manufacturer_pn: str, description: str, requester_name: str) -> bool:
         """Submit a reorder request to Firebase"""
         try:
-            current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            reorder_entry = (
-                f"Date and Time: {current_time}, "
-                f"Manufacturer Part Number: {manufacturer_pn}, "
-                f"Description: {description}, "
-                f"Requester Name: {requester_name}\n"
-            )
-
-            blob = self.bucket.blob('to_be_ordered.txt')
-
-            existing_content = ""
-            if blob.exists():
-                existing_content = blob.download_as_text()
-
-            updated_content = existing_content + reorder_entry
-            blob.upload_from_string(updated_content)
+            reorders.submit_request(
+                self.bucket, manufacturer_pn, description, requester_name)
+            _load_reorder_frame.clear()
 
             logger.info(
                 f"Reorder request submitted by {requester_name} for {manufacturer_pn}")
@@ -184,85 +302,129 @@ class InventoryManager:
             logger.error(f"Failed to submit reorder request: {e}")
             return False
 
-    def upload_files(self, files: List, uploader_name: str) -> Dict[str, bool]:
-        """Upload files to Firebase storage"""
+    def list_reorder_requests(self) -> List[reorders.ReorderRequest]:
+        """List active reorder requests, moving any legacy to_be_ordered.txt lines into the queue first"""
+        try:
+            migrated = reorders.migrate_legacy_file(self.bucket)
+            if migrated:
+                logger.info(f"Migrated {migrated} legacy reorder request(s)")
+        except Exception as e:
+            logger.warning(f"Could not migrate legacy reorder requests: {e}")
+        return reorders.list_requests(self.bucket)
+
+    def delete_reorder_requests(self, request_ids: List[str],
+                                generations: Optional[Dict[str, int]] = None) -> int:
+        """Delete reorder requests by ID and return how many were removed"""
+        deleted = reorders.delete_requests(
+            self.bucket, request_ids, generations)
+        _load_reorder_frame.clear()
+        return deleted
+
+    def reorder_requests_frame(self) -> pd.DataFrame:
+        """Active reorder requests as a cached DataFrame"""
+        return _load_reorder_frame(self)
+
+    def upload_files(self, files: List, uploader_name: str,
+                     on_progress: Optional[Callable[[UploadProgress], None]] = None,
+                     image_options: Optional[ImageOptions] = None) -> Dict[int, bool]:
+        """
+        Upload files to Firebase storage in parallel, reporting progress per file.
+        With 'image_options', photos are downsampled, stripped of EXIF and re-encoded first,
+        and a thumbnail of each is uploaded alongside.
+        Progress events are labelled, and results keyed, by each file's index in 'files';
+        files that would be stored under the same name are numbered instead of overwritten.
+        """
+        photos = [index for index, file in enumerate(files)
+                  if image_options and is_photo(file.name)]
+        processed = dict(zip(
+            photos,
+            process_photos([(files[index].name, files[index].getvalue()) for index in photos],
+                           image_options)
+            if photos else []))
+
+        # Name each file is stored under: re-encoded photos take their new extension
+        targets = [processed[index].name if processed.get(index) else file.name
+                   for index, file in enumerate(files)]
+        names = unique_file_names(targets)
+        uploads, thumbnails = [], []
+        for index, (file, target, name) in enumerate(zip(files, targets, names)):
+            if name != target:
+                logger.info(f"Storing {file.name} as {name}: {target} is already in this batch")
+            photo = processed.get(index)
+            if photo is None:
+                # Documents, and photos that could not be decoded, are uploaded as they are
+                uploads.append(PendingUpload(
+                    label=str(index), object_name=upload_object_name(uploader_name, name),
+                    fileobj=file, size=file.size, content_type=file.type))
+                continue
+            uploads.append(PendingUpload(
+                label=str(index), object_name=upload_object_name(uploader_name, name),
+                fileobj=io.BytesIO(photo.data), size=len(photo.data),
+                content_type=photo.content_type))
+            thumbnails.append(PendingUpload(
+                label=f"{index} (thumbnail)",
+                object_name=thumbnail_object_name(uploader_name, name),
+                fileobj=io.BytesIO(photo.thumbnail), size=len(photo.thumbnail),
+                content_type=photo.thumbnail_content_type))
+            logger.info(f"Compressed {file.name}: {photo.original_size} -> {len(photo.data)} bytes")
+
+        # Thumbnails upload in the same pool; their failures are only logged
+        labels = {upload.label for upload in uploads}
         results = {}
+        for event in upload_files(self.bucket, uploads + thumbnails):
+            if event.label not in labels:
+                continue
+            if on_progress:
+                on_progress(event)
+            if event.done:
+                results[int(event.label)] = event.ok
+        return results
 
-        for file in files:
-            try:
-                file_name = f"component_images/{uploader_name}/{file.name}"
-                blob = self.bucket.blob(file_name)
-
-                # Reset file pointer
-                file.seek(0)
-                blob.upload_from_string(file.read(), content_type=file.type)
-
-                results[file.name] = True
-                logger.info(
-                    f"File {file.name} uploaded successfully by {uploader_name}")
-
-            except Exception as e:
-                logger.error(f"Failed to upload {file.name}: {e}")
-                results[file.name] = False
+    def load_summary(self) -> Optional[Dict]:
+        """Load the precomputed inventory summary, or derive it from the snapshot if none was published"""
+        try:
+            blob = self.bucket.get_blob(SUMMARY_BLOB) if self.bucket else None
+            if blob is not None:
+                return json.loads(blob.download_as_text())
+        except Exception as e:
+            logger.warning(f"Could not load inventory summary: {e}")
 
-        return results
+        table = self.load_snapshot()
+        if table is None:
+            return None
+        snapshot_blob = self.bucket.get_blob(SNAPSHOT_BLOB)
+        published_at = snapshot_blob.updated.astimezone().strftime(
+            '%Y-%m-%d %H:%M') if snapshot_blob and snapshot_blob.updated else "Unknown"
+        return summarize_snapshot(table, published_at)
 
     def get_dashboard_metrics(self) -> Dict[str, any]:
-        """Calculate dashboard metrics from inventory data"""
+        """Read the precomputed dashboard metrics and reorder queue counters"""
         try:
-            inventory_data = self.fetch_inventory_data()
-            if not inventory_data:
+            summary = self.load_summary()
+            if not summary:
                 return {
                     "total_components": "No Data",
                     "active_requests": "No Data",
                     "categories": "No Data",
-                    "last_updated": datetime.now().strftime('%Y-%m-%d %H:%M')
+                    "last_updated": "Unknown"
                 }
 
-            blocks = inventory_data.split("\n\n")
-            valid_items = 0
-            locations = set()
-            descriptions = []
-
-            for block in blocks:
-                if not block.strip():
-                    continue
-                item = self.parse_inventory_block(block)
-                if item:
-                    valid_items += 1
-                    if item.location != "Not available":
-                        locations.add(item.location)
-                    if item.description != "Not available":
-                        descriptions.append(item.description.lower())
-
-            # Count unique categories (rough estimate based on common component types)
-            categories = set()
-            component_types = ['resistor', 'capacitor', 'inductor', 'ic', 'microcontroller',
-                               'transistor', 'diode', 'led', 'connector', 'switch', 'sensor']
-
-            for desc in descriptions:
-                for comp_type in component_types:
-                    if comp_type in desc:
-                        categories.add(comp_type.title())
-
-            # Get reorder requests count
+            # Get reorder requests count from the counters kept up to date on submit/delete
             active_requests = 0
             try:
                 if self.bucket:
-                    blob = self.bucket.blob('to_be_ordered.txt')
-                    if blob.exists():
-                        reorder_content = blob.download_as_text()
-                        active_requests = len(
-                            [line for line in reorder_content.split('\n') if line.strip()])
+                    active_requests = reorders.read_request_stats(
+                        self.bucket)["active_requests"]
             except Exception as e:
                 logger.warning(f"Could not fetch reorder requests: {e}")
                 active_requests = "N/A"
 
             return {
-                "total_components": valid_items,
+                "total_components": summary["total_components"],
                 "active_requests": active_requests,
-                "categories": len(categories) if categories else max(1, len(locations)),
-                "last_updated": datetime.now().strftime('%Y-%m-%d %H:%M')
+                "categories": summary["categories"],
+                # When the inventory was last published, not when the page rendered
+                "last_updated": summary.get("published_at", "Unknown")
             }
 
         except Exception as e:
@@ -271,7 +433,7 @@ class InventoryManager:
                 "total_components": "Error",
                 "active_requests": "Error",
                 "categories": "Error",
-                "last_updated": datetime.now().strftime('%Y-%m-%d %H:%M')
+                "last_updated": "Unknown"
             }
 
 
@@ -364,22 +526,72 @@ class InventoryUI:
         """Render the main search interface"""
         st.markdown("### 🔍 Component Search")
 
+        search_mode = st.radio(
+            "Search mode",
+            [RANKED_SEARCH_MODE, SEMANTIC_SEARCH_MODE, FIELD_SEARCH_MODE, PREFIX_SEARCH_MODE,
+             BOM_SEARCH_MODE, SCAN_SEARCH_MODE],
+            horizontal=True,
+            help="Ranked search matches words across description, part numbers and footprint; "
+                 "semantic search also finds related wording (e.g. LDO for regulator); "
+                 "as-you-type search lists part numbers starting with what you type; "
+                 "BOM check looks up every line of a board BOM at once; "
+                 "scanning a box label's code shows what is in that box"
+        )
+        if search_mode == BOM_SEARCH_MODE:
+            self._render_bom_check()
+            return
+        if search_mode == SCAN_SEARCH_MODE:
+            self._render_label_scan()
+            return
+        semantic = search_mode == SEMANTIC_SEARCH_MODE
+        ranked = search_mode == RANKED_SEARCH_MODE or semantic
+        as_you_type = search_mode == PREFIX_SEARCH_MODE
+        ranked_query = part_number_query = value_query = prefix_query = ""
+
         with st.container():
-            col1, col2, col3 = st.columns([3, 3, 2])
+            if ranked:
+                col1, col3 = st.columns([6, 2])
 
-            with col1:
-                part_number_query = st.text_input(
-                    "Part Number Search",
-                    placeholder="e.g., STM32F407VG, LM358",
-                    help="Search by manufacturer or internal part number"
-                )
+                with col1:
+                    ranked_query = st.text_input(
+                        "Search",
+                        placeholder="e.g., 0603 LED green, LM358, 4.7uF 16V",
+                        help="Words can match any field; best matches are listed first"
+                    )
+            elif as_you_type:
+                col1, col3 = st.columns([6, 2])
 
-            with col2:
-                value_query = st.text_input(
-                    "Component Description",
-                    placeholder="e.g., 4.7uF, 100 OHM, XOR gate",
-                    help="Search by component value or description"
-                )
+                with col1:
+                    if st_keyup is not None:
+                        prefix_query = st_keyup(
+                            "Part number starts with",
+                            placeholder="e.g., LTST, GRM18, STM32",
+                            debounce=KEYUP_DEBOUNCE_MS,
+                            key="prefix_query"
+                        ) or ""
+                    else:
+                        prefix_query = st.text_input(
+                            "Part number starts with",
+                            placeholder="e.g., LTST, GRM18, STM32",
+                            help="Press Enter to update the results",
+                            key="prefix_query"
+                        )
+            else:
+                col1, col2, col3 = st.columns([3, 3, 2])
+
+                with col1:
+                    part_number_query = st.text_input(
+                        "Part Number Search",
+                        placeholder="e.g., STM32F407VG, LM358",
+                        help="Search by manufacturer or internal part number"
+                    )
+
+                with col2:
+                    value_query = st.text_input(
+                        "Component Description",
+                        placeholder="e.g., 4.7uF, 100 OHM, XOR gate",
+                        help="Search by component value or description"
+                    )
 
             with col3:
                 st.markdown("<br>", unsafe_allow_html=True)  # Spacing
@@ -389,24 +601,187 @@ class InventoryUI:
                     type="primary"
                 )
 
+        index = self.inventory_manager.load_index()
+        facet_selections = {}
+        if index is not None:
+            semantic_index = self.inventory_manager.load_semantic_index() if semantic else None
+            if semantic_index is not None and ranked_query.strip():
+                hits = semantic_index.search(ranked_query)
+                base = bits_from_indices((row for row, _ in hits), index.size)
+            elif ranked:
+                base = index.query_bits(ranked_query)
+            elif as_you_type:
+                base = index.prefix_bits(prefix_query)
+            else:
+                base = index.match_bits(part_number_query, value_query)
+            facet_selections = self._render_facet_filters(index, base)
+        has_facets = any(facet_selections.values())
+
         if search_clicked:
-            if not part_number_query and not value_query:
+            if not (ranked_query or part_number_query or value_query or prefix_query or has_facets):
                 st.warning("⚠️ Please enter at least one search criterion")
+                st.session_state.search_submitted = False
                 return
+            st.session_state.search_submitted = True
 
+        # After the first search, results follow the inputs and filters on every rerun;
+        # as-you-type results show as soon as there is a prefix
+        if (st.session_state.get("search_submitted", False) or has_facets
+                or (as_you_type and prefix_query)):
+            scores = None
             with st.spinner("Searching inventory database..."):
-                results = self.inventory_manager.search_inventory(
-                    part_number_query, value_query)
+                if ranked:
+                    search = (self.inventory_manager.semantic_search_inventory if semantic
+                              else self.inventory_manager.rank_inventory)
+                    ranked_results = search(ranked_query, facet_selections)
+                    results = [item for item, _ in ranked_results]
+                    scores = [score for _, score in ranked_results]
+                elif as_you_type:
+                    results = self.inventory_manager.prefix_search_inventory(
+                        prefix_query, facet_selections)
+                else:
+                    results = self.inventory_manager.search_inventory(
+                        part_number_query, value_query, facet_selections)
 
             if results:
                 st.success(f"✅ Found {len(results)} matching component(s)")
-                self._display_search_results(results)
+                self._display_search_results(results, scores)
             else:
                 st.warning(
                     "⚠️ No components found matching your search criteria")
                 st.info("💡 Try using broader search terms or check your spelling")
 
-    def _display_search_results(self, results: List[InventoryItem]):
+    def _render_bom_check(self):
+        """Upload a BOM and show the shelf location and availability of every line"""
+        bom_file = st.file_uploader(
+            "Board BOM",
+            type=["csv", "tsv", "txt", "xlsx"],
+            help="Needs a manufacturer part number column (e.g. 'MPN'); a 'Qty' column is optional"
+        )
+        if bom_file is None:
+            return
+
+        try:
+            with st.spinner("Checking BOM against the inventory..."):
+                matches = self.inventory_manager.check_bom(bom_file.getvalue(), bom_file.name)
+        except ValueError as e:
+            st.error(f"❌ {e}")
+            return
+        except ImportError:
+            st.error("❌ Reading Excel BOMs needs openpyxl; upload the BOM as CSV instead")
+            return
+        if matches is None:
+            st.warning("⚠️ The inventory snapshot is not available yet")
+            return
+        if not matches:
+            st.warning("⚠️ No part lines found in the BOM")
+            return
+
+        # Parts that are missing but already requested show as on order
+        requested = {compact_part_number(pn) for pn in
+                     self.inventory_manager.reorder_requests_frame()["manufacturer_pn"]}
+        rows = []
+        for match in matches:
+            if match.available:
+                status = "✅ In stock"
+            elif compact_part_number(match.bom_line.mpn) in requested:
+                status = "🕒 Reorder requested"
+            elif match.possible:
+                # A near part number, not necessarily the same part
+                status = f"⚠️ Possible match ({match.matched_pn})"
+            else:
+                status = "❌ Not in inventory"
+            rows.append({
+                "Line": match.bom_line.line,
+                "BOM MPN": match.bom_line.mpn,
+                "Qty": match.bom_line.quantity,
+                "Status": status,
+                "Match": match.match,
+                "Inventory MPN": match.matched_pn,
+                "Description": match.description,
+                "Locations": ", ".join(match.locations),
+                "Boxes": match.entries,
+            })
+        df = pd.DataFrame(rows)
+
+        found = sum(match.available for match in matches)
+        possible = sum(match.possible for match in matches)
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("BOM Lines", len(matches))
+        col2.metric("In Stock", found)
+        col3.metric("Possible Matches", possible)
+        col4.metric("Missing", len(matches) - found - possible)
+
+        st.dataframe(
+            df,
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "Description": st.column_config.TextColumn("Description", width="large"),
+                "Qty": st.column_config.NumberColumn("Qty", width="small"),
+                "Boxes": st.column_config.NumberColumn("Boxes", width="small"),
+            }
+        )
+        st.download_button(
+            "📥 Download BOM check (CSV)",
+            df.to_csv(index=False).encode("utf-8"),
+            file_name=f"{os.path.splitext(bom_file.name)[0]}_inventory_check.csv",
+            mime="text/csv"
+        )
+
+    def _render_label_scan(self):
+        """Look up the box of a scanned label code (a USB scanner types the code and Enter)"""
+        code = st.text_input(
+            "Label code",
+            placeholder="Click here and scan the code on a storage box label",
+            help="The QR code on each label holds its location and manufacturer part number",
+            key="label_code"
+        )
+        if not code.strip():
+            return
+
+        try:
+            match = self.inventory_manager.scan_label(code)
+        except ValueError as e:
+            st.error(f"❌ {e}")
+            return
+        if match is None:
+            st.warning("⚠️ The inventory snapshot is not available yet")
+            return
+
+        label = f"{match.code.location} / {match.code.mpn or 'no part number'}"
+        if not match.items:
+            st.warning(f"⚠️ Nothing in the inventory matches label {label}")
+            st.info("💡 The part may have been removed; reprint the labels after reorganizing")
+            return
+        if match.relocated:
+            locations = ", ".join(dict.fromkeys(item["location"] for item in match.items))
+            st.warning(f"⚠️ Label {label} is out of date: this part is now stored at {locations}")
+        else:
+            st.success(f"✅ Box {label}")
+        self._display_search_results([InventoryItem(**item) for item in match.items])
+
+    def _render_facet_filters(self, index: InventoryIndex, base: int) -> Dict[str, List[str]]:
+        """Render facet filters whose counts reflect the current query ('base') and the other filters"""
+        # Widget values from this rerun are already in session state, so counts are current
+        selections = {field: st.session_state.get(f"facet_{field}", [])
+                      for field in FACET_FIELDS}
+        counts = index.facet_counts(selections, base)
+
+        columns = st.columns(len(FACET_FIELDS))
+        for column, (field, label) in zip(columns, FACET_FIELDS.items()):
+            with column:
+                selections[field] = st.multiselect(
+                    label,
+                    list(index.facets[field]),
+                    key=f"facet_{field}",
+                    format_func=lambda value, field_counts=counts[field]:
+                        f"{value} ({field_counts.get(value, 0)})",
+                )
+        return selections
+
+    def _display_search_results(self, results: List[InventoryItem],
+                                scores: Optional[List[float]] = None):
         """Display search results in a professional table format"""
         st.markdown("### 📋 Search Results")
 
@@ -422,6 +797,8 @@ class InventoryUI:
             })
 
         df = pd.DataFrame(df_data)
+        if scores is not None:
+            df.insert(0, 'Relevance', [round(score, 2) for score in scores])
 
         # Display with custom styling
         st.markdown("""
@@ -445,7 +822,8 @@ class InventoryUI:
                 "Location": st.column_config.TextColumn("Location", width="medium"),
                 "Manufacturer P/N": st.column_config.TextColumn("Mfg P/N", width="medium"),
                 "Internal P/N": st.column_config.TextColumn("Internal P/N", width="medium"),
-                "Supplier": st.column_config.TextColumn("Supplier", width="medium")
+                "Supplier": st.column_config.TextColumn("Supplier", width="medium"),
+                "Relevance": st.column_config.NumberColumn("Relevance", width="small")
             }
         )
 
@@ -556,19 +934,55 @@ class InventoryUI:
                     help="Supported formats: JPG, PNG, PDF (Max file size depends on your Streamlit deployment)"
                 )
 
+                compress_photos = st.checkbox(
+                    "Compress photos before upload",
+                    value=True,
+                    help="Downsizes photos, removes EXIF metadata (e.g. GPS position) and adds a thumbnail"
+                )
+                image_options = None
+                if compress_photos:
+                    opt_col1, opt_col2 = st.columns(2)
+                    with opt_col1:
+                        max_dimension = st.selectbox(
+                            "Longest side (pixels)",
+                            PHOTO_MAX_DIMENSIONS,
+                            index=PHOTO_MAX_DIMENSIONS.index(DEFAULT_MAX_DIMENSION)
+                        )
+                    with opt_col2:
+                        image_format = st.selectbox(
+                            "Photo format",
+                            supported_formats(),
+                            help="WebP and AVIF are smaller than JPEG; AVIF is slowest to encode"
+                        )
+                    image_options = ImageOptions(max_dimension=max_dimension, format=image_format)
+
                 # Upload button and logic
                 if uploaded_files and uploader_name:
                     st.markdown("#### 📋 Files Ready for Upload:")
                     for file in uploaded_files:
-                        file_size = len(file.read()) / 1024 / \
-                            1024  # Size in MB
-                        file.seek(0)  # Reset file pointer
+                        file_size = file.size / 1024 / 1024  # Size in MB
                         st.write(f"• **{file.name}** ({file_size:.2f} MB)")
 
                     if st.button("🚀 Upload Files", use_container_width=True, type="primary"):
+                        # One progress bar per file, updated as the parallel uploads advance
+                        # (keyed by position: two selected files can share a name)
+                        progress_bars = {str(index): st.progress(0.0, text=f"⏳ {file.name}")
+                                         for index, file in enumerate(uploaded_files)}
+
+                        def show_progress(event: UploadProgress):
+                            name = uploaded_files[int(event.label)].name
+                            fraction = event.sent / event.total if event.total else 1.0
+                            if event.done:
+                                text = f"✅ {name}" if event.ok else f"❌ {name}"
+                            else:
+                                text = f"⬆️ {name} ({fraction:.0%})"
+                            progress_bars[event.label].progress(
+                                1.0 if event.done else fraction, text=text)
+
                         with st.spinner("Uploading files to Firebase..."):
                             results = self.inventory_manager.upload_files(
-                                uploaded_files, uploader_name)
+                                uploaded_files, uploader_name, on_progress=show_progress,
+                                image_options=image_options)
 
                         success_count = sum(results.values())
                         total_count = len(results)
@@ -583,7 +997,8 @@ class InventoryUI:
 
                         # Show detailed results
                         with st.expander("📊 Upload Details", expanded=success_count != total_count):
-                            for filename, success in results.items():
+                            for index, success in sorted(results.items()):
+                                filename = uploaded_files[index].name
                                 if success:
                                     st.success(f"✅ {filename}")
                                 else:
@@ -655,7 +1070,7 @@ class InventoryUI:
                 "total_components": "Unavailable",
                 "active_requests": "Unavailable",
                 "categories": "Unavailable",
-                "last_updated": datetime.now().strftime('%Y-%m-%d %H:%M')
+                "last_updated": "Unknown"
             }
 
         # Display metrics with smaller font
@@ -700,117 +1115,134 @@ class InventoryUI:
             self._show_active_requests()
 
     def _show_active_requests(self):
-        """Display the active reorder requests with delete options"""
+        """Display the active reorder requests as a paginated, filterable table with delete options"""
         st.markdown("### 📋 Active Reorder Requests")
 
         try:
-            if self.inventory_manager.bucket:
-                blob = self.inventory_manager.bucket.blob('to_be_ordered.txt')
-                if blob.exists():
-                    reorder_content = blob.download_as_text()
-                    requests = [line.strip() for line in reorder_content.split(
-                        '\n') if line.strip()]
-
-                    if requests:
-                        st.success(f"Found {len(requests)} active request(s)")
-
-                        # Initialize session state for checkboxes
-                        if "selected_requests" not in st.session_state:
-                            st.session_state.selected_requests = set()
-
-                        # Add "Select All" option and Delete button
-                        col1, col2 = st.columns([3, 1])
-                        with col1:
-                            select_all = st.checkbox("Select All Requests")
-                            if select_all:
-                                st.session_state.selected_requests = set(
-                                    range(len(requests)))
-                            elif not select_all and len(st.session_state.selected_requests) == len(requests):
-                                st.session_state.selected_requests = set()
-
-                        with col2:
-                            if st.button("🗑️ Delete Selected", type="secondary"):
-                                if st.session_state.selected_requests:
-                                    deleted_count = self._delete_selected_requests(
-                                        requests)
-                                    if deleted_count > 0:
-                                        st.rerun()
-                                else:
-                                    st.warning(
-                                        "No requests selected for deletion")
-
-                        st.markdown("---")
-
-                        # Display each request with checkbox (no form needed)
-                        for i, request in enumerate(requests):
-                            col1, col2 = st.columns([1, 10])
-
-                            with col1:
-                                # Use individual checkboxes that update session state immediately
-                                is_selected = st.checkbox(
-                                    "",
-                                    # Include length to force refresh
-                                    key=f"req_{i}_{len(requests)}",
-                                    value=i in st.session_state.selected_requests,
-                                    on_change=self._toggle_request_selection,
-                                    args=(i,)
-                                )
-
-                            with col2:
-                                with st.expander(f"Request #{i+1}", expanded=False):
-                                    # Parse the request details
-                                    parts = request.split(', ')
-                                    for part in parts:
-                                        if ':' in part:
-                                            key, value = part.split(':', 1)
-                                            st.write(
-                                                f"**{key.strip()}:** {value.strip()}")
-                                        else:
-                                            st.write(part)
-                    else:
-                        st.info("No active requests found")
-                else:
-                    st.info("No reorder requests file found")
-            else:
+            if not self.inventory_manager.bucket:
                 st.error("Unable to access database")
+                return
+
+            requests_df = self.inventory_manager.reorder_requests_frame()
+            if requests_df.empty:
+                st.info("No active requests found")
+                return
+
+            # Selection is kept as stable request IDs, never as list positions
+            if "selected_requests" not in st.session_state:
+                st.session_state.selected_requests = set()
+            # Forget selections of requests that no longer exist
+            st.session_state.selected_requests &= set(requests_df["request_id"])
+
+            # Filters run on the server over the cached frame; only one page is sent to the browser
+            col1, col2 = st.columns(2)
+            with col1:
+                requesters = st.multiselect(
+                    "Requester", sorted(requests_df["requester_name"].unique()))
+            with col2:
+                dates = requests_df["submitted"].dropna().dt.date
+                date_range = st.date_input(
+                    "Submitted between",
+                    value=(dates.min(), dates.max()) if not dates.empty else (),
+                )
+
+            filtered_df = requests_df
+            if requesters:
+                filtered_df = filtered_df[filtered_df["requester_name"].isin(
+                    requesters)]
+            if isinstance(date_range, tuple) and len(date_range) == 2:
+                submitted_dates = filtered_df["submitted"].dt.date
+                filtered_df = filtered_df[(submitted_dates >= date_range[0]) &
+                                          (submitted_dates <= date_range[1])]
+
+            st.success(
+                f"Found {len(requests_df)} active request(s), {len(filtered_df)} shown by the filters")
+
+            # Pagination
+            col1, col2, col3 = st.columns([1, 1, 2])
+            with col1:
+                page_size = st.selectbox("Rows per page", REORDER_PAGE_SIZES)
+            page_count = max(1, -(-len(filtered_df) // page_size))
+            with col2:
+                page = st.number_input(
+                    "Page", min_value=1, max_value=page_count, value=1, step=1)
+            with col3:
+                st.markdown("<br>", unsafe_allow_html=True)
+                # Applied only when ticked or unticked, so rows can still be deselected after it
+                st.checkbox(
+                    "Select all filtered requests", key="select_all_requests",
+                    on_change=self._on_select_all_changed,
+                    args=(list(filtered_df["request_id"]),))
+
+            page_df = filtered_df.iloc[(page - 1) * page_size:page * page_size]
+            editor_df = pd.DataFrame({
+                "Select": page_df["request_id"].isin(st.session_state.selected_requests),
+                "Date and Time": page_df["date_time"],
+                "Manufacturer P/N": page_df["manufacturer_pn"],
+                "Description": page_df["description"],
+                "Requester": page_df["requester_name"],
+            })
+
+            edited_df = st.data_editor(
+                editor_df,
+                # Keyed by the page's request IDs so edits never carry over to other rows
+                key="reorder_editor_" + hashlib.md5(
+                    ",".join(page_df["request_id"]).encode()).hexdigest(),
+                use_container_width=True,
+                hide_index=True,
+                disabled=["Date and Time", "Manufacturer P/N",
+                          "Description", "Requester"],
+                column_config={
+                    "Select": st.column_config.CheckboxColumn("Select", width="small"),
+                    "Description": st.column_config.TextColumn("Description", width="large"),
+                },
+            )
+            for request_id, selected in zip(page_df["request_id"], edited_df["Select"]):
+                if selected:
+                    st.session_state.selected_requests.add(request_id)
+                else:
+                    st.session_state.selected_requests.discard(request_id)
+
+            st.caption(
+                f"Page {page} of {page_count} • {len(st.session_state.selected_requests)} selected")
+            if st.button("🗑️ Delete Selected", type="secondary"):
+                if st.session_state.selected_requests:
+                    deleted_count = self._delete_selected_requests(requests_df)
+                    if deleted_count > 0:
+                        st.rerun()
+                else:
+                    st.warning("No requests selected for deletion")
 
         except Exception as e:
             logger.error(f"Error fetching active requests: {e}")
             st.error("Failed to load active requests")
 
-    def _toggle_request_selection(self, index):
-        """Toggle selection of a specific request"""
-        if "selected_requests" not in st.session_state:
-            st.session_state.selected_requests = set()
-
-        if index in st.session_state.selected_requests:
-            st.session_state.selected_requests.remove(index)
+    @staticmethod
+    def _on_select_all_changed(request_ids: List[str]) -> None:
+        """Select or deselect all filtered requests when the select-all box changes"""
+        if st.session_state.select_all_requests:
+            st.session_state.selected_requests |= set(request_ids)
         else:
-            st.session_state.selected_requests.add(index)
+            st.session_state.selected_requests -= set(request_ids)
+        # Drop the editors' pending row edits so the new selection is shown as is
+        for key in [key for key in st.session_state if key.startswith("reorder_editor_")]:
+            del st.session_state[key]
 
-    def _delete_selected_requests(self, current_requests) -> int:
+    def _delete_selected_requests(self, current_requests: pd.DataFrame) -> int:
         """Delete selected requests from Firebase and return count of deleted items"""
         try:
             if not st.session_state.selected_requests:
                 return 0
 
             if self.inventory_manager.bucket:
-                # Remove selected requests (in reverse order to maintain indices)
-                selected_indices = sorted(
-                    st.session_state.selected_requests, reverse=True)
-                updated_requests = current_requests.copy()
-                deleted_count = 0
-
-                for index in selected_indices:
-                    if 0 <= index < len(updated_requests):
-                        updated_requests.pop(index)
-                        deleted_count += 1
-
-                # Update the file
-                blob = self.inventory_manager.bucket.blob('to_be_ordered.txt')
-                updated_content = '\n'.join(
-                    updated_requests) + '\n' if updated_requests else ''
-                blob.upload_from_string(updated_content)
+                # Delete exactly the selected IDs, conditioned on the generation that was shown
+                generations = {
+                    request_id: int(generation)
+                    for request_id, generation in zip(
+                        current_requests["request_id"], current_requests["generation"])
+                    if pd.notna(generation)}
+                deleted_count = self.inventory_manager.delete_reorder_requests(
+                    sorted(st.session_state.selected_requests), generations)
 
                 # Clear selection and show success
                 st.session_state.selected_requests = set()
@@ -0,0 +1,108 @@
+# ----------------------------------------------------------------------------------------
+# NOTE:
+# Benchmark for the inventory search index (lab_inventory.index). It generates a synthetic
+# inventory of organized entries, builds the Arrow snapshot and the search index from it,
+# and reports build times and per-query latency (p50/p99) for BM25 ranked search, field
+# substring search and facet counting.
+# Usage: python 07_benchmarks/07_01_bench_ranked_search.py [--parts 100000] [--queries 200]
+# ----------------------------------------------------------------------------------------
+
+import argparse
+import os
+import random
+import sys
+import time
+
+# Make the shared lab_inventory package (repository root) importable.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lab_inventory.index import InventoryIndex  # noqa: E402
+from lab_inventory.snapshot import build_snapshot_table  # noqa: E402
+
+FOOTPRINTS = ["0402", "0603", "0805", "SOT23-5", "SOT23-6", "8SOIC", "6SON", "32WQFN", "SMD"]
+SUPPLIERS = ["TEXAS INSTRUMENTS", "MURATA", "YAGEO", "VISHAY", "MICROCHIP TECHNOLOGY",
+             "ANALOG DEVICES", "LITE-ON INC", "PANASONIC", "STMICROELECTRONICS"]
+COLORS = ["RED", "GREEN", "BLUE", "YELLOW", "WHITE"]
+QUERIES = ["0603 LED green", "LM358", "4.7uF 16V", "IC REG LINEAR 3.3V", "100 OHM 0402",
+           "MCU 32BIT", "schottky diode", "TPS62231", "ferrite bead 600 ohm", "X7R 0603"]
+
+
+def synthetic_entry(i, rng):
+    """Return one organized entry block resembling the real inventory"""
+    footprint = rng.choice(FOOTPRINTS)
+    kind = rng.randrange(6)
+    if kind == 0:
+        value = rng.choice(["0.1UF", "1UF", "4.7UF", "10UF", "10000PF"])
+        description = f"CAP CER {value} {rng.choice(['6.3V', '16V', '25V', '50V'])} X7R {footprint}"
+        component_type, mpn = "Capacitor", f"GRM{rng.randrange(10**6):06d}"
+    elif kind == 1:
+        value = rng.choice(["10", "100", "1K", "4.7K", "10K", "100K"])
+        description = f"RES {value} OHM 1% 1/10W {footprint}"
+        component_type, mpn = "Resistor", f"RC{rng.randrange(10**6):06d}-FR"
+    elif kind == 2:
+        description = f"LED {rng.choice(COLORS)} CLEAR {footprint} SMD"
+        component_type, mpn = "LED", f"LTST-C{rng.randrange(10**4):04d}KGKT"
+    elif kind == 3:
+        description = f"IC REG LINEAR {rng.choice(['1.8V', '3.3V', '5V'])} 200MA {footprint}"
+        component_type, mpn = "Voltage Regulator", f"TLV{rng.randrange(10**5):05d}PDQNR"
+    elif kind == 4:
+        description = f"IC MCU 32BIT {rng.choice(['256KB', '1MB', '2MB'])} FLASH {footprint}"
+        component_type, mpn = "Microcontroller", f"STM32F{rng.randrange(10**4):04d}"
+    else:
+        description = f"DIODE SCHOTTKY {rng.choice(['20V', '40V'])} 500MA {footprint}"
+        component_type, mpn = "Diode", f"BAT{rng.randrange(10**3):03d}-{i % 10}"
+    return (
+        f"Image: IMG_{i:06d}.heic\n"
+        f"Part number: {mpn}-ND\n"
+        f"Manufacturer Part number: {mpn}\n"
+        f"Fabricated Company: {rng.choice(SUPPLIERS)}\n"
+        f"Description: {description}\n"
+        f"Footprint: {footprint}\n"
+        f"Component Type: {component_type}\n"
+        f"Location: {component_type[0]}{i % 128 + 1}"
+    )
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def time_queries(label, run, queries):
+    """Run each query once and print p50/p99 latency in milliseconds"""
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        run(query)
+        samples.append((time.perf_counter() - start) * 1000)
+    print(f"{label:<28} p50 {percentile(samples, 0.50):8.2f} ms   "
+          f"p99 {percentile(samples, 0.99):8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the inventory search index")
+    parser.add_argument("--parts", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    blocks = [synthetic_entry(i, rng) for i in range(args.parts)]
+
+    start = time.perf_counter()
+    table = build_snapshot_table(blocks)
+    print(f"Snapshot build ({args.parts} parts): {time.perf_counter() - start:8.2f} s")
+
+    start = time.perf_counter()
+    index = InventoryIndex(table)
+    print(f"Index build:                 {time.perf_counter() - start:8.2f} s")
+
+    queries = [rng.choice(QUERIES) for _ in range(args.queries)]
+    time_queries("BM25 ranked top-100", lambda q: index.rank(q), queries)
+    time_queries("Field substring match", lambda q: index.items(index.match_bits(value_query=q)),
+                 queries)
+    time_queries("Facet counts", lambda q: index.facet_counts(
+        {"footprint": ["0603"]}, index.query_bits(q)), queries)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# ----------------------------------------------------------------------------------------
+# NOTE:
+# Load test for the headless search service (lab_inventory.service). A fixed number of
+# asyncio workers send search requests back to back for a set duration and the script
+# reports throughput (queries/sec) and request latency (p50/p95/p99). With --batch-size the
+# workers send POST /search/batch requests instead of single GET /search requests; with
+# --revalidate they send the ETag back and measure the 304 Not Modified path.
+# Pass --local-dir to start the service on a local snapshot folder for the duration of the run.
+# Usage: python 07_benchmarks/07_02_load_test_search_service.py --local-dir 04_extracted_info
+#        python 07_benchmarks/07_02_load_test_search_service.py --url http://127.0.0.1:8000
+# ----------------------------------------------------------------------------------------
+
+import argparse
+import asyncio
+import itertools
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+QUERIES = [("0603 LED green", "ranked"), ("LM358", "ranked"), ("4.7uF 16V", "ranked"),
+           ("3.3V LDO regulator", "semantic"), ("ferrite bead", "semantic"),
+           ("TPS", "prefix"), ("LTST", "prefix"), ("GRM", "prefix"),
+           ("IC REG LINEAR 3.3V", "ranked"), ("schottky diode", "ranked")]
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def start_local_service(local_dir, port):
+    """Start the service on a local snapshot folder and wait until it has loaded"""
+    process = subprocess.Popen(
+        [sys.executable, "-m", "lab_inventory.service", "--local-dir", local_dir,
+         "--port", str(port)],
+        cwd=REPO_ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{url}/health", timeout=1).json().get("rows"):
+                return process, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("The search service did not start within 60 seconds")
+
+
+async def worker(client, queries, args, deadline, latencies, counts):
+    etags = {}
+    while time.monotonic() < deadline:
+        if args.batch_size:
+            batch = [{"q": q, "mode": mode, "limit": args.limit}
+                     for q, mode in itertools.islice(queries, args.batch_size)]
+            key = tuple(q["q"] for q in batch)
+            request = client.build_request("POST", "/search/batch", json={"queries": batch})
+            query_count = len(batch)
+        else:
+            q, mode = next(queries)
+            key = (q, mode)
+            request = client.build_request(
+                "GET", "/search", params={"q": q, "mode": mode, "limit": args.limit})
+            query_count = 1
+        if args.revalidate and key in etags:
+            request.headers["If-None-Match"] = etags[key]
+
+        start = time.perf_counter()
+        response = await client.send(request)
+        latencies.append((time.perf_counter() - start) * 1000)
+        counts["requests"] += 1
+        counts["queries"] += query_count
+        counts[response.status_code] = counts.get(response.status_code, 0) + 1
+        if "etag" in response.headers:
+            etags[key] = response.headers["etag"]
+
+
+async def run_load(args, url):
+    queries = itertools.cycle(QUERIES)
+    latencies, counts = [], {"requests": 0, "queries": 0}
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+        # Warm up the connections and the prefix cache before measuring
+        await asyncio.gather(*(client.get("/search", params={"q": q, "mode": m})
+                               for q, m in QUERIES))
+        start = time.monotonic()
+        deadline = start + args.duration
+        await asyncio.gather(*(worker(client, queries, args, deadline, latencies, counts)
+                               for _ in range(args.concurrency)))
+        elapsed = time.monotonic() - start
+
+    statuses = ", ".join(f"{status}: {n}" for status, n in counts.items()
+                         if isinstance(status, int))
+    print(f"{counts['requests']} requests ({counts['queries']} queries) in {elapsed:.1f} s "
+          f"with {args.concurrency} workers  [{statuses}]")
+    print(f"throughput  {counts['requests'] / elapsed:8.1f} requests/s   "
+          f"{counts['queries'] / elapsed:8.1f} queries/s")
+    print(f"latency     p50 {percentile(latencies, 0.50):7.2f} ms   "
+          f"p95 {percentile(latencies, 0.95):7.2f} ms   "
+          f"p99 {percentile(latencies, 0.99):7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test for the inventory search service")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="service to test")
+    parser.add_argument("--local-dir", help="start the service on this local snapshot folder")
+    parser.add_argument("--port", type=int, default=8765, help="port for --local-dir")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--batch-size", type=int, default=0,
+                        help="queries per POST /search/batch (0 sends single GET requests)")
+    parser.add_argument("--limit", type=int, default=20, help="results per query")
+    parser.add_argument("--revalidate", action="store_true",
+                        help="send If-None-Match to measure 304 responses")
+    args = parser.parse_args()
+
+    process = None
+    url = args.url
+    if args.local_dir:
+        process, url = start_local_service(os.path.abspath(args.local_dir), args.port)
+    try:
+        asyncio.run(run_load(args, url))
+    finally:
+        if process:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+# ----------------------------------------------------------------------------------------
+# NOTE:
+# Benchmark for the photo pipeline: the batch stages (every photo OCR'd, then every entry
+# organized, as 05_01/05_02 do) against the streaming pipeline (lab_inventory.pipeline.
+# streaming, as the ingest worker runs it). Synthetic photos are written as TIFF, a format
+# Vision does not read, so every photo goes through conversion as HEIC photos do.
+# Vision and OpenAI are replaced by stand-ins that sleep for a typical request latency, so
+# the run is free and repeatable.
+# Reports the wall time, throughput (photos/s), the time until the first photo is organized,
+# and per-photo latency (p50/p95) from the start of the run to its organized entry.
+# Usage: python 07_benchmarks/07_03_bench_photo_pipeline.py [--photos 64] [--ocr-latency 0.3]
+# ----------------------------------------------------------------------------------------
+
+import argparse
+import os
+import re
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+from PIL import Image
+
+# Make the shared lab_inventory package (repository root) importable.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lab_inventory.pipeline.ocr import ocr_images  # noqa: E402
+from lab_inventory.pipeline.organize import organize_new_entries  # noqa: E402
+from lab_inventory.pipeline.streaming import PhotoPipeline  # noqa: E402
+
+COMPONENTS = [("RES 10K OHM 1% 1/10W 0603", "Resistor"), ("CAP CER 4.7UF 16V X5R 0603", "Capacitor"),
+              ("LED GREEN CLEAR 0603 SMD", "LED"), ("IC REG LINEAR 3.3V 300MA SOT23-5", "IC")]
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def make_photos(directory, count, size):
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"IMG_{i:04d}.tiff")
+        Image.new("RGB", (size, size * 3 // 4), (i * 37 % 256, 120, 80)).save(path)
+        paths.append(path)
+    return paths
+
+
+class FakeVision:
+    """Text extractor that takes as long as a Vision request"""
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def __call__(self, image_path):
+        time.sleep(self.latency)
+        number = int(re.search(r"(\d+)", os.path.basename(image_path)).group(1))
+        description, _ = COMPONENTS[number % len(COMPONENTS)]
+        return f"DigiKey PN {number:05d}-ND\nMfr PN MPN{number:05d}\n{description}"
+
+
+class FakeOpenAI:
+    """Chat client that takes as long as a gpt-4-turbo request of the same size"""
+
+    def __init__(self, latency, latency_per_entry):
+        self.latency = latency
+        self.latency_per_entry = latency_per_entry
+        self.chat = SimpleNamespace(completions=self)
+
+    def create(self, model, messages):
+        text = messages[-1]["content"].split("Text:\n", 1)[1]
+        names = re.findall(r"^Image:\s*(\S+)", text, re.MULTILINE)
+        time.sleep(self.latency + self.latency_per_entry * len(names))
+        entries = []
+        for name in names:
+            number = int(re.search(r"(\d+)", name).group(1))
+            description, component_type = COMPONENTS[number % len(COMPONENTS)]
+            entries.append(f"Image: {name}\nPart number: {number:05d}-ND\n"
+                           f"Manufacturer Part number: MPN{number:05d}\nFabricated Company: Acme\n"
+                           f"Description: {description}\nFootprint: 0603\n"
+                           f"Component Type: {component_type}")
+        content = "\n\n".join(entries)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def run_batch(photos, work_dir, vision, llm):
+    extracted = os.path.join(work_dir, "extracted_texts.txt")
+    organized = os.path.join(work_dir, "organized_texts.txt")
+    start = time.perf_counter()
+    ocr_images(photos, os.path.join(work_dir, "converted"), extracted, vision)
+    appended = organize_new_entries(llm, extracted, organized)
+    elapsed = time.perf_counter() - start
+    # Every entry is appended in one write at the end of the run
+    return elapsed, [elapsed] * len(appended)
+
+
+def run_streaming(photos, work_dir, vision, llm, args):
+    pipeline = PhotoPipeline(vision, llm, os.path.join(work_dir, "converted"),
+                             os.path.join(work_dir, "extracted_texts.txt"),
+                             os.path.join(work_dir, "organized_texts.txt"),
+                             ocr_workers=args.ocr_workers, llm_workers=args.llm_workers,
+                             llm_batch_size=args.llm_batch_size)
+    start = time.perf_counter()
+    latencies = [record.finished - start for record in pipeline.run(photos) if record.ok]
+    return time.perf_counter() - start, latencies
+
+
+def report(name, elapsed, latencies, photo_count):
+    print(f"{name:<10} {elapsed:8.2f} s   {photo_count / elapsed:6.2f} photos/s   "
+          f"first {min(latencies):6.2f} s   p50 {percentile(latencies, 0.5):6.2f} s   "
+          f"p95 {percentile(latencies, 0.95):6.2f} s   ({len(latencies)} organized)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of the batch vs streaming photo pipeline")
+    parser.add_argument("--photos", type=int, default=64)
+    parser.add_argument("--size", type=int, default=1600, help="photo width in pixels")
+    parser.add_argument("--ocr-latency", type=float, default=0.3, help="seconds per Vision request")
+    parser.add_argument("--llm-latency", type=float, default=2.0,
+                        help="seconds per OpenAI request")
+    parser.add_argument("--llm-latency-per-entry", type=float, default=0.15,
+                        help="extra seconds per entry in an OpenAI request")
+    parser.add_argument("--ocr-workers", type=int, default=8)
+    parser.add_argument("--llm-workers", type=int, default=4)
+    parser.add_argument("--llm-batch-size", type=int, default=4)
+    args = parser.parse_args()
+
+    vision = FakeVision(args.ocr_latency)
+    llm = FakeOpenAI(args.llm_latency, args.llm_latency_per_entry)
+    with tempfile.TemporaryDirectory() as photo_dir:
+        photos = make_photos(photo_dir, args.photos, args.size)
+        print(f"{args.photos} photos, Vision {args.ocr_latency} s, OpenAI {args.llm_latency} s "
+              f"+ {args.llm_latency_per_entry} s/entry")
+        with tempfile.TemporaryDirectory() as work_dir:
+            report("batch", *run_batch(photos, work_dir, vision, llm), args.photos)
+        with tempfile.TemporaryDirectory() as work_dir:
+            report("streaming", *run_streaming(photos, work_dir, vision, llm, args), args.photos)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+# ----------------------------------------------------------------------------------------
+# NOTE:
+# Benchmark for the text layout of the storage box labels (lab_inventory.labels). The
+# previous layout code is kept below as the baseline. It re-measured the whole string with
+# stringWidth after every character removed (truncation) or word added (wrapping). The
+# current code uses the cached glyph widths, prefix sums and binary search of
+# lab_inventory.text_layout.
+# Both lay out the text of the same synthetic labels (in the width left beside the scan
+# code) on a canvas that only records the drawn strings, so the timing covers text fitting
+# alone, and the two recordings are compared to check
+# that the labels come out identical. The time to write the full PDF with the current code
+# is reported for scale, once with every label's scan code to encode and once with the codes
+# already in the per-code cache.
+# Usage: python 07_benchmarks/07_04_bench_label_layout.py [--labels 10000]
+# ----------------------------------------------------------------------------------------
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+# Make the shared lab_inventory package (repository root) importable.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lab_inventory import labels as label_layout  # noqa: E402
+
+WORDS = ["RES", "CAP", "CER", "SMD", "THICK", "FILM", "0603", "0805", "1%", "5%", "1/10W",
+         "16V", "50V", "X5R", "X7R", "4.7UF", "10K", "OHM", "IC", "REG", "LINEAR", "3.3V",
+         "300MA", "SOT23-5", "MOSFET", "N-CHANNEL", "TRANSISTOR", "CONNECTOR", "HEADER",
+         "VERTICAL", "2.54MM", "AUTOMOTIVE", "AEC-Q200", "ANTI-SULFUR", "HIGH", "PRECISION"]
+
+
+def make_labels(count, seed=0):
+    rng = random.Random(seed)
+    labels = []
+    for i in range(count):
+        prefix = rng.choice("CRLIDQJ")
+        mpn = "".join(rng.choice("ABCDEFGHJKLMNPRSTUVWXYZ0123456789")
+                      for _ in range(rng.randint(6, 34)))
+        description = " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 24)))
+        if rng.random() < 0.05:
+            description = "X" * rng.randint(30, 60) + " " + description  # unbreakable word
+        labels.append((f"{prefix}{i % 128 + 1}", f"MFG/PN: {mpn}", description))
+    return labels
+
+
+class RecordingCanvas:
+    """Stands in for a ReportLab canvas and records what would be drawn"""
+
+    def __init__(self):
+        self.calls = []
+
+    def setFont(self, name, size):
+        self.calls.append(("font", name, size))
+
+    def drawString(self, x, y, text):
+        self.calls.append(("text", round(x, 6), round(y, 6), text))
+
+    def rect(self, x, y, width, height):
+        pass
+
+    def stringWidth(self, text, font_name, font_size):
+        return stringWidth(text, font_name, font_size)
+
+
+# ---- Baseline: the layout code before the glyph width cache ----------------------------
+
+def baseline_truncate(c, text, x, y, box_width, font_name, font_size):
+    c.setFont(font_name, font_size)
+    text_width = c.stringWidth(text, font_name, font_size)
+    max_width = box_width - 4
+    if text_width <= max_width:
+        c.drawString(x + (box_width - text_width) / 2, y, text)
+    else:
+        ell = label_layout.TRUNCATE_ELLIPSIS
+        while text and c.stringWidth(text + ell, font_name, font_size) > max_width:
+            text = text[:-1]
+        text += ell
+        new_width = c.stringWidth(text, font_name, font_size)
+        c.drawString(x + (box_width - new_width) / 2, y, text)
+
+
+def baseline_fit(c, text, x, y, box_width, font_name, initial_font_size, min_font_size=6):
+    size = initial_font_size
+    max_width = box_width - 4
+    while size >= min_font_size:
+        text_width = c.stringWidth(text, font_name, size)
+        if text_width <= max_width:
+            c.setFont(font_name, size)
+            c.drawString(x + (box_width - text_width) / 2, y, text)
+            return
+        size -= 1
+    c.setFont(font_name, min_font_size)
+    ell = label_layout.TRUNCATE_ELLIPSIS
+    while text and c.stringWidth(text + ell, font_name, min_font_size) > max_width:
+        text = text[:-1]
+    text += ell
+    new_width = c.stringWidth(text, font_name, min_font_size)
+    c.drawString(x + (box_width - new_width) / 2, y, text)
+
+
+def baseline_wrap(text, font_name, font_size, max_width):
+    words = text.split()
+    lines = []
+    current_line = []
+    for w in words:
+        test_line = current_line + [w] if current_line else [w]
+        if stringWidth(" ".join(test_line), font_name, font_size) <= max_width:
+            current_line.append(w)
+        else:
+            lines.append(" ".join(current_line))
+            current_line = [w]
+    if current_line:
+        lines.append(" ".join(current_line))
+    return lines
+
+
+def baseline_wrapped(c, text, x, y, box_width, box_height, font_name, font_size, line_spacing):
+    c.setFont(font_name, font_size)
+    lines = baseline_wrap(text, font_name, font_size, box_width - 4)
+    draw_y = y + box_height - font_size - 2
+    ell = label_layout.TRUNCATE_ELLIPSIS
+    for i, line in enumerate(lines):
+        if draw_y < y + 4:
+            if i > 0:
+                c.drawString(x + (box_width - stringWidth(ell, font_name, font_size)) / 2,
+                             draw_y + line_spacing, ell)
+            return draw_y
+        line_width = stringWidth(line, font_name, font_size)
+        c.drawString(x + (box_width - line_width) / 2, draw_y, line)
+        draw_y -= line_spacing
+    return draw_y
+
+
+def baseline_draw_label_text(c, label, x, y, width):
+    location, mfgpn, description = label
+    L = label_layout
+    loc_y = y + L.LABEL_HEIGHT - (L.LOCATION_FONT[1] + 2)
+    baseline_truncate(c, location, x, loc_y, width, *L.LOCATION_FONT)
+    mpn_y = loc_y - (L.MPN_FONT_SIZE + 4)
+    baseline_fit(c, mfgpn, x, mpn_y, width, L.MPN_FONT_NAME, L.MPN_FONT_SIZE,
+                 min_font_size=L.MIN_MPN_FONT_SIZE)
+    desc_top_space = mpn_y - (L.DESC_FONT[1] + 2) - y
+    if desc_top_space > 0:
+        baseline_wrapped(c, description, x, y, width, desc_top_space,
+                         L.DESC_FONT[0], L.DESC_FONT[1], L.DESC_LINE_SPACING)
+
+# -----------------------------------------------------------------------------------------
+
+
+def lay_out(draw, labels):
+    c = RecordingCanvas()
+    start = time.perf_counter()
+    for label in labels:
+        draw(c, label, 0.0, 0.0, label_layout.TEXT_WIDTH)
+    return time.perf_counter() - start, c.calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of the label text layout")
+    parser.add_argument("--labels", type=int, default=10000)
+    args = parser.parse_args()
+
+    labels = make_labels(args.labels)
+    baseline_time, baseline_calls = lay_out(baseline_draw_label_text, labels)
+    cached_time, cached_calls = lay_out(label_layout.draw_label_text, labels)
+    if cached_calls != baseline_calls:
+        mismatch = next(i for i, (a, b) in enumerate(zip(baseline_calls, cached_calls)) if a != b)
+        sys.exit(f"Layouts differ at draw call {mismatch}: "
+                 f"{baseline_calls[mismatch]} != {cached_calls[mismatch]}")
+
+    print(f"{args.labels} labels, identical layout ({len(cached_calls)} draw calls)")
+    print(f"baseline layout  {baseline_time:8.3f} s   {args.labels / baseline_time:10.0f} labels/s")
+    print(f"cached layout    {cached_time:8.3f} s   {args.labels / cached_time:10.0f} labels/s   "
+          f"({baseline_time / cached_time:.1f}x)")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        for run in ("full PDF", "codes cached"):
+            start = time.perf_counter()
+            label_layout.render_labels(labels, os.path.join(work_dir, "labels.pdf"))
+            print(f"{run:<16} {time.perf_counter() - start:8.3f} s")
+
+
+if __name__ == "__main__":
+    main()
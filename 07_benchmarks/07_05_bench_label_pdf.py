@@ -0,0 +1,70 @@
+# ----------------------------------------------------------------------------------------
+# NOTE:
+# Benchmark for sharded label PDF rendering (lab_inventory.labels.render_labels with jobs):
+# pages are rendered in a process pool and merged with pdfrw. Renders the same synthetic
+# labels (as in 07_04) with 1, 2, 4, ... processes up to the number of CPUs, and checks
+# that every merged PDF has the same pages, with the same content, as the one rendered in
+# a single process.
+# Usage: python 07_benchmarks/07_05_bench_label_pdf.py [--labels 10000] [--jobs 1 2 4]
+# ----------------------------------------------------------------------------------------
+
+import argparse
+import importlib.util
+import os
+import sys
+import tempfile
+import time
+
+from pdfrw import PdfReader
+
+# Make the shared lab_inventory package (repository root) importable.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lab_inventory.labels import code_modules, render_labels  # noqa: E402
+
+
+def load_make_labels():
+    """The synthetic labels of the layout benchmark (07_04)"""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "07_04_bench_label_layout.py")
+    spec = importlib.util.spec_from_file_location("bench_label_layout", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.make_labels
+
+
+def page_contents(pdf_path):
+    return [page.Contents.stream for page in PdfReader(pdf_path).pages]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of sharded label PDF rendering")
+    parser.add_argument("--labels", type=int, default=10000)
+    parser.add_argument("--jobs", type=int, nargs="+",
+                        help="process counts to try (default 1, 2, 4, ... up to the CPU count)")
+    args = parser.parse_args()
+
+    cpus = os.cpu_count() or 1
+    job_counts = args.jobs or sorted({1, cpus} | {2 ** i for i in range(cpus.bit_length())})
+    labels = load_make_labels()(args.labels)
+    print(f"{args.labels} labels, {cpus} CPU(s)")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        reference = None
+        baseline = None
+        for jobs in job_counts:
+            output_pdf = os.path.join(work_dir, f"labels_{jobs}.pdf")
+            # Start every run with no scan codes encoded (forked workers inherit the cache)
+            code_modules.cache_clear()
+            start = time.perf_counter()
+            render_labels(labels, output_pdf, jobs=jobs)
+            elapsed = time.perf_counter() - start
+            pages = page_contents(output_pdf)
+            if reference is None:
+                reference, baseline = pages, elapsed
+            elif pages != reference:
+                sys.exit(f"jobs={jobs}: merged PDF differs from the single-process PDF")
+            print(f"jobs {jobs:>3}   {elapsed:7.2f} s   {len(pages)} pages   "
+                  f"{baseline / elapsed:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Shared inventory code used by the pipeline scripts and the Streamlit web app."""
@@ -0,0 +1,219 @@
+"""
+Bulk lookup of a board BOM against the inventory.
+
+A BOM (CSV or XLSX with a manufacturer part number column and an optional quantity column)
+is resolved in one batch. The resolver builds its hash tables once per snapshot, so every BOM
+line costs a handful of dictionary lookups and the whole BOM is O(lines), never a scan of the
+inventory per line. Each line is matched at the first of these levels that hits:
+
+  exact       the part number as written (case-insensitive)
+  normalized  letters and digits only, so "VLMS 1500-GS08" matches "VLMS1500-GS08", and
+              Digi-Key suffixes ("...CT-ND") are dropped from internal part numbers
+  fuzzy       one character inserted, deleted or substituted (common OCR misreads such as
+              V/U), found through a one-deletion neighbourhood table; or the longest inventory
+              part number that the BOM part number starts with (ordering or packaging suffix)
+
+Only exact and normalized matches count as available: a fuzzy match may well be a different
+part (STM32F405 for STM32F407, a 10K resistor for a 10R one), so it is reported as a
+possible match for someone to check.
+"""
+
+import csv
+import io
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set
+
+import pyarrow as pa
+
+from lab_inventory.snapshot import NOT_AVAILABLE
+
+# Header names (letters and digits only, lowercase) recognised as BOM columns
+BOM_MPN_COLUMNS = ["mpn", "manufacturerpartnumber", "manufacturerpn", "mfrpartnumber", "mfrpn",
+                   "mfgpartnumber", "mfgpn", "mfrno", "partnumber", "pn"]
+BOM_QUANTITY_COLUMNS = ["qty", "quantity", "qtyperboard", "count", "amount"]
+# Rows scanned for the header line (exported BOMs often start with a title block)
+BOM_HEADER_SEARCH_ROWS = 20
+
+MATCH_EXACT = "exact"
+MATCH_NORMALIZED = "normalized"
+MATCH_FUZZY = "fuzzy"
+MATCH_NONE = "none"
+
+# Shortest compact part number that is matched fuzzily; shorter keys match too much
+FUZZY_MIN_LENGTH = 5
+
+# Digi-Key catalogue suffixes appended to a manufacturer part number
+_DIGIKEY_SUFFIX = re.compile(r"(?:ct|tr|dkr)?-?nd$")
+_NON_ALNUM = re.compile(r"[^a-z0-9]")
+
+
+def compact_part_number(part_number: str) -> str:
+    """Lowercase letters and digits only: "VLMS 1500-GS08" -> "vlms1500gs08" """
+    return _NON_ALNUM.sub("", part_number.lower()) if part_number else ""
+
+
+def _deletions(key: str) -> Set[str]:
+    """Every string obtained by deleting one character of 'key'"""
+    return {key[:i] + key[i + 1:] for i in range(len(key))}
+
+
+@dataclass
+class BomLine:
+    """One part line of a BOM"""
+    line: int
+    mpn: str
+    quantity: Optional[int] = None
+
+
+@dataclass
+class BomMatch:
+    """Resolution of one BOM line against the inventory"""
+    bom_line: BomLine
+    match: str = MATCH_NONE
+    matched_pn: str = ""
+    description: str = ""
+    locations: List[str] = field(default_factory=list)
+    # Inventory entries (boxes) holding the part
+    entries: int = 0
+
+    @property
+    def available(self) -> bool:
+        """The inventory holds this exact part"""
+        return self.entries > 0 and self.match in (MATCH_EXACT, MATCH_NORMALIZED)
+
+    @property
+    def possible(self) -> bool:
+        """The inventory holds a part whose number is close to this one (to be checked)"""
+        return self.entries > 0 and self.match == MATCH_FUZZY
+
+
+def _header_key(name) -> str:
+    return compact_part_number(str(name)) if name is not None else ""
+
+
+def _find_column(header: List[str], names: List[str]) -> Optional[int]:
+    """Index of the first header cell matching one of 'names' (in the order of 'names')"""
+    for name in names:
+        if name in header:
+            return header.index(name)
+    return None
+
+
+def _parse_quantity(value) -> Optional[int]:
+    try:
+        return int(float(str(value).strip()))
+    except (TypeError, ValueError):
+        return None
+
+
+def _read_rows(data: bytes, filename: str) -> List[List]:
+    """Raw cell rows of a CSV/TSV or XLSX file"""
+    if filename.lower().endswith((".xlsx", ".xlsm")):
+        # Only needed for Excel BOMs
+        from openpyxl import load_workbook
+        sheet = load_workbook(io.BytesIO(data), read_only=True, data_only=True).active
+        return [list(row) for row in sheet.iter_rows(values_only=True)]
+
+    text = data.decode("utf-8-sig", errors="replace")
+    # EDA tools export comma, semicolon or tab separated BOMs; use the most frequent one
+    delimiter = max(",;\t", key=text[:4096].count)
+    return list(csv.reader(io.StringIO(text), delimiter=delimiter))
+
+
+def read_bom(data: bytes, filename: str) -> List[BomLine]:
+    """
+    Parse the part lines of a BOM file. Raises ValueError when no manufacturer part number
+    column is found in the first rows.
+    """
+    rows = _read_rows(data, filename)
+    for header_row, row in enumerate(rows[:BOM_HEADER_SEARCH_ROWS]):
+        header = [_header_key(cell) for cell in row]
+        mpn_column = _find_column(header, BOM_MPN_COLUMNS)
+        if mpn_column is not None:
+            break
+    else:
+        raise ValueError("No manufacturer part number column (e.g. 'MPN') found in the BOM")
+    quantity_column = _find_column(header, BOM_QUANTITY_COLUMNS)
+
+    lines = []
+    for number, row in enumerate(rows[header_row + 1:], start=header_row + 2):
+        mpn = str(row[mpn_column]).strip() if mpn_column < len(row) and row[mpn_column] else ""
+        if not mpn:
+            continue
+        quantity = (_parse_quantity(row[quantity_column])
+                    if quantity_column is not None and quantity_column < len(row) else None)
+        lines.append(BomLine(number, mpn, quantity))
+    return lines
+
+
+class BomResolver:
+    """Hash tables over the inventory part numbers, built once per snapshot"""
+
+    def __init__(self, table: pa.Table):
+        columns = table.select(["manufacturer_pn", "part_number", "description",
+                                "location"]).to_pydict()
+        self._manufacturer_pns = columns["manufacturer_pn"]
+        self._descriptions = columns["description"]
+        self._locations = columns["location"]
+        self._exact: Dict[str, List[int]] = {}
+        self._normalized: Dict[str, List[int]] = {}
+        self._neighbours: Dict[str, List[str]] = {}
+
+        for row, (manufacturer_pn, part_number) in enumerate(
+                zip(columns["manufacturer_pn"], columns["part_number"])):
+            keys = set()
+            for value in (manufacturer_pn, part_number):
+                if not value or value == NOT_AVAILABLE:
+                    continue
+                self._exact.setdefault(value.strip().lower(), []).append(row)
+                keys.add(compact_part_number(value))
+            if part_number and part_number != NOT_AVAILABLE:
+                keys.add(_DIGIKEY_SUFFIX.sub("", compact_part_number(part_number)))
+            for key in keys - {""}:
+                self._normalized.setdefault(key, []).append(row)
+
+        for key in self._normalized:
+            if len(key) >= FUZZY_MIN_LENGTH:
+                for variant in _deletions(key) | {key}:
+                    self._neighbours.setdefault(variant, []).append(key)
+
+    def _fuzzy_rows(self, key: str) -> List[int]:
+        if len(key) < FUZZY_MIN_LENGTH:
+            return []
+        # A key within one edit shares a one-deletion variant with 'key' (or is one itself)
+        candidates = dict.fromkeys(
+            candidate for variant in _deletions(key) | {key}
+            for candidate in self._neighbours.get(variant, ()))
+        if candidates:
+            return [row for candidate in candidates for row in self._normalized[candidate]]
+        # Longest inventory part number that the BOM part number extends
+        for end in range(len(key) - 1, FUZZY_MIN_LENGTH - 1, -1):
+            rows = self._normalized.get(key[:end])
+            if rows:
+                return rows
+        return []
+
+    def resolve_line(self, bom_line: BomLine) -> BomMatch:
+        """Match one BOM line at the most precise level that finds it"""
+        key = compact_part_number(bom_line.mpn)
+        match, rows = MATCH_EXACT, self._exact.get(bom_line.mpn.strip().lower())
+        if not rows:
+            match, rows = MATCH_NORMALIZED, self._normalized.get(key)
+        if not rows:
+            match, rows = MATCH_FUZZY, self._fuzzy_rows(key)
+        if not rows:
+            return BomMatch(bom_line)
+
+        rows = list(dict.fromkeys(rows))
+        return BomMatch(
+            bom_line, match,
+            matched_pn=self._manufacturer_pns[rows[0]],
+            description=self._descriptions[rows[0]],
+            locations=sorted({self._locations[row] for row in rows
+                              if self._locations[row] != NOT_AVAILABLE}),
+            entries=len(rows))
+
+    def resolve(self, bom_lines: Iterable[BomLine]) -> List[BomMatch]:
+        """Resolve a whole BOM in one pass"""
+        return [self.resolve_line(bom_line) for bom_line in bom_lines]
@@ -0,0 +1,202 @@
+"""
+Inventory catalog: the published snapshot and the search indexes built from it.
+
+The Streamlit web app and the headless search service (lab_inventory.service) both search
+through an InventoryCatalog, so the search logic lives in one place. refresh() looks up the
+snapshot's generation (a metadata-only request) and only downloads and indexes a snapshot
+when the pipeline has published a new one. Each generation is held in a CatalogState that
+is swapped in whole, so a search that is already running keeps the state it started with.
+"""
+
+import logging
+import os
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pyarrow as pa
+
+from lab_inventory.bom import BomLine, BomMatch, BomResolver
+from lab_inventory.index import DEFAULT_TOP_K, InventoryIndex
+from lab_inventory.label_codes import LabelCode, parse_label_code
+from lab_inventory.snapshot import read_snapshot
+
+logger = logging.getLogger(__name__)
+
+# Objects published by the pipeline (05_02)
+SNAPSHOT_BLOB = "extracted_texts.arrow"
+EMBEDDINGS_BLOB = "extracted_texts.embeddings.npz"
+SUMMARY_BLOB = "inventory_summary.json"
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), "lab_inventory_snapshots")
+
+FacetSelections = Dict[str, Iterable[str]]
+
+
+@dataclass
+class ScanMatch:
+    """The inventory rows a scanned label code resolves to"""
+    code: LabelCode
+    items: List[Dict[str, str]]
+    # Nothing with this part number is at the label's location any more; items are where
+    # the part is stored now
+    relocated: bool = False
+
+
+def download_generation(blob, cache_dir: str, suffix: str) -> str:
+    """Download one generation of a blob into the cache (once) and return the local path"""
+    os.makedirs(cache_dir, exist_ok=True)
+    local_path = os.path.join(cache_dir, f"{blob.generation}{suffix}")
+    if not os.path.exists(local_path):
+        partial_path = f"{local_path}.{threading.get_ident()}.part"
+        blob.download_to_filename(partial_path)
+        os.replace(partial_path, local_path)
+    return local_path
+
+
+class CatalogState:
+    """One published snapshot generation and the indexes built from it"""
+
+    def __init__(self, generation: int, table: pa.Table):
+        self.generation = generation
+        self.table = table
+        self.index = InventoryIndex(table)
+        self.semantic_index = None
+        self.semantic_generation: Optional[int] = None
+        self._bom_resolver: Optional[BomResolver] = None
+
+    @property
+    def bom_resolver(self) -> BomResolver:
+        """BOM lookup tables, built on first use"""
+        if self._bom_resolver is None:
+            self._bom_resolver = BomResolver(self.table)
+        return self._bom_resolver
+
+
+class InventoryCatalog:
+    """Searchable view of the latest published inventory snapshot"""
+
+    def __init__(self, bucket, cache_dir: str = DEFAULT_CACHE_DIR,
+                 min_refresh_interval: float = 0.0):
+        self.bucket = bucket
+        self.cache_dir = cache_dir
+        # Lookups within this many seconds of the last one reuse the current state
+        self.min_refresh_interval = min_refresh_interval
+        self._state: Optional[CatalogState] = None
+        self._checked_at = float("-inf")
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> Optional[CatalogState]:
+        """The current state, without checking for a newer snapshot"""
+        return self._state
+
+    def refresh(self, force: bool = False) -> Optional[CatalogState]:
+        """
+        Load the latest published snapshot if it changed and return the current state.
+        A failed lookup keeps serving the previous state.
+        """
+        if not force and time.monotonic() - self._checked_at < self.min_refresh_interval:
+            return self._state
+        with self._lock:
+            try:
+                blob = self.bucket.get_blob(SNAPSHOT_BLOB)
+                if blob is None:
+                    return self._state
+                state = self._state
+                if state is None or state.generation != blob.generation:
+                    path = download_generation(blob, self.cache_dir, ".arrow")
+                    state = CatalogState(blob.generation, read_snapshot(path))
+                    logger.info(f"Loaded inventory snapshot generation {blob.generation} "
+                                f"({state.index.size} rows)")
+                self._refresh_semantic_index(state)
+                self._state = state
+                self._checked_at = time.monotonic()
+            except Exception as e:
+                logger.warning(f"Failed to refresh inventory snapshot: {e}")
+        return self._state
+
+    def _refresh_semantic_index(self, state: CatalogState) -> None:
+        """Attach the published embeddings to 'state' if they are new and match its rows"""
+        try:
+            blob = self.bucket.get_blob(EMBEDDINGS_BLOB)
+            if blob is None or blob.generation == state.semantic_generation:
+                return
+            # Imported here so the catalog works without NumPy when embeddings are not used
+            from lab_inventory.semantic import SemanticIndex
+            semantic_index = SemanticIndex.load(
+                download_generation(blob, self.cache_dir, ".npz"))
+        except Exception as e:
+            logger.warning(f"Failed to load semantic embeddings: {e}")
+            return
+        state.semantic_generation = blob.generation
+        # Row vectors are only valid for the snapshot they were built from
+        if semantic_index.size == state.index.size:
+            state.semantic_index = semantic_index
+        else:
+            logger.warning("Semantic embeddings do not match the current snapshot")
+
+    def _current(self, state: Optional[CatalogState] = None) -> CatalogState:
+        state = state or self._state or self.refresh()
+        if state is None:
+            raise LookupError("No inventory snapshot has been published")
+        return state
+
+    def search(self, part_query: str = "", value_query: str = "",
+               facet_selections: Optional[FacetSelections] = None,
+               state: Optional[CatalogState] = None) -> List[Dict[str, str]]:
+        """
+        Rows whose part numbers / description contain the queries, narrowed by facets.
+        Like the other lookups, it runs against 'state' when given (so a caller can answer
+        from the same snapshot it has already tagged) and the current snapshot otherwise.
+        """
+        index = self._current(state).index
+        bits = index.filter_bits(facet_selections or {},
+                                 index.match_bits(part_query, value_query))
+        return index.items(bits)
+
+    def rank(self, query: str, facet_selections: Optional[FacetSelections] = None,
+             k: int = DEFAULT_TOP_K,
+             state: Optional[CatalogState] = None) -> List[Tuple[Dict[str, str], float]]:
+        """BM25F ranked search across description, part numbers and footprint"""
+        index = self._current(state).index
+        return index.rank(query, index.filter_bits(facet_selections or {}), k)
+
+    def semantic_search(self, query: str, facet_selections: Optional[FacetSelections] = None,
+                        k: int = DEFAULT_TOP_K,
+                        state: Optional[CatalogState] = None) -> List[Tuple[Dict[str, str], float]]:
+        """Rows closest in meaning to the query; ranked search if there are no embeddings"""
+        state = self._current(state)
+        if state.semantic_index is None or not query.strip():
+            return self.rank(query, facet_selections, k, state)
+        index = state.index
+        hits = state.semantic_index.search(query, index.filter_bits(facet_selections or {}), k)
+        items = index.items_at(row for row, _ in hits)
+        return [(item, score) for item, (_, score) in zip(items, hits)]
+
+    def prefix_search(self, prefix: str, facet_selections: Optional[FacetSelections] = None,
+                      limit: int = DEFAULT_TOP_K,
+                      state: Optional[CatalogState] = None) -> List[Dict[str, str]]:
+        """Rows whose manufacturer or internal part number starts with 'prefix'"""
+        index = self._current(state).index
+        return index.prefix_search(prefix, index.filter_bits(facet_selections or {}), limit)
+
+    def resolve_bom(self, bom_lines: Iterable[BomLine],
+                    state: Optional[CatalogState] = None) -> List[BomMatch]:
+        """Resolve BOM lines against the inventory in one batch"""
+        return self._current(state).bom_resolver.resolve(bom_lines)
+
+    def scan(self, code: str, state: Optional[CatalogState] = None) -> ScanMatch:
+        """
+        Resolve a scanned label code to the rows of its box by exact (location, part number)
+        lookup, falling back to the part's current locations if the box has moved. Raises
+        ValueError for text that is not a label code.
+        """
+        label = parse_label_code(code)
+        index = self._current(state).index
+        rows = index.label_rows(label.location, label.mpn)
+        if rows:
+            return ScanMatch(label, index.items_at(rows))
+        rows = index.mpn_rows(label.mpn)
+        return ScanMatch(label, index.items_at(rows), relocated=bool(rows))
@@ -0,0 +1,156 @@
+"""
+Component category classifier.
+
+A single Aho-Corasick automaton over the keyword and synonym table below finds every
+keyword in a component type or description in one pass over the text, independent of the
+number of keywords. The pipeline classifies each item once at index time; the category and
+its location prefix feed location assignment (05_02), the dashboard summary and search facets.
+"""
+
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Category -> (location prefix, keywords and synonyms). Categories are listed from the most
+# to the least specific: when several match, the first listed wins, so "IC REG LINEAR" is a
+# Voltage Regulator and "IC MCU" a Microcontroller rather than a generic IC.
+# Prefixes are the ones the existing boxes of each category are shelved under in
+# 04_extracted_info/organized_texts.txt, so new parts go next to parts of the same type:
+# regulators, MCUs and other ICs share "I", connectors share "C" with capacitors, fixed
+# inductors are under "F", MOSFETs under "M" and other transistors under "T".
+CATEGORY_KEYWORDS: Dict[str, Tuple[str, List[str]]] = {
+    "Voltage Regulator": ("I", ["voltage regulator", "regulator", "reg", "rgltr", "ldo",
+                                "buck", "boost", "dc dc", "dc-dc", "dc/dc",
+                                "dc-dc converter", "buck converter", "boost converter"]),
+    "Microcontroller": ("I", ["microcontroller", "mcu", "mpu", "soc", "fpga"]),
+    "Sensor": ("S", ["sensor", "imu", "accelerometer", "gyroscope", "gyro", "magnetometer",
+                     "thermistor"]),
+    "Oscillator": ("O", ["oscillator", "osc", "crystal", "xtal", "resonator"]),
+    # A bare "converter" is just as often an ADC or DAC, so it is not a regulator keyword
+    "IC": ("I", ["ic", "integrated circuit", "eeprom", "flash", "memory", "adc", "dac",
+                 "driver", "drvr", "transceiver", "txrx", "serializer", "deserializer",
+                 "ser/des", "serdes", "translator", "op amp", "opamp", "amplifier",
+                 "comparator", "current source", "charger", "ctrlr", "controller"]),
+    "Ferrite": ("F", ["ferrite", "ferrite bead", "ferrite chip"]),
+    "Inductor": ("F", ["inductor", "ind", "fixed ind", "choke"]),
+    "Capacitor": ("C", ["capacitor", "cap", "mlcc", "cer", "tant", "electrolytic"]),
+    "Resistor": ("R", ["resistor", "res", "r_", "potentiometer", "trimmer"]),
+    "LED": ("L", ["led", "leds"]),
+    "Diode": ("D", ["diode", "schottky", "tvs", "zener", "rectifier"]),
+    "MOSFET": ("M", ["mosfet", "fet"]),
+    "Transistor": ("T", ["transistor", "phototransistor", "trans", "bjt", "npn", "pnp"]),
+    "Connector": ("C", ["connector", "conn", "header", "receptacle", "jack", "plug"]),
+    # No boxes yet: the first letter of "Switch", as unclassified types get
+    "Switch": ("S", ["switch", "relay", "button"]),
+}
+
+_PRIORITY = {category: rank for rank, category in enumerate(CATEGORY_KEYWORDS)}
+
+
+@dataclass(frozen=True)
+class Category:
+    """A component category and the location prefix its boxes are shelved under"""
+    name: str
+    location_prefix: str
+
+
+class AhoCorasick:
+    """Aho-Corasick automaton reporting whole-word keyword matches in linear time"""
+
+    def __init__(self, keywords: Dict[str, str]):
+        """'keywords' maps each (lowercase) keyword to the value reported when it matches"""
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[str]] = [[]]
+        self._values = keywords
+        for keyword in keywords:
+            self._add(keyword)
+        self._build_failure_links()
+
+    def _add(self, keyword: str) -> None:
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = next_state
+        self._out[state].append(keyword)
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                if self._fail[next_state] == next_state:
+                    self._fail[next_state] = 0
+                self._out[next_state] += self._out[self._fail[next_state]]
+
+    def find(self, text: str) -> Iterator[Tuple[str, str, int]]:
+        """Yield (value, keyword, start) for every whole-word keyword occurrence in 'text'"""
+        text = text.lower()
+        state = 0
+        for end, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for keyword in self._out[state]:
+                start = end - len(keyword) + 1
+                if _is_whole_word(text, keyword, start, end + 1):
+                    yield self._values[keyword], keyword, start
+
+
+def _is_whole_word(text: str, keyword: str, start: int, end: int) -> bool:
+    """A keyword edge that is alphanumeric must not continue into a neighbouring alphanumeric"""
+    if keyword[0].isalnum() and start > 0 and text[start - 1].isalnum():
+        return False
+    if keyword[-1].isalnum() and end < len(text) and text[end].isalnum():
+        return False
+    return True
+
+
+_AUTOMATON = AhoCorasick({
+    keyword: category
+    for category, (_, keywords) in CATEGORY_KEYWORDS.items()
+    for keyword in keywords
+})
+
+
+def _best_category(text: str) -> Optional[str]:
+    best = None
+    for category, _, _ in _AUTOMATON.find(text):
+        if best is None or _PRIORITY[category] < _PRIORITY[best]:
+            best = category
+    return best
+
+
+def classify_component(component_type: str, description: str = "") -> Optional[Category]:
+    """
+    Classify an item by its component type, falling back to its description.
+    Returns None when neither mentions a known keyword.
+    """
+    for text in (component_type, description):
+        name = _best_category(text or "")
+        if name:
+            return Category(name, CATEGORY_KEYWORDS[name][0])
+    return None
+
+
+def location_prefix(component_type: str, description: str = "") -> str:
+    """
+    Location prefix for an item: its category's prefix, else the first letter of the
+    component type, else "X".
+    """
+    category = classify_component(component_type, description)
+    if category:
+        return category.location_prefix
+    component_type = (component_type or "").strip()
+    return component_type[0].upper() if component_type else "X"
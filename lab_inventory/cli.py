@@ -0,0 +1,281 @@
+"""
+The inventory command line, installed as `inventory` (see pyproject.toml):
+
+  inventory ocr        read new photos in 01_inventory_original_files with Google Cloud Vision
+  inventory organize   extract the fields of new OCR entries with OpenAI, assign box locations
+  inventory publish    upload the organized inventory, snapshot and embeddings
+  inventory dedupe     give entries that share a part number one location (offline)
+  inventory labels     render the storage box labels PDF, or only new or moved ones (offline)
+  inventory check      list photos that have no organized entry yet (offline)
+  inventory reorders   list the reorder request queue
+  inventory serve      run the search service (lab_inventory.service)
+  inventory run        run the whole pipeline as a dependency graph, as 05_00 does
+
+Paths and credentials come from a TOML config file: --config, $INVENTORY_CONFIG, or
+inventory.toml in the current folder or the repository (see inventory.example.toml).
+Without one, the numbered folders of the repository itself are used. The commands run the
+stages of lab_inventory.pipeline.stages, which import their SDKs only when they run, so
+the offline commands start without loading Vision, OpenAI, Firebase or Arrow.
+
+--jobs N sends up to N Vision or OpenAI requests at once and renders labels in N
+processes. --profile runs each stage under cProfile and prints its most expensive calls
+and a per-stage timing table; --profile-dir also saves a <stage>.prof file per stage for
+pstats or snakeviz.
+"""
+
+import argparse
+import cProfile
+import logging
+import os
+import pstats
+import sys
+from dataclasses import dataclass, field, fields, replace
+from typing import Any, Callable, Dict, List, Optional
+
+from lab_inventory.label_ledger import LATEST_BATCH
+from lab_inventory.pipeline.paths import REPO_ROOT, PipelinePaths
+
+logger = logging.getLogger(__name__)
+
+CONFIG_ENV = "INVENTORY_CONFIG"
+CONFIG_FILE = "inventory.toml"
+FIREBASE_BUCKET = "aharonilabinventory.appspot.com"
+# Functions listed per stage by --profile
+PROFILE_LINES = 20
+
+# Command -> the pipeline stages it runs (None = every stage)
+STAGE_COMMANDS: Dict[str, Optional[List[str]]] = {
+    "ocr": ["ocr"],
+    "organize": ["organize"],
+    "publish": ["publish"],
+    "labels": ["labels"],
+    "check": ["counts"],
+    "reorders": ["reorders"],
+    "run": None,
+}
+
+
+@dataclass
+class InventoryConfig:
+    """Settings from the config file; command-line flags override them"""
+    root: str = REPO_ROOT
+    # PipelinePaths fields to point somewhere other than their folder under root
+    paths: Dict[str, str] = field(default_factory=dict)
+    vision_credentials: Optional[str] = None
+    firebase_credentials: Optional[str] = None
+    bucket: str = FIREBASE_BUCKET
+    # A local folder standing in for the bucket (lab_inventory.local_storage)
+    local_dir: Optional[str] = None
+    service_url: Optional[str] = None
+    jobs: int = 1
+
+    @classmethod
+    def load(cls, path: Optional[str]) -> "InventoryConfig":
+        """Read a config file (relative paths in it are relative to the file); None = defaults"""
+        config = cls(service_url=os.environ.get("INVENTORY_SERVICE_URL"))
+        if path is None:
+            return config
+        import tomllib
+        with open(path, "rb") as f:
+            data = tomllib.load(f)
+
+        base = os.path.dirname(os.path.abspath(path))
+
+        def resolve(value: Optional[str]) -> Optional[str]:
+            return os.path.normpath(os.path.join(base, os.path.expanduser(value))) if value else value
+
+        google = data.get("google", {})
+        firebase = data.get("firebase", {})
+        return replace(
+            config,
+            root=resolve(data.get("root")) or config.root,
+            paths={name: resolve(value) for name, value in data.get("paths", {}).items()},
+            vision_credentials=resolve(google.get("credentials")),
+            firebase_credentials=resolve(firebase.get("credentials")),
+            bucket=firebase.get("bucket", config.bucket),
+            local_dir=resolve(firebase.get("local_dir")),
+            service_url=data.get("service_url", config.service_url),
+            jobs=int(data.get("jobs", config.jobs)),
+        )
+
+    def pipeline_paths(self) -> PipelinePaths:
+        known = {f.name for f in fields(PipelinePaths)}
+        unknown = set(self.paths) - known
+        if unknown:
+            raise ValueError(f"Unknown path(s) in the config file: {', '.join(sorted(unknown))}")
+        return replace(PipelinePaths.in_directory(self.root), **self.paths)
+
+    def open_bucket(self):
+        from lab_inventory.local_storage import open_bucket
+        return open_bucket(self.local_dir, self.firebase_credentials, self.bucket)
+
+
+def find_config(path: Optional[str] = None) -> Optional[str]:
+    """The config file to use: the given one, $INVENTORY_CONFIG, or an inventory.toml found
+    in the current folder or the repository"""
+    if path:
+        return path
+    if os.environ.get(CONFIG_ENV):
+        return os.environ[CONFIG_ENV]
+    for folder in (os.getcwd(), REPO_ROOT):
+        candidate = os.path.join(folder, CONFIG_FILE)
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def profiled(name: str, run: Callable[..., Any], profile_dir: Optional[str]) -> Callable[..., Any]:
+    """run() under cProfile; prints the most expensive calls to stderr when it returns"""
+    def wrapper(*args):
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(run, *args)
+        finally:
+            print(f"\n--- profile: {name} ---", file=sys.stderr)
+            stats = pstats.Stats(profiler, stream=sys.stderr)
+            stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(PROFILE_LINES)
+            if profile_dir:
+                os.makedirs(profile_dir, exist_ok=True)
+                stats.dump_stats(os.path.join(profile_dir, f"{name}.prof"))
+    return wrapper
+
+
+def run_stages(args: argparse.Namespace, config: InventoryConfig, paths: PipelinePaths) -> int:
+    from lab_inventory.pipeline.dag import (BLOCKED, FAILED, INCOMPLETE, PipelineRunner,
+                                           format_report)
+    from lab_inventory.pipeline.stages import PipelineContext, build_stages
+
+    if config.vision_credentials:
+        os.environ.setdefault("GOOGLE_APPLICATION_CREDENTIALS", config.vision_credentials)
+    first_slot = 0
+    if args.command == "labels":
+        from lab_inventory.labels import start_slot
+        first_slot = start_slot(args.start_row, args.start_col)
+    context = PipelineContext(paths, config.open_bucket, config.service_url, config.jobs,
+                              getattr(args, "max_chunks", None),
+                              getattr(args, "changed_since", None), first_slot)
+    stages = build_stages(context)
+    if args.profile:
+        stages = [replace(stage, run=profiled(stage.name, stage.run, args.profile_dir))
+                  for stage in stages]
+    runner = PipelineRunner(stages, paths.run_state_file)
+
+    if args.command == "run":
+        reports = runner.run(args.stages, args.force)
+    else:
+        # A stage asked for by name runs even if its inputs are unchanged
+        reports = runner.run(STAGE_COMMANDS[args.command], force=True)
+    if args.profile or args.command == "run":
+        print(format_report(reports))
+    return 1 if any(report.status in (FAILED, BLOCKED, INCOMPLETE) for report in reports) else 0
+
+
+def dedupe(args: argparse.Namespace, config: InventoryConfig, paths: PipelinePaths) -> int:
+    from lab_inventory.pipeline.organize import unify_duplicate_locations
+    unify = unify_duplicate_locations
+    if args.profile:
+        unify = profiled("dedupe", unify, args.profile_dir)
+    if unify(paths.organized_file):
+        logger.info("Duplicate locations updated in the output file.")
+    else:
+        logger.info("No duplicate part numbers found.")
+    return 0
+
+
+def serve(args: argparse.Namespace, config: InventoryConfig, paths: PipelinePaths) -> int:
+    import uvicorn
+
+    from lab_inventory.catalog import InventoryCatalog
+    from lab_inventory.service import DEFAULT_PORT, REFRESH_INTERVAL, create_app
+    catalog = InventoryCatalog(config.open_bucket())
+    app = create_app(catalog, args.refresh_interval or REFRESH_INTERVAL)
+    uvicorn.run(app, host=args.host, port=args.port or DEFAULT_PORT)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    # Options accepted before or after the command; SUPPRESS keeps a value given before the
+    # command from being reset by the subcommand's default
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--config", default=argparse.SUPPRESS,
+                        help=f"TOML config file (default ${CONFIG_ENV} or ./{CONFIG_FILE})")
+    common.add_argument("--root", default=argparse.SUPPRESS,
+                        help="folder holding the numbered pipeline folders (01_..., 04_...)")
+    common.add_argument("--jobs", type=int, default=argparse.SUPPRESS,
+                        help="concurrent Vision / OpenAI requests and label render processes")
+    common.add_argument("--local-dir", default=argparse.SUPPRESS,
+                        help="use a local folder in place of the bucket")
+    common.add_argument("--credentials", default=argparse.SUPPRESS,
+                        help="Firebase service account JSON")
+    common.add_argument("--profile", action="store_true", default=argparse.SUPPRESS,
+                        help="profile each stage with cProfile and print a timing table")
+    common.add_argument("--profile-dir", default=argparse.SUPPRESS,
+                        help="also save <stage>.prof files in this folder")
+
+    parser = argparse.ArgumentParser(prog="inventory", parents=[common],
+                                     description="Lab electronics inventory pipeline")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def add(name: str, help_text: str, handler, aliases=()) -> argparse.ArgumentParser:
+        command = commands.add_parser(name, parents=[common], help=help_text,
+                                      aliases=list(aliases))
+        command.set_defaults(handler=handler, command=name)
+        return command
+
+    add("ocr", "OCR new photos with Google Cloud Vision", run_stages)
+    organize = add("organize", "organize new OCR entries with OpenAI", run_stages)
+    organize.add_argument("--max-chunks", type=int, help="send at most this many chunks to OpenAI")
+    add("publish", "upload the organized inventory", run_stages)
+    add("dedupe", "unify the locations of duplicate part numbers", dedupe)
+    labels = add("labels", "render the storage box labels PDF", run_stages)
+    labels.add_argument("--output", help="PDF to write (default 04_extracted_info/labels.pdf)")
+    labels.add_argument("--changed-since", type=int, nargs="?", const=LATEST_BATCH, metavar="BATCH",
+                        help="only labels new or changed since this print batch "
+                             "(default: the last one) of the printed-labels ledger")
+    labels.add_argument("--start-row", type=int, default=1,
+                        help="first free row on a partly used sheet (1 = top)")
+    labels.add_argument("--start-col", type=int, default=1,
+                        help="first free column on a partly used sheet (1 = left)")
+    add("check", "list photos without an organized entry", run_stages, aliases=["counts"])
+    add("reorders", "list the reorder request queue", run_stages)
+
+    serve_parser = add("serve", "run the search service", serve)
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, help="default 8000")
+    serve_parser.add_argument("--refresh-interval", type=float,
+                              help="seconds between checks for a new snapshot (default 30)")
+
+    run = add("run", "run the whole pipeline", run_stages)
+    run.add_argument("--stages", nargs="+", help="run only these stages")
+    run.add_argument("--force", action="store_true",
+                     help="run stages even if their inputs are unchanged")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    config = InventoryConfig.load(find_config(getattr(args, "config", None)))
+    overrides = {name: getattr(args, flag) for name, flag in
+                 (("root", "root"), ("jobs", "jobs"), ("local_dir", "local_dir"),
+                  ("firebase_credentials", "credentials")) if hasattr(args, flag)}
+    config = replace(config, **overrides)
+    try:
+        paths = config.pipeline_paths()
+    except ValueError as e:
+        parser.error(str(e))
+    if getattr(args, "output", None):
+        paths = replace(paths, labels_file=os.path.abspath(args.output))
+    args.profile = getattr(args, "profile", False)
+    args.profile_dir = getattr(args, "profile_dir", None)
+    try:
+        return args.handler(args, config, paths)
+    except ValueError as e:
+        # Unknown stage names or config paths
+        parser.error(str(e))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+"""
+Normalization of component photos before they are uploaded.
+
+Phone photos arrive as multi-megabyte JPEGs with EXIF metadata (GPS position, camera data).
+Each photo is rotated upright from its EXIF orientation, downsampled to at most
+max_dimension pixels on its longest side, re-encoded as JPEG, WebP or AVIF without EXIF,
+and paired with a small WebP thumbnail (JPEG where Pillow was built without WebP). That
+cuts storage, egress and the cost of any later OCR over the uploaded photos.
+
+Photos are processed in a thread pool: Pillow releases the GIL while decoding, resizing and
+encoding, so threads use several cores without the start-up cost of a process pool inside
+the web app.
+"""
+
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from PIL import Image, ImageOps, features
+
+logger = logging.getLogger(__name__)
+
+PHOTO_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+# Output format -> (file extension, content type, Pillow feature needed to encode it)
+IMAGE_FORMATS: Dict[str, Tuple[str, str, Optional[str]]] = {
+    "JPEG": (".jpg", "image/jpeg", None),
+    "WEBP": (".webp", "image/webp", "webp"),
+    "AVIF": (".avif", "image/avif", "avif"),
+}
+DEFAULT_MAX_DIMENSION = 2048
+DEFAULT_QUALITY = 85
+THUMBNAIL_SIZE = 256
+# Thumbnail formats in order of preference (JPEG can always be encoded)
+THUMBNAIL_FORMATS = ["WEBP", "JPEG"]
+THUMBNAIL_QUALITY = 75
+THUMBNAIL_PREFIX = "component_thumbnails/"
+MAX_IMAGE_WORKERS = min(8, os.cpu_count() or 1)
+
+
+@dataclass
+class ImageOptions:
+    """How uploaded photos are normalized"""
+    max_dimension: int = DEFAULT_MAX_DIMENSION
+    format: str = "JPEG"
+    quality: int = DEFAULT_QUALITY
+    thumbnail_size: int = THUMBNAIL_SIZE
+
+
+@dataclass
+class ProcessedPhoto:
+    """A normalized photo and its thumbnail, ready to upload"""
+    name: str
+    data: bytes
+    content_type: str
+    thumbnail: bytes
+    original_size: int
+    thumbnail_content_type: str = "image/webp"
+
+
+def is_photo(file_name: str) -> bool:
+    return os.path.splitext(file_name)[1].lower() in PHOTO_EXTENSIONS
+
+
+def supported_formats() -> List[str]:
+    """Output formats this Pillow build can encode"""
+    return [name for name, (_, _, feature) in IMAGE_FORMATS.items()
+            if feature is None or features.check(feature)]
+
+
+def thumbnail_format() -> str:
+    """The format thumbnails are encoded in by this Pillow build"""
+    available = supported_formats()
+    return next(name for name in THUMBNAIL_FORMATS if name in available)
+
+
+def thumbnail_object_name(uploader_name: str, file_name: str) -> str:
+    """Storage path of a photo's thumbnail (kept outside component_images/ so the
+    ingest pipeline does not treat thumbnails as photos)"""
+    stem = os.path.splitext(file_name)[0]
+    extension = IMAGE_FORMATS[thumbnail_format()][0]
+    return f"{THUMBNAIL_PREFIX}{uploader_name}/{stem}{extension}"
+
+
+def _open_upright(data: bytes, max_dimension: int) -> Image.Image:
+    image = Image.open(io.BytesIO(data))
+    # JPEG can decode directly at 1/2, 1/4 or 1/8 scale, which is much faster than a
+    # full decode followed by a resize
+    image.draft("RGB", (max_dimension, max_dimension))
+    return ImageOps.exif_transpose(image)
+
+
+def _encode(image: Image.Image, image_format: str, quality: int) -> bytes:
+    """Encode without EXIF or other metadata (only the colour profile is kept)"""
+    if image_format == "JPEG" and image.mode != "RGB":
+        if image.mode in ("RGBA", "LA", "P"):
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, "white")
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        else:
+            image = image.convert("RGB")
+    elif image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+
+    output = io.BytesIO()
+    options = {"quality": quality}
+    if image_format == "JPEG":
+        options.update(optimize=True, progressive=True)
+    icc_profile = image.info.get("icc_profile")
+    if icc_profile:
+        options["icc_profile"] = icc_profile
+    image.save(output, format=image_format, **options)
+    return output.getvalue()
+
+
+def process_photo(name: str, data: bytes, options: ImageOptions = ImageOptions()) -> ProcessedPhoto:
+    """Downsample, strip EXIF and re-encode one photo, and make its thumbnail"""
+    image_format = options.format.upper()
+    if image_format not in supported_formats():
+        logger.warning(f"{image_format} encoding is not available; using JPEG")
+        image_format = "JPEG"
+    extension, content_type, _ = IMAGE_FORMATS[image_format]
+
+    image = _open_upright(data, options.max_dimension)
+    image.thumbnail((options.max_dimension, options.max_dimension), Image.LANCZOS)
+    encoded = _encode(image, image_format, options.quality)
+
+    thumbnail = image.copy()
+    thumbnail.thumbnail((options.thumbnail_size, options.thumbnail_size), Image.LANCZOS)
+    thumbnail_image_format = thumbnail_format()
+    return ProcessedPhoto(
+        name=os.path.splitext(name)[0] + extension,
+        data=encoded,
+        content_type=content_type,
+        thumbnail=_encode(thumbnail, thumbnail_image_format, THUMBNAIL_QUALITY),
+        original_size=len(data),
+        thumbnail_content_type=IMAGE_FORMATS[thumbnail_image_format][1],
+    )
+
+
+def process_photos(photos: List[Tuple[str, bytes]], options: ImageOptions = ImageOptions(),
+                   max_workers: int = MAX_IMAGE_WORKERS) -> List[Optional[ProcessedPhoto]]:
+    """
+    Process (name, data) photos in a worker pool, in input order. A photo that cannot be
+    decoded yields None, so the caller can upload the original instead.
+    """
+    def process(photo: Tuple[str, bytes]) -> Optional[ProcessedPhoto]:
+        try:
+            return process_photo(photo[0], photo[1], options)
+        except Exception as e:
+            logger.warning(f"Could not process photo {photo[0]}: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(photos)))) as pool:
+        return list(pool.map(process, photos))
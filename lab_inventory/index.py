@@ -0,0 +1,320 @@
+"""
+In-memory search index over an inventory snapshot.
+
+Row sets are bitmaps held as Python ints (bit i = snapshot row i), so combining filters is a
+bitwise AND and counting is int.bit_count(). Facet bitmaps are built once per snapshot; a
+query never rescans the inventory to filter or count facets.
+
+Ranked retrieval uses BM25F over the tokenized part numbers, footprint and description: the
+field-weighted, length-normalized and saturated term frequency of every (term, row) pair and
+the idf of every term are precomputed, so a query only walks the postings of its own terms
+and takes the top k with a heap.
+
+Search-as-you-type uses a sorted array of normalized part numbers: a prefix is a contiguous
+range found with two binary searches, and recent prefixes are kept in an LRU cache.
+
+Scanned label codes (lab_inventory.label_codes) resolve through dictionaries keyed by the
+normalized (location, manufacturer part number) of every row, and by the part number alone
+for a box that has moved since its label was printed: one hash lookup per scan.
+"""
+
+import heapq
+import math
+import re
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from lab_inventory.snapshot import NOT_AVAILABLE, normalize_search_key
+
+# Snapshot column -> facet label shown in the UI
+FACET_FIELDS = {
+    "category": "Component Type",
+    "footprint": "Footprint",
+    "company_made": "Supplier",
+    "location_prefix": "Location Prefix",
+}
+
+ITEM_FIELDS = ["manufacturer_pn", "part_number", "description", "location", "company_made"]
+
+# Ranked search: snapshot column -> BM25F field weight
+RANK_FIELD_WEIGHTS = {
+    "manufacturer_pn": 3.0,
+    "part_number": 2.0,
+    "footprint": 1.5,
+    "description": 1.0,
+}
+# Part number fields are also indexed as one compact token ("LTST-C191KGKT" -> "ltstc191kgkt")
+PART_NUMBER_FIELDS = {"manufacturer_pn", "part_number"}
+BM25_K1 = 1.2
+BM25_B = 0.75
+DEFAULT_TOP_K = 100
+PREFIX_CACHE_SIZE = 512
+# Normalized part number columns searched by prefix
+PREFIX_KEY_FIELDS = ["norm_manufacturer_pn", "norm_part_number"]
+
+# Words and numbers, keeping decimal values such as "4.7uf" or "3.3v" in one token
+_TOKEN = re.compile(r"[a-z0-9]+(?:\.[a-z0-9]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase search terms"""
+    return _TOKEN.findall(text.lower()) if text else []
+
+
+def field_terms(field: str, value: Optional[str]) -> List[str]:
+    """Terms indexed for one field value"""
+    if not value or value == NOT_AVAILABLE:
+        return []
+    terms = tokenize(value)
+    if field in PART_NUMBER_FIELDS and len(terms) > 1:
+        terms.append("".join(terms))
+    return terms
+
+
+def query_terms(query: str) -> List[str]:
+    """Distinct terms of a query, plus its compact form so a hyphenated part number matches"""
+    terms = tokenize(query)
+    if len(terms) > 1:
+        terms.append("".join(terms))
+    return list(dict.fromkeys(terms))
+
+
+def label_key(value: Optional[str]) -> str:
+    """Normalized location or part number as printed on a label ("" when there is none)"""
+    if not value or value == NOT_AVAILABLE:
+        return ""
+    return normalize_search_key(value)
+
+
+def bits_from_indices(indices: Iterable[int], size: int) -> int:
+    """Build a bitmap from row indices in O(size) without repeated big-int shifts"""
+    buffer = bytearray((size + 7) // 8)
+    for index in indices:
+        buffer[index >> 3] |= 1 << (index & 7)
+    return int.from_bytes(buffer, "little")
+
+
+def bits_from_mask(mask) -> int:
+    """Convert an Arrow boolean mask into a bitmap; Arrow packs booleans LSB-first like int bits"""
+    array = pc.fill_null(mask, False)
+    if isinstance(array, pa.ChunkedArray):
+        array = array.combine_chunks()
+    if array.offset:
+        array = pa.concat_arrays([array])  # re-materialize at offset 0
+    data = array.buffers()[1]
+    bits = int.from_bytes(data.to_pybytes(), "little") if data is not None else 0
+    return bits & ((1 << len(array)) - 1)
+
+
+def iter_bits(bits: int) -> Iterator[int]:
+    """Yield the set bit positions of a bitmap in increasing order"""
+    position = 0
+    for byte in bits.to_bytes((bits.bit_length() + 7) // 8, "little"):
+        while byte:
+            low = byte & -byte
+            yield position + low.bit_length() - 1
+            byte ^= low
+        position += 8
+
+
+class InventoryIndex:
+    """Search index built once per published snapshot"""
+
+    def __init__(self, table: pa.Table):
+        self.table = table
+        self.size = table.num_rows
+        self.all_bits = (1 << self.size) - 1
+        self._items = table.select(ITEM_FIELDS).to_pylist()
+        self.facets: Dict[str, Dict[str, int]] = {
+            field: self._build_facet(table.column(field).to_pylist())
+            for field in FACET_FIELDS
+        }
+        self._build_rank_index()
+        self._build_prefix_keys()
+        self._build_label_keys()
+        # Per-index LRU so cached results never outlive the snapshot they came from
+        self.prefix_rows = lru_cache(maxsize=PREFIX_CACHE_SIZE)(self._prefix_rows)
+
+    def _build_facet(self, values: List[Optional[str]]) -> Dict[str, int]:
+        rows_by_value: Dict[str, List[int]] = {}
+        for row, value in enumerate(values):
+            if value and value != NOT_AVAILABLE:
+                rows_by_value.setdefault(value, []).append(row)
+        return {value: bits_from_indices(rows, self.size)
+                for value, rows in sorted(rows_by_value.items())}
+
+    def _build_rank_index(self) -> None:
+        """Precompute BM25F postings (term -> [(row, saturated tf)]) and idf per term"""
+        terms_by_field = {
+            field: [field_terms(field, value) for value in self.table.column(field).to_pylist()]
+            for field in RANK_FIELD_WEIGHTS
+        }
+        average_length = {
+            field: (sum(len(terms) for terms in rows) / self.size if self.size else 0) or 1.0
+            for field, rows in terms_by_field.items()
+        }
+
+        postings: Dict[str, List[Tuple[int, float]]] = {}
+        for row in range(self.size):
+            weighted_tf: Dict[str, float] = {}
+            for field, weight in RANK_FIELD_WEIGHTS.items():
+                terms = terms_by_field[field][row]
+                if not terms:
+                    continue
+                term_weight = weight / (1 - BM25_B + BM25_B * len(terms) / average_length[field])
+                for term in terms:
+                    weighted_tf[term] = weighted_tf.get(term, 0.0) + term_weight
+            for term, tf in weighted_tf.items():
+                postings.setdefault(term, []).append((row, tf * (BM25_K1 + 1) / (tf + BM25_K1)))
+
+        self._postings = postings
+        self._idf = {
+            term: math.log(1 + (self.size - len(rows) + 0.5) / (len(rows) + 0.5))
+            for term, rows in postings.items()
+        }
+
+    def _build_prefix_keys(self) -> None:
+        """Sorted (key, row) arrays over the normalized part numbers"""
+        pairs = set()
+        for field in PREFIX_KEY_FIELDS:
+            for row, key in enumerate(self.table.column(field).to_pylist()):
+                if key and key != normalize_search_key(NOT_AVAILABLE):
+                    pairs.add((key, row))
+        ordered = sorted(pairs)
+        self._prefix_keys = [key for key, _ in ordered]
+        self._prefix_key_rows = [row for _, row in ordered]
+
+    def _build_label_keys(self) -> None:
+        """Rows per normalized (location, manufacturer part number) and per part number"""
+        label_rows: Dict[Tuple[str, str], List[int]] = {}
+        mpn_rows: Dict[str, List[int]] = {}
+        locations = self.table.column("location").to_pylist()
+        mpns = self.table.column("manufacturer_pn").to_pylist()
+        for row, (location, mpn) in enumerate(zip(locations, mpns)):
+            key = (label_key(location), label_key(mpn))
+            label_rows.setdefault(key, []).append(row)
+            if key[1]:
+                mpn_rows.setdefault(key[1], []).append(row)
+        self._label_rows = {key: tuple(rows) for key, rows in label_rows.items()}
+        self._mpn_rows = {key: tuple(rows) for key, rows in mpn_rows.items()}
+
+    def label_rows(self, location: str, mpn: str) -> Tuple[int, ...]:
+        """Rows of the box a label was printed for: same location and manufacturer part number"""
+        return self._label_rows.get((label_key(location), label_key(mpn)), ())
+
+    def mpn_rows(self, mpn: str) -> Tuple[int, ...]:
+        """Rows with this manufacturer part number, wherever they are stored"""
+        return self._mpn_rows.get(label_key(mpn), ())
+
+    def _prefix_rows(self, prefix: str) -> Tuple[int, ...]:
+        """Rows with a part number starting with 'prefix', in part number order (LRU cached)"""
+        prefix = normalize_search_key(prefix)
+        if not prefix:
+            return ()
+        start = bisect_left(self._prefix_keys, prefix)
+        # Every key with this prefix sorts before prefix + the highest code point
+        end = bisect_left(self._prefix_keys, prefix + "\U0010ffff", lo=start)
+        return tuple(dict.fromkeys(self._prefix_key_rows[start:end]))
+
+    def prefix_bits(self, prefix: str) -> int:
+        """Rows with a part number starting with 'prefix' (all rows for an empty prefix)"""
+        if not normalize_search_key(prefix):
+            return self.all_bits
+        return bits_from_indices(self.prefix_rows(prefix), self.size)
+
+    def prefix_search(self, prefix: str, bits: Optional[int] = None,
+                      limit: int = DEFAULT_TOP_K) -> List[Dict[str, str]]:
+        """Items whose part number starts with 'prefix', restricted to 'bits'"""
+        rows = self.prefix_rows(prefix)
+        if bits is not None and bits != self.all_bits:
+            allowed = set(iter_bits(bits_from_indices(rows, self.size) & bits))
+            rows = [row for row in rows if row in allowed]
+        return [self._items[row] for row in rows[:limit]]
+
+    def query_bits(self, query: str) -> int:
+        """Rows containing at least one term of a ranked query (all rows for an empty query)"""
+        terms = query_terms(query)
+        if not terms:
+            return self.all_bits
+        return bits_from_indices(
+            (row for term in terms for row, _ in self._postings.get(term, ())), self.size)
+
+    def rank(self, query: str, bits: Optional[int] = None,
+             k: int = DEFAULT_TOP_K) -> List[Tuple[Dict[str, str], float]]:
+        """
+        Return the top 'k' rows for a free-text query by BM25F score, restricted to 'bits'.
+        Without query terms, all rows in 'bits' are returned in snapshot order with score 0.
+        """
+        terms = query_terms(query)
+        if not terms:
+            rows = iter_bits(self.all_bits if bits is None else bits)
+            return [(self._items[row], 0.0) for row in rows]
+
+        scores: Dict[int, float] = {}
+        for term in terms:
+            idf = self._idf.get(term)
+            if idf is None:
+                continue
+            for row, saturated_tf in self._postings[term]:
+                scores[row] = scores.get(row, 0.0) + idf * saturated_tf
+
+        if bits is not None and bits != self.all_bits:
+            allowed = bits_from_indices(scores, self.size) & bits
+            scores = {row: scores[row] for row in iter_bits(allowed)}
+
+        top = heapq.nlargest(k, scores.items(), key=lambda pair: pair[1])
+        return [(self._items[row], score) for row, score in top]
+
+    def match_bits(self, part_query: str = "", value_query: str = "") -> int:
+        """Rows whose part numbers / description contain the normalized queries"""
+        bits = self.all_bits
+        if part_query:
+            query = normalize_search_key(part_query)
+            bits &= bits_from_mask(pc.or_(
+                pc.match_substring(self.table["norm_manufacturer_pn"], query),
+                pc.match_substring(self.table["norm_part_number"], query)))
+        if value_query:
+            bits &= bits_from_mask(pc.match_substring(
+                self.table["norm_description"], normalize_search_key(value_query)))
+        return bits
+
+    def filter_bits(self, selections: Dict[str, Iterable[str]], base: Optional[int] = None) -> int:
+        """Intersect 'base' with the facet selections (OR within a facet, AND across facets)"""
+        bits = self.all_bits if base is None else base
+        for field, values in selections.items():
+            values = list(values)
+            if not values:
+                continue
+            facet = self.facets[field]
+            field_bits = 0
+            for value in values:
+                field_bits |= facet.get(value, 0)
+            bits &= field_bits
+        return bits
+
+    def facet_counts(self, selections: Dict[str, Iterable[str]],
+                     base: Optional[int] = None) -> Dict[str, Dict[str, int]]:
+        """
+        Count each facet value within 'base' and the selections on the other facets, so the
+        counts show how many results picking that value would give.
+        """
+        selections = {field: list(values) for field, values in selections.items()}
+        counts = {}
+        for field, facet in self.facets.items():
+            others = {f: v for f, v in selections.items() if f != field}
+            scope = self.filter_bits(others, base)
+            counts[field] = {value: (value_bits & scope).bit_count()
+                             for value, value_bits in facet.items()}
+        return counts
+
+    def items(self, bits: int) -> List[Dict[str, str]]:
+        """The display fields of the rows in a bitmap, in snapshot order"""
+        return [self._items[row] for row in iter_bits(bits)]
+
+    def items_at(self, rows: Iterable[int]) -> List[Dict[str, str]]:
+        """The display fields of the given rows, in the given order"""
+        return [self._items[row] for row in rows]
@@ -0,0 +1,39 @@
+"""
+Scan codes on the storage box labels.
+
+Each label carries a QR (or Data Matrix) code holding its box location and manufacturer
+part number, e.g. "INV1|C10|GRM188R61C475KAAJD". The web app and the search service
+resolve a scanned code with a dictionary lookup in the inventory index
+(InventoryIndex.label_rows) rather than a text search. This module only builds and reads
+the code text, so the apps can resolve scans without ReportLab.
+"""
+
+from dataclasses import dataclass
+
+# Marks an inventory label code (and its format version)
+CODE_PREFIX = "INV1"
+SEPARATOR = "|"
+
+
+@dataclass(frozen=True)
+class LabelCode:
+    location: str
+    mpn: str
+
+
+def encode_label_code(location: str, mpn: str) -> str:
+    """The code text printed on the label of a box"""
+    return SEPARATOR.join((CODE_PREFIX, location.strip(), mpn.strip()))
+
+
+def parse_label_code(text: str) -> LabelCode:
+    """
+    Read a scanned label code. Handheld scanners type the code followed by Enter, so
+    surrounding whitespace is ignored. Raises ValueError for text that is not a label code.
+    """
+    prefix, separator, rest = text.strip().partition(SEPARATOR)
+    location, separator2, mpn = rest.partition(SEPARATOR)
+    if prefix != CODE_PREFIX or not separator or not separator2:
+        raise ValueError(f"Not an inventory label code: {text.strip()!r}")
+    # The part number is last, so a separator inside it is kept
+    return LabelCode(location.strip(), mpn.strip())
@@ -0,0 +1,67 @@
+"""
+Printed-labels ledger: which storage box labels went out in which print batch.
+
+Every labels PDF that is written is recorded as a numbered batch with the labels on it
+(location, MFG/PN line and description). A later run can then print only the labels that
+are new or changed since a given batch: a part that was added, moved to another box, or
+whose MPN or description was corrected has a label that no batch up to then contains.
+The ledger is a JSON file, replaced atomically on every save.
+"""
+
+import json
+import os
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from lab_inventory.pipeline.checkpoint import write_json_atomic
+
+# (location, "MFG/PN: <manufacturer part number>", description), as in lab_inventory.labels
+Label = Tuple[str, str, str]
+
+# Stands for the most recent batch in changed_labels()
+LATEST_BATCH = -1
+
+
+@dataclass
+class LabelLedger:
+    """The print batches, oldest first"""
+    # [{"batch": 1, "printed_at": "...", "labels": [[location, mfgpn, description], ...]}]
+    batches: List[Dict] = field(default_factory=list)
+
+    @classmethod
+    def load(cls, path: str) -> "LabelLedger":
+        if not os.path.exists(path):
+            return cls()
+        with open(path, "r") as f:
+            return cls(json.load(f).get("batches", []))
+
+    def save(self, path: str) -> None:
+        write_json_atomic(path, {"batches": self.batches})
+
+    @property
+    def latest(self) -> Optional[int]:
+        return self.batches[-1]["batch"] if self.batches else None
+
+    def printed(self, through_batch: int = LATEST_BATCH) -> Set[Label]:
+        """Labels printed in the batches up to and including through_batch"""
+        if through_batch != LATEST_BATCH and not any(
+                batch["batch"] == through_batch for batch in self.batches):
+            raise ValueError(f"No print batch {through_batch} in the label ledger "
+                             f"(batches: {', '.join(str(b['batch']) for b in self.batches)})")
+        return {tuple(label) for batch in self.batches
+                if through_batch == LATEST_BATCH or batch["batch"] <= through_batch
+                for label in batch["labels"]}
+
+    def changed_labels(self, labels: List[Label], since_batch: int = LATEST_BATCH) -> List[Label]:
+        """The labels (in their order) that no batch up to since_batch printed"""
+        printed = self.printed(since_batch)
+        return [label for label in labels if tuple(label) not in printed]
+
+    def record(self, labels: List[Label]) -> int:
+        """Add a batch with the given labels; returns its number"""
+        number = (self.latest or 0) + 1
+        self.batches.append({"batch": number,
+                             "printed_at": datetime.now().isoformat(timespec="seconds"),
+                             "labels": [list(label) for label in labels]})
+        return number
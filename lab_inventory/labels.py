@@ -0,0 +1,426 @@
+"""
+Storage box labels: a printable A4 sheet of 53 x 20 mm labels, one per organized entry.
+
+Each label shows the box location in large type, the manufacturer part number (shrunk to
+fit, then truncated) and the description (wrapped, then truncated), next to a QR or Data
+Matrix code of the location and part number (lab_inventory.label_codes) that the web app
+resolves to the box's inventory records. Labels are sorted by location in natural order
+(C1, C2, C10, R1, ...) and laid out column by column under a header with the number of
+distinct locations. Text is measured with the cached glyph widths
+of lab_inventory.text_layout, so fitting, wrapping and truncating cost one pass over the
+text instead of a stringWidth call per character or word tried. Pages are laid out
+independently, so large runs can be rendered in several processes and merged page by page
+(pdfrw). A code is encoded once per distinct code text, drawn as a single filled path
+rather than one shape per module, and stored in the PDF once as a form that every label
+with that code reuses.
+
+Each labels PDF is recorded in a printed-labels ledger (lab_inventory.label_ledger), so a
+later run can print only the labels that are new or changed since a given batch, starting
+at the first free position of a partly used sheet.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import groupby
+from typing import Iterable, List, Optional, Tuple
+
+from reportlab.graphics.barcode import getCodes
+from reportlab.graphics.shapes import Rect
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.pdfgen import canvas
+
+from lab_inventory.label_codes import encode_label_code
+from lab_inventory.label_ledger import LATEST_BATCH, LabelLedger
+from lab_inventory.text_layout import font_metrics
+
+logger = logging.getLogger(__name__)
+
+LABEL_WIDTH_MM = 53.0   # label width (mm)
+LABEL_HEIGHT_MM = 20.0  # label height (mm)
+
+# Convert mm to points
+LABEL_WIDTH = LABEL_WIDTH_MM * mm
+LABEL_HEIGHT = LABEL_HEIGHT_MM * mm
+
+PAGE_WIDTH, PAGE_HEIGHT = A4
+MARGIN = 10 * mm
+
+# Reserve space at the top for the header that shows total distinct locations
+HEADER_SPACE = 20  # in points
+
+# Scan code at the right of each label: "QR" or "ECC200DataMatrix" (ReportLab barcode names)
+CODE_TYPE = "QR"
+CODE_SIZE = 14 * mm
+CODE_PADDING = 1.5 * mm
+# Quiet zone inside the code, in modules (the label margin adds to it)
+QR_BORDER = 2
+# Width left for the text of a label with a code
+TEXT_WIDTH = LABEL_WIDTH - CODE_SIZE - 2 * CODE_PADDING
+
+# How many columns/rows fit on one page (using the grid below the header)
+COLS_PER_PAGE = int((PAGE_WIDTH - 2 * MARGIN) // LABEL_WIDTH)
+ROWS_PER_PAGE = int((PAGE_HEIGHT - 2 * MARGIN - HEADER_SPACE) // LABEL_HEIGHT)
+LABELS_PER_PAGE = COLS_PER_PAGE * ROWS_PER_PAGE
+
+# Pages each render process should get at least; starting a process and merging its PDF
+# costs more than rendering a few pages in place
+MIN_PAGES_PER_JOB = 8
+
+# Fonts
+LOCATION_FONT = ("Helvetica-Bold", 14)  # large for Location
+MPN_FONT_NAME = "Helvetica"             # base font name for MFG/PN
+MPN_FONT_SIZE = 10                      # initial size for MFG/PN
+DESC_FONT = ("Helvetica", 8)            # smaller for Description
+
+DESC_LINE_SPACING = 9
+TRUNCATE_ELLIPSIS = "..."
+
+# Minimum font size for MFG/PN before truncation
+MIN_MPN_FONT_SIZE = 6
+
+MPN_PREFIX = "MFG/PN: "
+
+# (location, "MFG/PN: <manufacturer part number>", description)
+Label = Tuple[str, str, str]
+
+
+def parse_location(loc: str) -> Tuple[str, int]:
+    """
+    Parses a location string like 'C10' into (prefix, number) = ('C', 10).
+    If no match, returns (loc, 999999) so that unparsed strings go last.
+    This allows us to sort in a natural 'alphabet + numeric' manner.
+    """
+    match = re.match(r"^([A-Za-z]+)(\d+)$", loc.strip())
+    if match:
+        return match.group(1).upper(), int(match.group(2))
+    # fallback if the location doesn't match <letters><digits>
+    return loc.strip().upper(), 999999
+
+
+def single_line_centered_truncate(c, text, x, y, box_width, font_name, font_size):
+    """
+    Draw 'text' in one line, centered within box_width at (x, y).
+    If it doesn't fit horizontally, truncate with "...".
+    """
+    c.setFont(font_name, font_size)
+    metrics = font_metrics(font_name)
+    max_width = box_width - 4  # small side margin
+
+    text = metrics.truncate(text, font_size, max_width, TRUNCATE_ELLIPSIS)
+    text_x = x + (box_width - metrics.width(text, font_size)) / 2
+    c.drawString(text_x, y, text)
+
+
+def single_line_centered_fit(c, text, x, y, box_width, font_name, initial_font_size,
+                             min_font_size=6):
+    """
+    Draw 'text' in one line, centered, ensuring it fits horizontally.
+    Start from 'initial_font_size' and reduce until it fits or reaches 'min_font_size'.
+    If it still doesn't fit at min_font_size, truncate with "...".
+    """
+    metrics = font_metrics(font_name)
+    max_width = box_width - 4  # small margin
+    size = metrics.fit_size(text, initial_font_size, min_font_size, max_width)
+    if size is None:
+        size = min_font_size
+        text = metrics.truncate(text, size, max_width, TRUNCATE_ELLIPSIS)
+
+    c.setFont(font_name, size)
+    text_x = x + (box_width - metrics.width(text, size)) / 2
+    c.drawString(text_x, y, text)
+
+
+def wrap_text(text, font_name, font_size, max_width) -> List[str]:
+    """
+    Split 'text' into multiple lines so that no line exceeds 'max_width' in points.
+    Returns a list of lines.
+    """
+    return font_metrics(font_name).wrap(text, font_size, max_width)
+
+
+def draw_wrapped_centered(c, text, x, y, box_width, box_height, font_name, font_size,
+                          line_spacing):
+    """
+    Draw 'text' center-aligned, wrapped within the given box.
+    If text overflows vertically, truncate with "...".
+    Returns the final y position after drawing.
+    """
+    c.setFont(font_name, font_size)
+    metrics = font_metrics(font_name)
+    lines = wrap_text(text, font_name, font_size, box_width - 4)
+    draw_y = y + box_height - font_size - 2  # start near the top
+
+    for i, line in enumerate(lines):
+        if draw_y < y + 4:  # no space left
+            if i > 0:
+                c.drawString(
+                    x + (box_width - metrics.width(TRUNCATE_ELLIPSIS, font_size)) / 2,
+                    draw_y + line_spacing,
+                    TRUNCATE_ELLIPSIS
+                )
+            return draw_y
+        line_width = metrics.width(line, font_size)
+        line_x = x + (box_width - line_width) / 2
+        c.drawString(line_x, draw_y, line)
+        draw_y -= line_spacing
+
+    return draw_y
+
+
+def labels_from_entries(entries: Iterable[str]) -> List[Label]:
+    """One label per organized entry, sorted by location"""
+    labels = []
+    for entry in entries:
+        loc_match = re.search(r"^Location:\s*(.+)$", entry, re.MULTILINE)
+        desc_match = re.search(r"^Description:\s*(.+)$", entry, re.MULTILINE)
+        mfgpn_match = re.search(r"^Manufacturer Part number:\s*(.+)$", entry, re.MULTILINE)
+
+        location = loc_match.group(1).strip() if loc_match else ""
+        description = desc_match.group(1).strip() if desc_match else ""
+        mfgpn = mfgpn_match.group(1).strip() if mfgpn_match else ""
+
+        # Add "MFG/PN: " prefix if applicable
+        if mfgpn:
+            mfgpn = f"{MPN_PREFIX}{mfgpn}"
+
+        labels.append((location, mfgpn, description))
+
+    # Sort by parsed location: e.g., "C1" < "C2" < "C10" < "R1" < "R2" < ...
+    labels.sort(key=lambda label: parse_location(label[0]))
+    return labels
+
+
+def read_label_entries(input_file: str) -> List[str]:
+    """Organized entries of a text file (separated by blank lines)"""
+    with open(input_file, "r") as f:
+        content = f.read().strip()
+    return [e.strip() for e in content.split("\n\n") if e.strip()]
+
+
+def label_code_text(label: Label) -> Optional[str]:
+    """The text of a label's scan code (None for a label with no location or part number)"""
+    location, mfgpn, _ = label
+    mpn = mfgpn[len(MPN_PREFIX):] if mfgpn.startswith(MPN_PREFIX) else mfgpn
+    if not location.strip() and not mpn.strip():
+        return None
+    return encode_label_code(location, mpn)
+
+
+# (x, y, width, height) of a dark module run, in points
+ModuleRect = Tuple[float, float, float, float]
+
+
+@lru_cache(maxsize=4096)
+def code_modules(code_text: str) -> Tuple[ModuleRect, ...]:
+    """
+    The dark modules of a text's scan code, scaled into a CODE_SIZE square. Encoding is
+    the slow part of drawing a code, so it runs once per text. A QR code is read straight
+    from the encoder's module matrix; building the widget's shapes (one validated Rect per
+    run of modules) would take as long again as the encoding.
+    """
+    options = {"barBorder": QR_BORDER} if CODE_TYPE == "QR" else {}
+    widget = getCodes()[CODE_TYPE](value=code_text, **options)
+    if CODE_TYPE == "QR":
+        widget.qr.make()
+        return _matrix_modules(widget.qr.modules, QR_BORDER)
+    group = widget.draw()
+    x1, y1, x2, y2 = group.getBounds()
+    scale = CODE_SIZE / max(x2 - x1, y2 - y1)
+    return tuple(((shape.x - x1) * scale, (shape.y - y1) * scale,
+                  shape.width * scale, shape.height * scale)
+                 for shape in group.getContents()
+                 if isinstance(shape, Rect) and shape.fillColor is not None)
+
+
+def _matrix_modules(matrix: List[List[bool]], border: int) -> Tuple[ModuleRect, ...]:
+    """One rectangle per horizontal run of dark modules, top row first, as QrCodeWidget
+    draws them"""
+    box = CODE_SIZE / (len(matrix) + 2 * border)
+    modules = []
+    for row_index, row in enumerate(matrix):
+        y = CODE_SIZE - (row_index + border + 1) * box
+        col = 0
+        for dark, run in groupby(map(bool, row)):
+            length = len(list(run))
+            if dark:
+                modules.append(((col + border) * box, y, length * box, box))
+            col += length
+    return tuple(modules)
+
+
+def draw_label_code(c, code_text: str, x: float, y: float) -> None:
+    """
+    Draw a scan code with its lower-left corner at (x, y). The code is drawn into a PDF
+    form the first time the canvas sees its text; later labels with the same code reuse it.
+    """
+    form_name = "LabelCode" + hashlib.sha1(code_text.encode("utf-8")).hexdigest()[:16]
+    if not c.hasForm(form_name):
+        c.beginForm(form_name, 0, 0, CODE_SIZE, CODE_SIZE)
+        path = c.beginPath()
+        for module in code_modules(code_text):
+            path.rect(*module)
+        c.drawPath(path, stroke=0, fill=1)
+        c.endForm()
+    c.saveState()
+    c.translate(x, y)
+    c.doForm(form_name)
+    c.restoreState()
+
+
+def draw_label(c, label: Label, x: float, y: float) -> None:
+    """Draw one label with its lower-left corner at (x, y)"""
+    # Draw the label outline (optional)
+    c.rect(x, y, LABEL_WIDTH, LABEL_HEIGHT)
+
+    code_text = label_code_text(label)
+    if code_text is None:
+        draw_label_text(c, label, x, y, LABEL_WIDTH)
+        return
+    draw_label_text(c, label, x, y, TEXT_WIDTH)
+    draw_label_code(c, code_text, x + TEXT_WIDTH + CODE_PADDING,
+                    y + (LABEL_HEIGHT - CODE_SIZE) / 2)
+
+
+def draw_label_text(c, label: Label, x: float, y: float, width: float) -> None:
+    """Draw the text of a label in the 'width' points from its left edge"""
+    location, mfgpn, description = label
+
+    # 1) Draw LOCATION at top (centered, single line, truncated if needed)
+    loc_y = y + LABEL_HEIGHT - (LOCATION_FONT[1] + 2)
+    single_line_centered_truncate(
+        c, location, x, loc_y, width, LOCATION_FONT[0], LOCATION_FONT[1])
+
+    # 2) Draw MFG/PN: shrink font if needed, then truncate if still too wide
+    mpn_y = loc_y - (MPN_FONT_SIZE + 4)
+    single_line_centered_fit(c, mfgpn, x, mpn_y, width,
+                             MPN_FONT_NAME, MPN_FONT_SIZE, min_font_size=MIN_MPN_FONT_SIZE)
+
+    # 3) Draw DESCRIPTION (centered, wrapped) below MFG/PN
+    desc_top_space = mpn_y - (DESC_FONT[1] + 2) - y
+    if desc_top_space > 0:
+        draw_wrapped_centered(c, description, x, y, width,
+                              desc_top_space, DESC_FONT[0], DESC_FONT[1], DESC_LINE_SPACING)
+
+
+def start_slot(row: int = 1, col: int = 1) -> int:
+    """
+    Index of the first free label on a partly used sheet, given its row and column
+    (1-based). Labels are filled column by column, so the used labels are the ones above it
+    in its column and every label in the columns to its left.
+    """
+    if not 1 <= row <= ROWS_PER_PAGE or not 1 <= col <= COLS_PER_PAGE:
+        raise ValueError(f"Start position row {row}, column {col} is outside the "
+                         f"{ROWS_PER_PAGE} x {COLS_PER_PAGE} label grid")
+    return (col - 1) * ROWS_PER_PAGE + (row - 1)
+
+
+def paginate(labels: List[Label], first_slot: int = 0) -> List[List[Optional[Label]]]:
+    """
+    The labels of each page, in order (at least one page, for the header). The first
+    first_slot positions of the first page are left empty (None).
+    """
+    slots: List[Optional[Label]] = [None] * first_slot + list(labels)
+    return [slots[i:i + LABELS_PER_PAGE]
+            for i in range(0, len(slots), LABELS_PER_PAGE)] or [[]]
+
+
+def draw_page(c, page_labels: List[Optional[Label]]) -> None:
+    """Draw one page of labels, column by column, in the grid below the header space"""
+    x_start = MARGIN
+    y_start = PAGE_HEIGHT - MARGIN - HEADER_SPACE - LABEL_HEIGHT
+    for index, label in enumerate(page_labels):
+        if label is None:
+            continue  # already used on the sheet
+        col, row = divmod(index, ROWS_PER_PAGE)
+        draw_label(c, label, x_start + col * LABEL_WIDTH, y_start - row * LABEL_HEIGHT)
+
+
+def render_pages(pages: List[List[Optional[Label]]], output_pdf: str,
+                 header: Optional[str] = None) -> None:
+    """Save the pages as a PDF, with the header on the first page"""
+    c = canvas.Canvas(output_pdf, pagesize=A4)
+    for index, page_labels in enumerate(pages):
+        if index == 0 and header:
+            c.setFont("Helvetica", 12)
+            c.drawString(MARGIN, PAGE_HEIGHT - MARGIN - HEADER_SPACE / 2, header)
+        draw_page(c, page_labels)
+        c.showPage()
+    c.save()
+
+
+def merge_pdfs(shard_pdfs: List[str], output_pdf: str) -> None:
+    """Concatenate the pages of the shard PDFs into one PDF"""
+    from pdfrw import PdfReader, PdfWriter
+    writer = PdfWriter(output_pdf)
+    for shard_pdf in shard_pdfs:
+        writer.addpages(PdfReader(shard_pdf).pages)
+    writer.write()
+
+
+def locations_header(labels: List[Label]) -> str:
+    """Header for the first page with the total distinct locations assigned"""
+    total_distinct = len(set(location for location, _, _ in labels))
+    return f"Total distinct locations assigned: {total_distinct}"
+
+
+def render_labels(labels: List[Label], output_pdf: str, jobs: int = 1,
+                  first_slot: int = 0, header: Optional[str] = None) -> None:
+    """
+    Lay the labels out on A4 pages and save them as a PDF, starting at position first_slot
+    of the first page (see start_slot). The header defaults to locations_header(labels).
+    Pages are laid out independently, so with jobs > 1 contiguous page ranges are rendered
+    in that many processes and their PDFs merged; short runs stay in this process.
+    """
+    if header is None:
+        header = locations_header(labels)
+    pages = paginate(labels, first_slot)
+
+    jobs = min(jobs, len(pages) // MIN_PAGES_PER_JOB)
+    if jobs <= 1:
+        render_pages(pages, output_pdf, header)
+        return
+
+    bounds = [len(pages) * shard // jobs for shard in range(jobs + 1)]
+    shards = [pages[start:end] for start, end in zip(bounds, bounds[1:])]
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(output_pdf))) as tmp:
+        shard_pdfs = [os.path.join(tmp, f"shard_{shard:03d}.pdf") for shard in range(jobs)]
+        headers = [header] + [None] * (jobs - 1)
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            list(executor.map(render_pages, shards, shard_pdfs, headers))
+        merge_pdfs(shard_pdfs, output_pdf)
+
+
+def print_labels(labels: List[Label], output_pdf: str, ledger_file: Optional[str] = None,
+                 changed_since: Optional[int] = None, first_slot: int = 0,
+                 jobs: int = 1) -> List[Label]:
+    """
+    Render the labels and record them as a new batch in the printed-labels ledger. With
+    changed_since (a batch number, or LATEST_BATCH), only the labels that are new or changed
+    since that batch are rendered, under a header that still counts the locations of all
+    the labels. Returns the rendered labels; when there are none, no PDF is written and no
+    batch is recorded.
+    """
+    header = locations_header(labels)
+    ledger = LabelLedger.load(ledger_file) if ledger_file else None
+    if changed_since is not None:
+        if ledger is None:
+            raise ValueError("Printing only changed labels needs a label ledger")
+        labels = ledger.changed_labels(labels, changed_since)
+        if not labels:
+            since = ("the last print batch" if changed_since == LATEST_BATCH
+                     else f"print batch {changed_since}")
+            logger.info(f"No new or changed labels since {since}.")
+            return labels
+
+    render_labels(labels, output_pdf, jobs, first_slot, header)
+    if ledger is not None:
+        batch = ledger.record(labels)
+        ledger.save(ledger_file)
+        logger.info(f"Recorded {len(labels)} label(s) as print batch {batch}")
+    return labels
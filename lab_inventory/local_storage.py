@@ -0,0 +1,225 @@
+"""
+Local directory stand-in for a Firebase Storage bucket.
+
+Implements the subset of the google-cloud-storage Bucket/Blob interface that the shared
+inventory code uses, so the search catalog, the search service and the ingest worker can run
+against a local folder (e.g. the pipeline's 04_extracted_info) without credentials. Like GCS:
+
+- an object's generation changes on every rewrite (its modification time in microseconds,
+  the same unit GCS generations use);
+- a blob's generation is the one it had when it was fetched (or last uploaded through it),
+  and uploads, downloads and deletes accept if_generation_match, raising NotFound or
+  PreconditionFailed like the GCS client (0 means "only if the object does not exist");
+- custom metadata, content type and content encoding are kept with the object (in a
+  "<name>.blobmeta.json" sidecar), and gzip-encoded objects are decompressed on download;
+- list_blobs(prefix=...) returns objects in name order.
+
+Conditional operations hold a lock on the bucket folder (flock, so it also covers other
+processes on the same machine) between checking the generation and writing.
+"""
+
+import contextlib
+import gzip
+import json
+import os
+import shutil
+import threading
+from typing import Dict, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: the lock only covers threads of this process
+    fcntl = None
+
+try:
+    from google.api_core.exceptions import NotFound, PreconditionFailed
+except ImportError:  # google-cloud-storage not installed; only local buckets are available
+    class NotFound(Exception):
+        """The object does not exist"""
+
+    class PreconditionFailed(Exception):
+        """The object's generation did not match if_generation_match"""
+
+_SIDECAR_SUFFIX = ".blobmeta.json"
+_LOCK_FILE = ".localbucket.lock"
+_THREAD_LOCK = threading.Lock()
+
+
+def _current_generation(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns // 1000
+    except FileNotFoundError:
+        return None
+
+
+class LocalBlob:
+    """A file in a LocalBucket"""
+
+    def __init__(self, bucket: "LocalBucket", name: str):
+        self.bucket = bucket
+        self.name = name
+        self.metadata: Optional[Dict[str, str]] = None
+        self.content_type: Optional[str] = None
+        self.content_encoding: Optional[str] = None
+        self.generation: Optional[int] = None
+        self.reload()
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.bucket.root, self.name)
+
+    @property
+    def _sidecar_path(self) -> str:
+        return self.path + _SIDECAR_SUFFIX
+
+    def reload(self) -> None:
+        """Refresh the generation and the stored metadata from the bucket"""
+        self.generation = _current_generation(self.path)
+        try:
+            with open(self._sidecar_path, "r") as f:
+                sidecar = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        self.metadata = sidecar.get("metadata")
+        self.content_type = sidecar.get("content_type")
+        self.content_encoding = sidecar.get("content_encoding")
+
+    def _check_generation(self, if_generation_match: Optional[int]) -> Optional[int]:
+        """The object's current generation; raises if it does not match the precondition"""
+        current = _current_generation(self.path)
+        if if_generation_match is None:
+            return current
+        if if_generation_match == 0:
+            if current is not None:
+                raise PreconditionFailed(f"{self.name} already exists")
+        elif current is None:
+            raise NotFound(f"No such object: {self.name}")
+        elif current != if_generation_match:
+            raise PreconditionFailed(
+                f"{self.name} is at generation {current}, not {if_generation_match}")
+        return current
+
+    @property
+    def size(self) -> Optional[int]:
+        try:
+            return os.stat(self.path).st_size
+        except FileNotFoundError:
+            return None
+
+    def exists(self) -> bool:
+        return os.path.isfile(self.path)
+
+    def _read(self, if_generation_match: Optional[int] = None) -> bytes:
+        with self.bucket.lock():
+            if self._check_generation(if_generation_match) is None:
+                raise NotFound(f"No such object: {self.name}")
+            with open(self.path, "rb") as f:
+                data = f.read()
+        # GCS serves gzip-encoded objects decompressed (decompressive transcoding)
+        return gzip.decompress(data) if self.content_encoding == "gzip" else data
+
+    def download_to_filename(self, filename: str) -> None:
+        if self.content_encoding == "gzip":
+            with open(filename, "wb") as f:
+                f.write(self._read())
+        else:
+            shutil.copyfile(self.path, filename)
+
+    def download_as_bytes(self, if_generation_match: Optional[int] = None, **kwargs) -> bytes:
+        return self._read(if_generation_match)
+
+    def download_as_text(self, encoding: str = "utf-8", if_generation_match: Optional[int] = None,
+                         **kwargs) -> str:
+        return self._read(if_generation_match).decode(encoding)
+
+    def upload_from_string(self, data, content_type: Optional[str] = None,
+                           if_generation_match: Optional[int] = None, **kwargs) -> None:
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        partial_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.part"
+        with open(partial_path, "wb") as f:
+            f.write(data)
+        with self.bucket.lock():
+            try:
+                previous = self._check_generation(if_generation_match)
+            except (NotFound, PreconditionFailed):
+                os.remove(partial_path)
+                raise
+            os.replace(partial_path, self.path)
+            # The generation must change on every write, even within the clock's resolution
+            if previous is not None and _current_generation(self.path) <= previous:
+                os.utime(self.path, ns=((previous + 1) * 1000,) * 2)
+            self.content_type = content_type or self.content_type
+            with open(self._sidecar_path, "w") as f:
+                json.dump({"metadata": self.metadata, "content_type": self.content_type,
+                           "content_encoding": self.content_encoding}, f)
+            self.generation = _current_generation(self.path)
+
+    def upload_from_filename(self, filename: str, content_type: Optional[str] = None,
+                             **kwargs) -> None:
+        with open(filename, "rb") as f:
+            self.upload_from_string(f.read(), content_type=content_type, **kwargs)
+
+    def delete(self, if_generation_match: Optional[int] = None, **kwargs) -> None:
+        with self.bucket.lock():
+            if self._check_generation(if_generation_match) is None:
+                raise NotFound(f"No such object: {self.name}")
+            os.remove(self.path)
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(self._sidecar_path)
+
+
+class LocalBucket:
+    """A directory used in place of a storage bucket (object names are relative paths)"""
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        self.name = self.root
+
+    @contextlib.contextmanager
+    def lock(self) -> Iterator[None]:
+        """Hold the bucket lock (across threads and, where flock exists, processes)"""
+        with _THREAD_LOCK:
+            if fcntl is None:
+                yield
+                return
+            os.makedirs(self.root, exist_ok=True)
+            with open(os.path.join(self.root, _LOCK_FILE), "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def blob(self, name: str) -> LocalBlob:
+        return LocalBlob(self, name)
+
+    def get_blob(self, name: str) -> Optional[LocalBlob]:
+        blob = self.blob(name)
+        return blob if blob.exists() else None
+
+    def list_blobs(self, prefix: str = "") -> Iterator[LocalBlob]:
+        names = []
+        for directory, _, files in os.walk(self.root):
+            for file_name in files:
+                if file_name == _LOCK_FILE or file_name.endswith((_SIDECAR_SUFFIX, ".part")):
+                    continue
+                name = os.path.relpath(os.path.join(directory, file_name), self.root)
+                name = name.replace(os.sep, "/")
+                if name.startswith(prefix):
+                    names.append(name)
+        return (self.blob(name) for name in sorted(names))
+
+
+def open_bucket(local_dir: Optional[str], credentials_path: Optional[str] = None,
+                bucket_name: Optional[str] = None):
+    """The storage bucket to use: a local folder, or Firebase Storage"""
+    if local_dir:
+        return LocalBucket(local_dir)
+    import firebase_admin
+    from firebase_admin import credentials, storage
+    if not firebase_admin._apps:
+        cred = credentials.Certificate(credentials_path) if credentials_path else None
+        firebase_admin.initialize_app(cred, {"storageBucket": bucket_name})
+    return storage.bucket()
@@ -0,0 +1,15 @@
+"""
+Inventory pipeline stages shared by the 05_ scripts and the ingest worker.
+
+  ocr       convert photos to JPEG and read their labels with Google Cloud Vision (05_01)
+  organize  extract structured fields with OpenAI and assign box locations (05_02)
+  publish   upload the organized inventory, its snapshot and embeddings (05_02)
+  counts    photos that have no organized entry yet (05_04)
+  streaming convert -> OCR -> LLM -> allocate as concurrent stages joined by bounded queues
+  ingest    watch component_images/ in Firebase Storage and run the stages on new photos
+  dag       in-process runner that executes the stages as a dependency graph (05_00)
+  stages    the pipeline's stage graph for the runner
+  checkpoint atomic file writes and staged OCR/LLM results for resumable runs
+
+python -m lab_inventory.pipeline runs a single stage from the command line (__main__).
+"""
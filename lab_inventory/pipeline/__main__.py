@@ -0,0 +1,11 @@
+"""
+python -m lab_inventory.pipeline <command>: the inventory command line (lab_inventory.cli)
+without installing the package, e.g. python -m lab_inventory.pipeline dedupe
+"""
+
+import sys
+
+from lab_inventory.cli import main
+
+if __name__ == "__main__":
+    sys.exit(main())
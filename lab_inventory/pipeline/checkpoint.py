@@ -0,0 +1,107 @@
+"""
+Durable writes and staged results for resumable pipeline runs.
+
+Every paid result (a Vision OCR text, an OpenAI response) is staged in a CheckpointStore as
+soon as it arrives, one file per unit, before it is committed to the pipeline's text files.
+Checkpoints and other whole files are replaced via a temporary file in the same folder that
+is flushed to disk and renamed over the old one, so a crash leaves either the old or the new
+file. Entries are committed to the text files by appending them (append_text_durable), so
+committing costs the size of the entry, not of the file: the entry is flushed to disk, then
+the file's new length is recorded in "<file>.committed" before the checkpoint is discarded.
+Anything past the recorded length is an append a crash interrupted; it is cut off before the
+file is read or appended to again (discard_uncommitted_tail), and since its checkpoint is
+still staged the entry is committed again. A rerun after a crash or an API failure finds the
+staged units, commits them without calling the API again and continues where the previous
+run stopped.
+"""
+
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+COMMITTED_SUFFIX = ".committed"
+
+
+def atomic_write_text(path: str, text: str) -> None:
+    """Replace a file's content via a temporary file and a rename"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, partial_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".part")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        # The committed length of appends no longer applies to the new content
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path + COMMITTED_SUFFIX)
+        os.replace(partial_path, path)
+    except BaseException:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+
+
+def discard_uncommitted_tail(path: str) -> None:
+    """Cut off what a crash left of an interrupted append_text_durable() at the end of 'path'"""
+    try:
+        with open(path + COMMITTED_SUFFIX, "r") as f:
+            committed = int(f.read())
+        size = os.path.getsize(path)
+    except (FileNotFoundError, ValueError):
+        return
+    if size > committed:
+        logger.warning(f"Discarding {size - committed} bytes of an unfinished write at the end "
+                       f"of {path}")
+        os.truncate(path, committed)
+
+
+def append_text_durable(path: str, text: str) -> None:
+    """
+    Append 'text' to a file, flush it to disk and record the file's new length. Once this
+    returns the text is committed; if it does not, the text is discarded on the next read.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    discard_uncommitted_tail(path)
+    with open(path, "a") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+        size = os.fstat(f.fileno()).st_size
+    atomic_write_text(path + COMMITTED_SUFFIX, str(size))
+
+
+def write_json_atomic(path: str, data) -> None:
+    atomic_write_text(path, json.dumps(data, indent=1))
+
+
+class CheckpointStore:
+    """Staged results by key, one file per key, in a folder"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha1(key.encode("utf-8")).hexdigest())
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            with open(self._path(key), "r") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, value: str) -> None:
+        atomic_write_text(self._path(key), value)
+
+    def discard(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
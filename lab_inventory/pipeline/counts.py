@@ -0,0 +1,28 @@
+"""File counts check: photos in the inventory folder that have no organized entry yet (05_04)."""
+
+import os
+from typing import Dict, Iterable, Set
+
+from lab_inventory.pipeline.organize import entry_image
+
+IMAGE_EXTENSIONS = {".heic", ".jpg", ".jpeg", ".png", ".gif", ".bmp", ".tiff"}
+
+
+def image_files(directory_path: str) -> Dict[str, str]:
+    """Image files in a folder and its subfolders: file name -> path relative to the folder"""
+    all_files = {}
+    for root, _, files in os.walk(directory_path):
+        for file in files:
+            if os.path.splitext(file.lower())[1] in IMAGE_EXTENSIONS:
+                all_files[file] = os.path.relpath(os.path.join(root, file), directory_path)
+    return all_files
+
+
+def organized_images(entries: Iterable[str]) -> Set[str]:
+    """Photo names of organized entries"""
+    return {image for image in map(entry_image, entries) if image}
+
+
+def missing_images(all_files: Dict[str, str], processed: Set[str]) -> Dict[str, str]:
+    """The image files that have no organized entry"""
+    return {name: path for name, path in all_files.items() if name not in processed}
@@ -0,0 +1,192 @@
+"""
+In-process pipeline runner: stages run as a dependency DAG in one Python process.
+
+Each Stage names the stages it runs after and receives their results as a dict, so records
+flow between stages in memory instead of through files re-read by a fresh interpreter.
+A stage that declares its input files is skipped when a fingerprint of those inputs
+(file contents, or names, sizes and modification times for folders) matches the one
+recorded after its last successful run; its result is then rebuilt by its load() callable
+if it has one. A failed stage does not stop stages that do not depend on it. A stage that
+did only part of its work (e.g. an API request failed) raises IncompleteRun: its partial
+result still goes to the stages after it, but its inputs are not recorded, so the next run
+does it again. The runner returns a StageReport per stage with its status and wall time.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from graphlib import TopologicalSorter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from lab_inventory.pipeline.checkpoint import write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+RAN = "ran"
+SKIPPED = "skipped"
+FAILED = "failed"
+BLOCKED = "blocked"
+INCOMPLETE = "incomplete"
+
+
+class IncompleteRun(Exception):
+    """A step did only part of its work; 'result' is what it did produce"""
+
+    def __init__(self, message: str, result: Any = None):
+        super().__init__(message)
+        self.result = result
+
+
+@dataclass
+class Stage:
+    """One pipeline step; run() gets {dependency name: result} and returns this stage's result"""
+    name: str
+    run: Callable[[Dict[str, Any]], Any]
+    after: Tuple[str, ...] = ()
+    # Files and folders whose content decides whether the stage must run; None = always run
+    inputs: Optional[Callable[[], Sequence[str]]] = None
+    # Rebuilds the result of a skipped stage from its outputs
+    load: Optional[Callable[[], Any]] = None
+
+
+@dataclass
+class StageReport:
+    name: str
+    status: str
+    seconds: float = 0.0
+    error: Optional[str] = None
+
+
+def _hash_file(digest, path: str) -> None:
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+
+
+def fingerprint(paths: Iterable[str]) -> str:
+    """
+    Digest of the given inputs: file contents, and for folders the names, sizes and
+    modification times of the files inside (photos are too large to hash on every run).
+    """
+    digest = hashlib.md5()
+    for path in paths:
+        digest.update(path.encode("utf-8") + b"\0")
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    stat = os.stat(os.path.join(root, name))
+                    relative = os.path.relpath(os.path.join(root, name), path)
+                    digest.update(f"{relative}:{stat.st_size}:{stat.st_mtime_ns}\0".encode("utf-8"))
+        elif os.path.isfile(path):
+            _hash_file(digest, path)
+        else:
+            digest.update(b"<missing>\0")
+    return digest.hexdigest()
+
+
+class PipelineRunner:
+    """Runs stages in dependency order and remembers the inputs of successful runs"""
+
+    def __init__(self, stages: Sequence[Stage], state_file: Optional[str] = None):
+        self.stages = {stage.name: stage for stage in stages}
+        for stage in stages:
+            unknown = set(stage.after) - set(self.stages)
+            if unknown:
+                raise ValueError(f"Stage {stage.name} runs after unknown stage(s): "
+                                 f"{', '.join(sorted(unknown))}")
+        # Raises graphlib.CycleError for a cyclic pipeline
+        self.order = list(TopologicalSorter(
+            {stage.name: stage.after for stage in stages}).static_order())
+        self.state_file = state_file
+
+    def _load_state(self) -> Dict[str, str]:
+        if not self.state_file:
+            return {}
+        try:
+            with open(self.state_file, "r") as f:
+                return json.load(f).get("fingerprints", {})
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _save_state(self, fingerprints: Dict[str, str]) -> None:
+        if self.state_file:
+            write_json_atomic(self.state_file, {"fingerprints": fingerprints})
+
+    def run(self, only: Optional[Iterable[str]] = None, force: bool = False,
+            on_start: Optional[Callable[[Stage], None]] = None) -> List[StageReport]:
+        """
+        Run the pipeline (or only the named stages; the results of their dependencies are
+        then rebuilt with load()). With force=True no stage is skipped.
+        """
+        selected = set(only) if only is not None else set(self.order)
+        unknown = selected - set(self.stages)
+        if unknown:
+            raise ValueError(f"Unknown stage(s): {', '.join(sorted(unknown))}")
+
+        fingerprints = self._load_state()
+        results: Dict[str, Any] = {}
+        failed: set = set()
+        reports = []
+        for name in self.order:
+            stage = self.stages[name]
+            if failed & set(stage.after):
+                failed.add(name)
+                if name in selected:
+                    reports.append(StageReport(name, BLOCKED))
+                continue
+            inputs = {dep: results.get(dep) for dep in stage.after}
+
+            if name not in selected:
+                if stage.load and any(name in self.stages[other].after for other in selected):
+                    results[name] = stage.load()
+                continue
+
+            started = time.perf_counter()
+            current = fingerprint(stage.inputs()) if stage.inputs else None
+            if not force and current is not None and fingerprints.get(name) == current:
+                results[name] = stage.load() if stage.load else None
+                reports.append(StageReport(name, SKIPPED, time.perf_counter() - started))
+                logger.info(f"{name}: inputs unchanged, skipped")
+                continue
+
+            if on_start:
+                on_start(stage)
+            try:
+                results[name] = stage.run(inputs)
+            except IncompleteRun as e:
+                logger.warning(f"Stage {name} did not finish: {e}")
+                results[name] = e.result
+                reports.append(StageReport(name, INCOMPLETE, time.perf_counter() - started,
+                                           str(e)))
+                if fingerprints.pop(name, None) is not None:
+                    self._save_state(fingerprints)
+                continue
+            except Exception as e:
+                logger.exception(f"Stage {name} failed")
+                failed.add(name)
+                reports.append(StageReport(name, FAILED, time.perf_counter() - started, str(e)))
+                continue
+            reports.append(StageReport(name, RAN, time.perf_counter() - started))
+            if stage.inputs:
+                # Fingerprint the inputs as they are after the run, since a stage may
+                # update the files it reads (e.g. organize rewrites duplicate locations)
+                fingerprints[name] = fingerprint(stage.inputs())
+                self._save_state(fingerprints)
+        return reports
+
+
+def format_report(reports: Sequence[StageReport]) -> str:
+    """Per-stage timing table"""
+    width = max([len(report.name) for report in reports] + [5])
+    lines = [f"{'stage':<{width}}  {'status':<10}  {'seconds':>8}"]
+    for report in reports:
+        line = f"{report.name:<{width}}  {report.status:<10}  {report.seconds:8.2f}"
+        if report.error:
+            line += f"  {report.error}"
+        lines.append(line)
+    lines.append(f"{'total':<{width}}  {'':<10}  {sum(r.seconds for r in reports):8.2f}")
+    return "\n".join(lines)
@@ -0,0 +1,263 @@
+"""
+Ingest worker: feed photos uploaded through the web app into the pipeline.
+
+The web app stores uploads under component_images/<uploader>/ in Firebase Storage. Every
+POLL_INTERVAL seconds the worker lists that prefix (a metadata-only request) and picks the
+photos it has not ingested yet using a generation watermark: GCS generations are
+microsecond timestamps, so everything at or below the highest generation already ingested
+is old. Because uploads that started earlier can finish later, the watermark trails by
+WATERMARK_LAG and the objects ingested inside that window are remembered by generation, so
+a late upload is still picked up and nothing is ingested twice. A photo whose
+conversion or OCR failed is kept on a retry list (by generation) and tried again on the
+next passes, up to MAX_ATTEMPTS times, however far the watermark has moved on.
+
+New photos are downloaded and streamed through conversion, OCR, OpenAI field extraction
+and location assignment (streaming), then published (publish), so a new part is searchable
+within a minute or two of its upload instead of after the next manual 05_00_run_all.py run;
+a large batch is also published every PUBLISH_INTERVAL seconds while it streams. Photos are
+appended to the OCR and organized files as they finish and both stages skip photos already
+in their output files, so a worker that is stopped halfway resumes without paying for any
+photo twice. Photos that were OCR'd but not organized are finished by the batch organize
+stage on the next pass.
+
+Usage:
+  python -m lab_inventory.pipeline.ingest --credentials key.json
+  python -m lab_inventory.pipeline.ingest --local-dir /tmp/bucket --once
+
+With --local-dir a folder stands in for the bucket (lab_inventory.local_storage): photos
+are read from <folder>/component_images/ and the inventory is published into the folder.
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from lab_inventory.local_storage import open_bucket
+from lab_inventory.pipeline.checkpoint import CheckpointStore, write_json_atomic
+from lab_inventory.pipeline.dag import IncompleteRun
+from lab_inventory.pipeline.ocr import TextExtractor, vision_text_extractor
+from lab_inventory.pipeline.organize import (openai_client, organize_new_entries,
+                                             unify_duplicate_locations)
+from lab_inventory.pipeline.paths import REPO_ROOT, PipelinePaths
+from lab_inventory.pipeline.publish import publish_inventory
+from lab_inventory.pipeline.streaming import PhotoPipeline
+from lab_inventory.uploads import UPLOAD_PREFIX
+
+logger = logging.getLogger(__name__)
+
+INGEST_EXTENSIONS = {".heic", ".heif", ".jpg", ".jpeg", ".png", ".webp", ".avif"}
+# Generations are microseconds; uploads finishing up to this late are still picked up
+WATERMARK_LAG = 10 * 60 * 1_000_000
+POLL_INTERVAL = 60.0
+# Passes a photo whose conversion or OCR fails is tried in before it is given up on
+MAX_ATTEMPTS = 5
+# Seconds between publishes while a batch of photos is streaming through the pipeline
+PUBLISH_INTERVAL = 30.0
+
+
+@dataclass
+class IngestState:
+    """
+    The generation watermark, the objects ingested within WATERMARK_LAG of it, and the
+    objects to try again
+    """
+    watermark: int = 0
+    recent: Dict[str, int] = field(default_factory=dict)
+    # Object name -> [generation, failed attempts] of photos whose conversion or OCR failed
+    retry: Dict[str, List[int]] = field(default_factory=dict)
+
+    @classmethod
+    def load(cls, path: str) -> "IngestState":
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return cls()
+        return cls(int(data.get("watermark", 0)), dict(data.get("recent", {})),
+                   dict(data.get("retry", {})))
+
+    def save(self, path: str) -> None:
+        write_json_atomic(path, {"watermark": self.watermark, "recent": self.recent,
+                                 "retry": self.retry})
+
+    def is_new(self, blob) -> bool:
+        retry = self.retry.get(blob.name)
+        if retry is not None and retry[0] == blob.generation:
+            return True
+        return (blob.generation > self.watermark - WATERMARK_LAG
+                and self.recent.get(blob.name) != blob.generation)
+
+    def advance(self, blobs, failed=()) -> None:
+        """
+        Record 'blobs' as ingested and move the watermark past them; the ones in 'failed'
+        go on the retry list instead, until they have failed MAX_ATTEMPTS times
+        """
+        failed_names = {blob.name for blob in failed}
+        for blob in blobs:
+            self.watermark = max(self.watermark, blob.generation)
+            if blob.name not in failed_names:
+                self.recent[blob.name] = blob.generation
+                self.retry.pop(blob.name, None)
+                continue
+            generation, attempts = self.retry.get(blob.name, (blob.generation, 0))
+            attempts = attempts + 1 if generation == blob.generation else 1
+            if attempts < MAX_ATTEMPTS:
+                self.retry[blob.name] = [blob.generation, attempts]
+            else:
+                logger.error(f"Giving up on {blob.name} after {attempts} failed attempts")
+                self.retry.pop(blob.name, None)
+                self.recent[blob.name] = blob.generation
+        self.recent = {name: generation for name, generation in self.recent.items()
+                       if generation > self.watermark - WATERMARK_LAG}
+
+
+def image_name(object_name: str) -> str:
+    """
+    Local file name (and "Image:" name) of an uploaded photo, e.g.
+    component_images/Jane Doe/IMG_1.heic -> Jane_Doe__IMG_1.heic. The uploader is kept so
+    photos with the same camera file name from different people do not collide.
+    """
+    relative = object_name[len(UPLOAD_PREFIX):] if object_name.startswith(UPLOAD_PREFIX) \
+        else object_name
+    return "__".join(re.sub(r"[^\w.-]+", "_", part) for part in relative.split("/") if part)
+
+
+def list_new_photos(bucket, state: IngestState) -> List:
+    """Uploaded photos the worker has not ingested yet, oldest first"""
+    blobs = [blob for blob in bucket.list_blobs(prefix=UPLOAD_PREFIX)
+             if os.path.splitext(blob.name)[1].lower() in INGEST_EXTENSIONS
+             and state.is_new(blob)]
+    return sorted(blobs, key=lambda blob: blob.generation)
+
+
+class IngestWorker:
+    """Runs new uploads through the OCR, organize and publish stages"""
+
+    def __init__(self, bucket, paths: PipelinePaths, extract_text: TextExtractor, llm_client,
+                 service_url: Optional[str] = None):
+        self.bucket = bucket
+        self.paths = paths
+        self.extract_text = extract_text
+        self.llm_client = llm_client
+        self.service_url = service_url
+        self.checkpoint = CheckpointStore(paths.checkpoint_dir)
+        # The first pass also finishes OCR'd photos that an earlier run stopped before
+        # organizing or publishing
+        self._organize_pending = True
+        self._publish_pending = True
+
+    def download(self, blobs) -> List[str]:
+        """Download photos into the download folder and return their local paths"""
+        os.makedirs(self.paths.download_dir, exist_ok=True)
+        local_paths = []
+        for blob in blobs:
+            local_path = os.path.join(self.paths.download_dir, image_name(blob.name))
+            partial_path = local_path + ".part"
+            blob.download_to_filename(partial_path)
+            os.replace(partial_path, local_path)
+            local_paths.append(local_path)
+        return local_paths
+
+    def _publish(self) -> None:
+        publish_inventory(self.bucket, self.paths.organized_file, self.paths.snapshot_file,
+                          self.paths.embeddings_file, self.service_url)
+        self._publish_pending = False
+
+    def run_once(self) -> List[str]:
+        """One ingest pass; returns the organized entries it added"""
+        appended: List[str] = []
+        if self._organize_pending:
+            self._organize_pending = False
+            if os.path.exists(self.paths.extracted_file):
+                try:
+                    appended += organize_new_entries(self.llm_client, self.paths.extracted_file,
+                                                     self.paths.organized_file,
+                                                     checkpoint=self.checkpoint)
+                except IncompleteRun as e:
+                    logger.warning(f"Organize did not finish, retrying next pass: {e}")
+                    appended += e.result
+                    self._organize_pending = True
+                self._publish_pending = self._publish_pending or bool(appended)
+
+        state = IngestState.load(self.paths.ingest_state_file)
+        blobs = list_new_photos(self.bucket, state)
+        if blobs:
+            logger.info(f"Ingesting {len(blobs)} new photo(s)")
+            pipeline = PhotoPipeline(self.extract_text, self.llm_client,
+                                     self.paths.converted_dir, self.paths.extracted_file,
+                                     self.paths.organized_file, checkpoint=self.checkpoint)
+            last_published = time.monotonic()
+            # Photos that did not get through conversion and OCR, to be retried
+            failed_names = set()
+            for record in pipeline.run(self.download(blobs)):
+                if record.text is None:
+                    logger.warning(f"{record.name}: {record.error}; retrying next pass")
+                    failed_names.add(record.name)
+                elif record.ok:
+                    appended.append(record.entry)
+                    self._publish_pending = True
+                elif record.text:
+                    # OCR'd but not organized: retried by the batch organize stage next pass
+                    logger.warning(f"{record.name}: {record.error}")
+                    self._organize_pending = True
+                # Publish while a large batch is still streaming, so its first parts are
+                # searchable before its last photo is done
+                if self._publish_pending and time.monotonic() - last_published >= PUBLISH_INTERVAL:
+                    with pipeline.organized_lock:
+                        self._publish()
+                    last_published = time.monotonic()
+            state.advance(blobs, [blob for blob in blobs
+                                  if image_name(blob.name) in failed_names])
+            state.save(self.paths.ingest_state_file)
+            if appended and unify_duplicate_locations(self.paths.organized_file):
+                logger.info("Duplicate locations updated in the output file.")
+
+        if self._publish_pending and os.path.exists(self.paths.organized_file):
+            self._publish()
+        return appended
+
+    def run_forever(self, interval: float = POLL_INTERVAL) -> None:
+        while True:
+            started = time.monotonic()
+            try:
+                appended = self.run_once()
+                if appended:
+                    logger.info(f"Added {len(appended)} component(s) to the inventory")
+            except Exception:
+                logger.exception("Ingest pass failed; retrying at the next poll")
+            time.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Ingest photos uploaded through the web app into the inventory")
+    parser.add_argument("--local-dir", help="use a local folder in place of the bucket")
+    parser.add_argument("--credentials", help="Firebase service account JSON")
+    parser.add_argument("--bucket", default="aharonilabinventory.appspot.com",
+                        help="Firebase Storage bucket")
+    parser.add_argument("--work-dir", default=REPO_ROOT,
+                        help="folder holding the pipeline's working files")
+    parser.add_argument("--interval", type=float, default=POLL_INTERVAL,
+                        help="seconds between checks for new uploads")
+    parser.add_argument("--once", action="store_true", help="run a single pass and exit")
+    parser.add_argument("--service-url", default=os.environ.get("INVENTORY_SERVICE_URL"),
+                        help="search service to notify after publishing")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    worker = IngestWorker(open_bucket(args.local_dir, args.credentials, args.bucket),
+                          PipelinePaths.in_directory(args.work_dir), vision_text_extractor(),
+                          openai_client(), args.service_url)
+    if args.once:
+        worker.run_once()
+    else:
+        worker.run_forever(args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+OCR stage: convert component photos to JPEG and read their labels with Google Cloud Vision.
+
+Results are appended to extracted_texts.txt as one block per photo:
+
+  Image: <file name>
+  Extracted Text:
+  <text>
+
+A photo whose name already appears in an "Image: " line is not processed again. With a
+CheckpointStore, each Vision result is staged before it is committed to the file, so a
+rerun after a crash does not pay for the same photo twice.
+"""
+
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, List, Optional, Set, Tuple
+
+from lab_inventory.pipeline.checkpoint import (CheckpointStore, append_text_durable,
+                                               discard_uncommitted_tail)
+from lab_inventory.pipeline.dag import IncompleteRun
+
+logger = logging.getLogger(__name__)
+
+OCR_RETRIES = 3
+# Formats the Vision API reads directly; anything else is converted to JPEG first
+VISION_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
+
+# Reads the text in an image file; returns None when there is none and raises when the
+# image could not be read (so the photo is tried again on the next run)
+TextExtractor = Callable[[str], Optional[str]]
+
+_heif_registered = False
+
+
+def register_heif_opener() -> None:
+    """Let Pillow open HEIC photos (iPhone camera default) through pillow-heif"""
+    global _heif_registered
+    if not _heif_registered:
+        import pillow_heif
+        pillow_heif.register_heif_opener()
+        _heif_registered = True
+
+
+def load_processed_images(output_file: str) -> Set[str]:
+    """Names of the photos that already have an entry in the OCR output file"""
+    processed = set()
+    if os.path.exists(output_file):
+        discard_uncommitted_tail(output_file)
+        with open(output_file, "r") as f:
+            for line in f:
+                if line.startswith("Image: "):
+                    processed.add(line.strip().split("Image: ")[1])
+    return processed
+
+
+def convert_to_jpeg(source_path: str, jpg_path: str) -> None:
+    """Convert a photo (HEIC, AVIF, ...) to JPEG"""
+    from PIL import Image
+    if os.path.splitext(source_path)[1].lower() in (".heic", ".heif"):
+        register_heif_opener()
+    with Image.open(source_path) as image:
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        image.save(jpg_path, "JPEG")
+
+
+def vision_text_extractor(client=None, retries: int = OCR_RETRIES) -> TextExtractor:
+    """
+    A TextExtractor backed by the Google Cloud Vision API. The client is created once and
+    reused for every photo; transient API errors are retried with exponential backoff and
+    the last one is raised when every attempt failed.
+    """
+    from google.api_core.exceptions import GoogleAPICallError
+    from google.cloud import vision
+
+    client = client or vision.ImageAnnotatorClient()
+
+    def extract_text(image_path: str) -> Optional[str]:
+        with open(image_path, "rb") as image_file:
+            image = vision.Image(content=image_file.read())
+        for attempt in range(retries):
+            try:
+                response = client.text_detection(image=image)
+            except GoogleAPICallError as e:
+                if attempt + 1 == retries:
+                    raise
+                logger.warning(f"Error: {e}. Retrying {attempt + 1}/{retries}...")
+                time.sleep(2 ** attempt)
+                continue
+            if response.full_text_annotation:
+                return response.full_text_annotation.text
+            return None
+        return None
+
+    return extract_text
+
+
+def format_ocr_entry(image_name: str, text: str) -> str:
+    return f"Image: {image_name}\nExtracted Text:\n{text}\n\n"
+
+
+def ocr_checkpoint_key(image_name: str) -> str:
+    return f"ocr:{image_name}"
+
+
+def staged_text(checkpoint: Optional[CheckpointStore], image_name: str,
+                extract_text: TextExtractor, ocr_path: Callable[[], str]) -> str:
+    """
+    The photo's OCR text ("" for none), from the checkpoint if an earlier run already paid
+    for it; a new result is staged before it is returned. ocr_path() is only called (and
+    the photo only converted) when the text is not staged.
+    """
+    key = ocr_checkpoint_key(image_name)
+    staged = checkpoint.get(key) if checkpoint else None
+    if staged is not None:
+        logger.info(f"{image_name}: Using the staged OCR result.")
+        return staged
+    text = extract_text(ocr_path()) or ""
+    if checkpoint:
+        checkpoint.put(key, text)
+    return text
+
+
+def ocr_images(image_paths: Iterable[str], converted_dir: str, output_file: str,
+               extract_text: TextExtractor, processed: Optional[Set[str]] = None,
+               checkpoint: Optional[CheckpointStore] = None, workers: int = 1) -> List[str]:
+    """
+    Convert and OCR the given photos, skipping names already in the output file, and append
+    an entry for each photo with text. Each entry is committed durably as soon as it is
+    read, so an interrupted run keeps the photos it already paid for. With workers > 1 that
+    many photos are converted and read at once; entries are still written in the order of
+    image_paths. Returns the names of the photos that were added; if any photo failed, raises
+    IncompleteRun with those names instead, after the other photos were committed.
+    """
+    os.makedirs(converted_dir, exist_ok=True)
+    os.makedirs(os.path.dirname(os.path.abspath(output_file)), exist_ok=True)
+    if processed is None:
+        processed = load_processed_images(output_file)
+
+    def jpeg_path(image_path: str) -> str:
+        stem, extension = os.path.splitext(os.path.basename(image_path))
+        if extension.lower() in VISION_EXTENSIONS:
+            return image_path
+        ocr_path = os.path.join(converted_dir, stem + ".jpg")
+        convert_to_jpeg(image_path, ocr_path)
+        return ocr_path
+
+    def read(image_path: str) -> Tuple[Optional[str], Optional[Exception]]:
+        try:
+            return staged_text(checkpoint, os.path.basename(image_path), extract_text,
+                               lambda: jpeg_path(image_path)), None
+        except Exception as e:
+            return None, e
+
+    pending, pending_names = [], set()
+    for image_path in image_paths:
+        filename = os.path.basename(image_path)
+        if filename in processed or filename in pending_names:
+            logger.info(f"{filename}: Already processed, skipping.")
+            continue
+        pending.append(image_path)
+        pending_names.add(filename)
+
+    added, failed = [], []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        results = executor.map(read, pending) if workers > 1 else map(read, pending)
+        for image_path, (extracted_text, error) in zip(pending, results):
+            filename = os.path.basename(image_path)
+            if error is not None:
+                logger.error(f"{filename}: OCR failed, it will be retried on the next run: "
+                             f"{error}")
+                failed.append(filename)
+            elif extracted_text:
+                append_text_durable(output_file, format_ocr_entry(filename, extracted_text))
+                if checkpoint:
+                    checkpoint.discard(ocr_checkpoint_key(filename))
+                processed.add(filename)
+                added.append(filename)
+                logger.info(f"{filename}: Extracted text.")
+            else:
+                # The empty result stays staged, so the photo is not sent to Vision again
+                logger.info(f"{filename}: No text was found.")
+    if failed:
+        raise IncompleteRun(f"OCR failed for {len(failed)} photo(s): {', '.join(failed)}", added)
+    return added
@@ -0,0 +1,355 @@
+"""
+Organize stage: turn OCR text into structured inventory entries.
+
+New OCR entries (photos not yet in organized_texts.txt) are sent to OpenAI in chunks to
+extract the fields below, each entry gets a box location from the shared component
+classifier, and the entries are appended to organized_texts.txt:
+
+  Image: <file name>
+  Part number: ...
+  Manufacturer Part number: ...
+  Fabricated Company: ...
+  Description: ...
+  Footprint: ...
+  Component Type: ...
+  Location: <prefix><number>
+
+Entries that share a part number are then given the same location.
+
+Chunks are made of whole OCR entries, and with a CheckpointStore every entry OpenAI returns
+is staged per photo as soon as its chunk completes. When a request fails the run stops,
+commits the entries of the chunks that did complete and leaves the rest for the next run,
+which sends only the entries that have nothing staged. Such a run (and one cut short by
+max_chunks) raises IncompleteRun, so the pipeline runner does not mark it as done.
+"""
+
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple
+
+from lab_inventory.classify import location_prefix
+from lab_inventory.pipeline.checkpoint import (CheckpointStore, append_text_durable,
+                                               atomic_write_text, discard_uncommitted_tail)
+from lab_inventory.pipeline.dag import IncompleteRun
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 5000       # Characters of OCR text per OpenAI request
+TOTAL_LOCATIONS = 128   # Box locations per prefix (numbered 1 to 128)
+OPENAI_MODEL = "gpt-4-turbo"
+SYSTEM_PROMPT = "You are a helpful assistant that extracts structured data."
+EXTRACTION_PROMPT = """Extract the following fields from the text:
+Image (as the first line in the format "Image: <filename>"), Part number, Manufacturer Part number, Fabricated Company, Description, Footprint, and Component Type.
+Format the output exactly as follows (do not include a Location):
+
+Image: <filename>
+Part number: <value>
+Manufacturer Part number: <value>
+Fabricated Company: <value>
+Description: <value>
+Footprint: <value>
+Component Type: <value>
+
+Process each entry found in the text using the above structure. Do not include any additional formatting or text.
+
+Text:
+{chunk}
+"""
+
+_IMAGE_LINE = re.compile(r"^Image:\s*(\S+)", re.MULTILINE)
+_LOCATION_LINE = re.compile(r"^Location:\s*([A-Z])(\d+)", re.MULTILINE)
+
+
+def split_entries(text: str) -> List[str]:
+    """Entries of an OCR or organized text file (blocks separated by blank lines)"""
+    return [entry for entry in text.strip().split("\n\n") if entry.strip()]
+
+
+def entry_image(entry: str) -> Optional[str]:
+    """The photo file name of an entry, from its "Image: " line"""
+    image_match = _IMAGE_LINE.search(entry)
+    return image_match.group(1) if image_match else None
+
+
+def _field(entry: str, label: str) -> str:
+    match = re.search(rf"^{label}:\s*(.+)", entry, re.MULTILINE)
+    return match.group(1).strip() if match else ""
+
+
+def load_organized(output_file: str) -> Tuple[Set[str], Dict[str, Set[int]]]:
+    """Photos already organized, and the location numbers used per prefix"""
+    existing_images: Set[str] = set()
+    used_locations: Dict[str, Set[int]] = {}
+    if os.path.exists(output_file):
+        discard_uncommitted_tail(output_file)
+        with open(output_file, "r") as f:
+            for entry in split_entries(f.read()):
+                image_name = entry_image(entry)
+                if image_name:
+                    existing_images.add(image_name)
+                loc_match = _LOCATION_LINE.search(entry)
+                if loc_match:
+                    used_locations.setdefault(loc_match.group(1), set()).add(
+                        int(loc_match.group(2)))
+    return existing_images, used_locations
+
+
+def select_new_entries(entries: List[str], existing_images: Set[str]) -> List[str]:
+    """OCR entries whose photo has not been organized yet (entries without an image line are kept)"""
+    return [entry for entry in entries if entry_image(entry) not in existing_images]
+
+
+def openai_client(api_key: Optional[str] = None):
+    """OpenAI client for the OPENAI_API_KEY in the environment"""
+    import openai
+    api_key = api_key or os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise ValueError(
+            "Missing OpenAI API Key. Set OPENAI_API_KEY in your environment variables.")
+    return openai.OpenAI(api_key=api_key)
+
+
+def entry_checkpoint_key(image_name: str) -> str:
+    return f"entry:{image_name}"
+
+
+def chunk_entries(entries: List[str], chunk_size: int = CHUNK_SIZE,
+                  max_chunks: Optional[int] = None) -> List[str]:
+    """
+    Join entries into chunks of at most chunk_size characters without splitting an entry
+    (an entry longer than chunk_size gets a chunk of its own)
+    """
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    for entry in entries:
+        if current and size + len(entry) + 2 > chunk_size:
+            chunks.append("\n\n".join(current))
+            current, size = [], 0
+        current.append(entry)
+        size += len(entry) + 2
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks if max_chunks is None else chunks[:max_chunks]
+
+
+def extract_chunk(client, chunk: str, model: str = OPENAI_MODEL) -> str:
+    """Structured entries for one chunk of OCR text (one OpenAI request)"""
+    response = client.chat.completions.create(
+        model=model,
+        messages=[
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": EXTRACTION_PROMPT.format(chunk=chunk)},
+        ],
+    )
+    return response.choices[0].message.content.strip()
+
+
+def stage_entries(checkpoint: Optional[CheckpointStore], entries: List[str]) -> None:
+    """Stage extracted entries per photo until they are committed to the output file"""
+    if checkpoint:
+        for entry in entries:
+            image_name = entry_image(entry)
+            if image_name:
+                checkpoint.put(entry_checkpoint_key(image_name), entry)
+
+
+def extract_fields(client, text: str, chunk_size: int = CHUNK_SIZE,
+                   max_chunks: Optional[int] = None,
+                   checkpoint: Optional[CheckpointStore] = None,
+                   workers: int = 1) -> Optional[str]:
+    """
+    Split OCR text into chunks and extract structured entries from each with OpenAI, with
+    up to 'workers' requests at once. Entries already staged in the checkpoint are reused
+    instead of being sent again. Returns the entries, or None if there are none. If a request
+    fails, no further chunks are sent and IncompleteRun is raised with the entries of the
+    chunks before it (later chunks that completed stay staged); the same happens when
+    max_chunks leaves chunks unsent. Without a client, one is created (openai_client) only
+    if there is a chunk to send.
+    """
+    extracted_data = []
+    pending = []
+    for entry in split_entries(text):
+        image_name = entry_image(entry)
+        staged = checkpoint.get(entry_checkpoint_key(image_name)) \
+            if checkpoint and image_name else None
+        if staged is not None:
+            extracted_data.append(staged)
+        else:
+            pending.append(entry)
+    if extracted_data:
+        logger.info(f"Reusing {len(extracted_data)} staged entries.")
+
+    all_chunks = chunk_entries(pending, chunk_size)
+    chunks = all_chunks if max_chunks is None else all_chunks[:max_chunks]
+    if chunks and client is None:
+        client = openai_client()
+
+    def request(idx: int) -> List[str]:
+        logger.info(f"Processing chunk {idx + 1}/{len(chunks)}...")
+        entries = split_entries(extract_chunk(client, chunks[idx]))
+        stage_entries(checkpoint, entries)
+        return entries
+
+    incomplete = None
+    if len(chunks) < len(all_chunks):
+        incomplete = f"{len(all_chunks) - len(chunks)} chunk(s) left for the next run (max_chunks)"
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        indices = range(len(chunks))
+        results = executor.map(request, indices) if workers > 1 else map(request, indices)
+        for idx in indices:
+            try:
+                extracted_data.extend(next(results))
+            except Exception as e:
+                logger.error(f"Error in OpenAI API call: {e}")
+                logger.warning(f"Stopped after {idx} of {len(chunks)} chunks; "
+                               f"rerun to continue from chunk {idx + 1}.")
+                incomplete = f"OpenAI request failed after {idx} of {len(chunks)} chunks: {e}"
+                executor.shutdown(cancel_futures=True)
+                break
+    result = "\n\n".join(extracted_data) if extracted_data else None
+    if incomplete:
+        raise IncompleteRun(incomplete, result)
+    return result
+
+
+class LocationAllocator:
+    """
+    Assigns box locations: the prefix letter comes from the shared component classifier
+    (lab_inventory.classify), and the number is one past the highest number used for that
+    prefix, or the smallest free number once that would exceed total_locations.
+    """
+
+    def __init__(self, used_locations: Dict[str, Set[int]],
+                 total_locations: int = TOTAL_LOCATIONS):
+        self.used_locations = used_locations
+        self.total_locations = total_locations
+
+    def assign(self, component_type: str, description: str = "") -> str:
+        prefix = location_prefix(component_type, description)
+        used = self.used_locations.setdefault(prefix, set())
+        if not used:
+            chosen = 1
+        elif max(used) < self.total_locations:
+            chosen = max(used) + 1
+        else:
+            available = sorted(set(range(1, self.total_locations + 1)) - used)
+            chosen = available[0] if available else None
+
+        if chosen is None:
+            logger.warning(f"No available locations for prefix {prefix}")
+            return ""
+        used.add(chosen)
+        return f"{prefix}{chosen}"
+
+    def locate_entry(self, entry: str) -> Tuple[str, str]:
+        """An extracted entry with a "Location: " line added, and the location"""
+        location = self.assign(_field(entry, "Component Type"), _field(entry, "Description"))
+        return entry.strip() + f"\nLocation: {location}", location
+
+    def locate(self, extracted_data: str) -> List[str]:
+        """Add a "Location: " line to each extracted entry"""
+        return [self.locate_entry(entry)[0] for entry in extracted_data.split("\n\n")]
+
+
+def append_unique_entries(output_file: str, entries: List[str],
+                          existing_images: Set[str],
+                          checkpoint: Optional[CheckpointStore] = None) -> List[str]:
+    """
+    Append the entries whose photo is not in the output file yet, in one atomic write, and
+    discard their staged checkpoints; returns the appended entries
+    """
+    final_entries = []
+    for entry in entries:
+        image_name = entry_image(entry)
+        if image_name is None or image_name not in existing_images:
+            final_entries.append(entry)
+            if image_name:
+                existing_images.add(image_name)
+    if final_entries:
+        append_text_durable(output_file, "\n\n".join(final_entries) + "\n\n")
+    if checkpoint:
+        for entry in entries:
+            image_name = entry_image(entry)
+            if image_name:
+                checkpoint.discard(entry_checkpoint_key(image_name))
+    return final_entries
+
+
+def unify_duplicate_locations(output_file: str) -> bool:
+    """
+    Give entries that share a Part number or Manufacturer Part number the location of the
+    first of them. Returns True if the output file was rewritten.
+    """
+    with open(output_file, "r") as f:
+        all_output_entries = split_entries(f.read())
+
+    duplicate_found = False
+    for label in ("Part number", "Manufacturer Part number"):
+        groups: Dict[str, List[int]] = {}
+        for idx, entry in enumerate(all_output_entries):
+            value = _field(entry, label)
+            if value:
+                groups.setdefault(value, []).append(idx)
+
+        for value, indices in groups.items():
+            if len(indices) < 2:
+                continue
+            duplicate_found = True
+            logger.info(f"Duplicate entries for {label}: {value}")
+            unified_location = _field(all_output_entries[indices[0]], "Location")
+            if unified_location:
+                for idx in indices:
+                    all_output_entries[idx] = re.sub(
+                        r"^(Location:\s*).+", f"\\g<1>{unified_location}",
+                        all_output_entries[idx], flags=re.MULTILINE)
+
+    if duplicate_found:
+        atomic_write_text(output_file, "\n\n".join(all_output_entries) + "\n\n")
+    return duplicate_found
+
+
+def organize_new_entries(client, input_file: str, output_file: str,
+                         chunk_size: int = CHUNK_SIZE,
+                         max_chunks: Optional[int] = None,
+                         checkpoint: Optional[CheckpointStore] = None,
+                         workers: int = 1) -> List[str]:
+    """
+    Run the organize stage on the OCR entries that are not in the output file yet and
+    return the entries that were appended. Duplicate locations are unified afterwards.
+    'workers' is the number of OpenAI requests sent at once. If not every new entry could be
+    sent, the entries that were extracted are still appended and IncompleteRun is raised
+    with them.
+    """
+    existing_images, used_locations = load_organized(output_file)
+    logger.info(f"Found {len(existing_images)} already processed images.")
+
+    with open(input_file, "r") as f:
+        all_entries = split_entries(f.read())
+    new_entries = select_new_entries(all_entries, existing_images)
+    logger.info(f"Processing {len(new_entries)} new entries out of "
+                f"{len(all_entries)} total entries.")
+
+    appended: List[str] = []
+    incomplete: Optional[IncompleteRun] = None
+    if new_entries:
+        try:
+            extracted_data = extract_fields(client, "\n\n".join(new_entries), chunk_size,
+                                            max_chunks, checkpoint, workers)
+        except IncompleteRun as e:
+            extracted_data, incomplete = e.result, e
+        if extracted_data:
+            located = LocationAllocator(used_locations).locate(extracted_data)
+            appended = append_unique_entries(output_file, located, existing_images,
+                                             checkpoint)
+            logger.info(f"{len(appended)} new unique entries appended to {output_file}")
+        else:
+            logger.warning("No data extracted from API call.")
+
+    if os.path.exists(output_file) and unify_duplicate_locations(output_file):
+        logger.info("Duplicate locations updated in the output file.")
+    if incomplete:
+        raise IncompleteRun(str(incomplete), appended)
+    return appended
@@ -0,0 +1,46 @@
+"""Working files of the pipeline, laid out like the repository's numbered folders."""
+
+import os
+from dataclasses import dataclass
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@dataclass
+class PipelinePaths:
+    """Where each stage reads and writes its files"""
+    photo_dir: str
+    download_dir: str
+    converted_dir: str
+    extracted_file: str
+    organized_file: str
+    snapshot_file: str
+    embeddings_file: str
+    labels_file: str
+    # Which labels went out in which print batch (lab_inventory.label_ledger)
+    label_ledger_file: str
+    ingest_state_file: str
+    run_state_file: str
+    # Paid results staged until they are committed to the text files
+    checkpoint_dir: str
+
+    @classmethod
+    def in_directory(cls, root: str = REPO_ROOT) -> "PipelinePaths":
+        photo_dir = os.path.join(root, "01_inventory_original_files")
+        info_dir = os.path.join(root, "04_extracted_info")
+        return cls(
+            photo_dir=photo_dir,
+            # Photos uploaded through the web app, downloaded by the ingest worker
+            download_dir=os.path.join(photo_dir, "component_images"),
+            converted_dir=os.path.join(root, "03_converted_to_jpeg"),
+            extracted_file=os.path.join(info_dir, "extracted_texts.txt"),
+            organized_file=os.path.join(info_dir, "organized_texts.txt"),
+            snapshot_file=os.path.join(info_dir, "extracted_texts.arrow"),
+            embeddings_file=os.path.join(info_dir, "extracted_texts.embeddings.npz"),
+            labels_file=os.path.join(info_dir, "labels.pdf"),
+            label_ledger_file=os.path.join(info_dir, "printed_labels.json"),
+            ingest_state_file=os.path.join(info_dir, "ingest_state.json"),
+            run_state_file=os.path.join(info_dir, "pipeline_state.json"),
+            checkpoint_dir=os.path.join(info_dir, "checkpoints"),
+        )
+
@@ -0,0 +1,187 @@
+"""
+Publish stage: upload the organized inventory and the files derived from it.
+
+Published to the storage bucket:
+
+- extracted_texts.txt, gzip-encoded, with a manifest and a delta of the changed entries so
+  clients can avoid full re-downloads;
+- the precomputed Arrow snapshot the web app and search service load;
+- semantic search embeddings of the snapshot rows;
+- the dashboard summary.
+
+Uploads are skipped when the content is unchanged, and a running search service is asked to
+reload when a new snapshot was published.
+"""
+
+import base64
+import gzip
+import hashlib
+import json
+import logging
+import os
+import urllib.request
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from lab_inventory.catalog import EMBEDDINGS_BLOB, SNAPSHOT_BLOB, SUMMARY_BLOB
+from lab_inventory.pipeline.organize import entry_image
+from lab_inventory.snapshot import build_snapshot_table, summarize_snapshot, write_snapshot
+
+logger = logging.getLogger(__name__)
+
+TEXT_BLOB = "extracted_texts.txt"
+
+
+def content_md5(data: bytes) -> str:
+    """Base64-encoded MD5 digest of 'data', the same format GCS uses for blob.md5_hash"""
+    return base64.b64encode(hashlib.md5(data).digest()).decode("ascii")
+
+
+def entry_key(entry: str) -> str:
+    """
+    A stable key for an organized entry: its image file name, or a content hash for entries
+    that have no "Image:" line.
+    """
+    image_name = entry_image(entry)
+    if image_name:
+        return image_name
+    return "md5:" + hashlib.md5(entry.encode("utf-8")).hexdigest()
+
+
+def sync_file(bucket, local_path: str, firebase_path: str,
+              content_type: str = "text/plain; charset=utf-8") -> Tuple[bool, str]:
+    """
+    Upload a file only if its content differs from the blob already stored. The MD5 of the
+    raw content is kept in the blob's custom metadata ("source-md5"), since the stored bytes
+    are gzip-encoded and GCS's own md5_hash covers the compressed payload.
+    Returns (uploaded, local_md5).
+    """
+    with open(local_path, "rb") as f:
+        data = f.read()
+    local_md5 = content_md5(data)
+
+    # get_blob only fetches the object's metadata, not its content.
+    existing_blob = bucket.get_blob(firebase_path)
+    if existing_blob is not None and (existing_blob.metadata or {}).get("source-md5") == local_md5:
+        logger.info(f"{firebase_path} is unchanged (md5 {local_md5}), skipping upload.")
+        return False, local_md5
+
+    blob = bucket.blob(firebase_path)
+    blob.content_encoding = "gzip"
+    blob.metadata = {"source-md5": local_md5}
+    # mtime=0 keeps the compressed bytes deterministic for identical input.
+    blob.upload_from_string(gzip.compress(data, mtime=0), content_type=content_type)
+    logger.info(f"Uploaded {local_path} to {firebase_path} ({len(data)} bytes, gzip-encoded)")
+    return True, local_md5
+
+
+def publish_manifest_and_delta(bucket, local_path: str, firebase_path: str,
+                               source_md5: str) -> None:
+    """
+    Publish "<name>.manifest.json" (version number and per-entry hashes) and
+    "<name>.delta.json" (entries added, changed or removed since the previous version) next
+    to 'firebase_path'. A client holding version N can apply the delta whose "base_version"
+    is N instead of downloading the whole file again; any other client falls back to a full
+    download.
+    """
+    base_name = os.path.splitext(firebase_path)[0]
+    manifest_path = f"{base_name}.manifest.json"
+    delta_path = f"{base_name}.delta.json"
+
+    previous_manifest = {"version": 0, "entries": {}}
+    manifest_blob = bucket.get_blob(manifest_path)
+    if manifest_blob is not None:
+        try:
+            previous_manifest = json.loads(manifest_blob.download_as_text())
+        except ValueError:
+            logger.warning(f"Ignoring unreadable manifest at {manifest_path}")
+
+    with open(local_path, "r") as f:
+        blocks = [b.strip() for b in f.read().split("\n\n") if b.strip()]
+    current_blocks = {entry_key(block): block for block in blocks}
+    current_hashes = {key: content_md5(block.encode("utf-8"))
+                      for key, block in current_blocks.items()}
+
+    previous_hashes = previous_manifest.get("entries", {})
+    upserted = {key: current_blocks[key] for key, digest in current_hashes.items()
+                if previous_hashes.get(key) != digest}
+    removed = sorted(set(previous_hashes) - set(current_hashes))
+
+    version = previous_manifest.get("version", 0) + 1
+    published_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    delta = {
+        "base_version": previous_manifest.get("version", 0),
+        "version": version,
+        "published_at": published_at,
+        "upserted": upserted,
+        "removed": removed,
+    }
+    manifest = {
+        "version": version,
+        "published_at": published_at,
+        "source-md5": source_md5,
+        "entries": current_hashes,
+    }
+
+    # Write the delta first so a client never sees a manifest without its matching delta.
+    bucket.blob(delta_path).upload_from_string(
+        json.dumps(delta), content_type="application/json")
+    bucket.blob(manifest_path).upload_from_string(
+        json.dumps(manifest), content_type="application/json")
+    logger.info(f"Published manifest v{version} ({len(upserted)} upserted, "
+                f"{len(removed)} removed entries)")
+
+
+def notify_search_service(service_url: str) -> None:
+    """Ask a running search service (lab_inventory.service) to reload now instead of at its
+    next poll"""
+    try:
+        urllib.request.urlopen(urllib.request.Request(
+            f"{service_url.rstrip('/')}/refresh", method="POST"), timeout=30)
+        logger.info(f"Search service at {service_url} reloaded")
+    except OSError as e:
+        logger.warning(f"Could not notify the search service at {service_url}: {e}")
+
+
+def publish_inventory(bucket, organized_file: str, snapshot_file: str, embeddings_file: str,
+                      service_url: Optional[str] = None,
+                      entries: Optional[List[str]] = None) -> bool:
+    """
+    Publish the organized text file, its snapshot, embeddings and dashboard summary.
+    'entries' are the file's entries when the caller already has them in memory.
+    Returns True if a new snapshot was uploaded.
+    """
+    uploaded, source_md5 = sync_file(bucket, organized_file, TEXT_BLOB)
+    if uploaded:
+        publish_manifest_and_delta(bucket, organized_file, TEXT_BLOB, source_md5)
+
+    # The snapshot holds the parsed fields, normalized search keys and numeric values, so
+    # the web app does not have to parse text on each request.
+    if entries is None:
+        with open(organized_file, "r") as f:
+            entries = f.read().split("\n\n")
+    snapshot_blocks = [b.strip() for b in entries if b.strip()]
+    snapshot_table = build_snapshot_table(snapshot_blocks, source_md5)
+    write_snapshot(snapshot_table, snapshot_file)
+    snapshot_uploaded, _ = sync_file(bucket, snapshot_file, SNAPSHOT_BLOB,
+                                     content_type="application/vnd.apache.arrow.file")
+
+    # The embeddings let the web app embed only the query, with no model or network access
+    # at query time. The .npz archive carries timestamps, so it is only rebuilt when the
+    # snapshot changed (or was never embedded).
+    if snapshot_uploaded or bucket.get_blob(EMBEDDINGS_BLOB) is None:
+        from lab_inventory.semantic import SemanticIndex
+        SemanticIndex.build(snapshot_table).save(embeddings_file)
+        sync_file(bucket, embeddings_file, EMBEDDINGS_BLOB,
+                  content_type="application/octet-stream")
+
+    if snapshot_uploaded:
+        # A tiny summary, so the web app's dashboard does not re-scan the inventory
+        summary = summarize_snapshot(snapshot_table, datetime.now().strftime('%Y-%m-%d %H:%M'))
+        bucket.blob(SUMMARY_BLOB).upload_from_string(
+            json.dumps(summary), content_type="application/json")
+        logger.info(f"Published dashboard summary: {summary['total_components']} components, "
+                    f"{summary['distinct_locations']} locations")
+        if service_url:
+            notify_search_service(service_url)
+    return snapshot_uploaded
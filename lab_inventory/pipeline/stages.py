@@ -0,0 +1,159 @@
+"""
+The inventory pipeline (05_01 to 05_05) as stages for the in-process runner (dag).
+
+  ocr       HEIC photos in 01_inventory_original_files -> extracted_texts.txt
+  organize  extracted_texts.txt -> organized_texts.txt (passes the organized entries on)
+  publish   organized entries -> Firebase Storage (text, snapshot, embeddings, summary)
+  labels    organized entries -> labels.pdf
+  counts    photos without an organized entry
+  reorders  the reorder request queue
+
+The Vision client and the storage bucket are created on first use and shared by every
+stage, so SDKs are imported and Firebase is initialized once per run, and only when they
+are needed: the Vision client when a photo actually has to be read, the bucket when a
+stage that uses it runs. The OpenAI client is only created when there are new entries to
+organize.
+"""
+
+import logging
+import os
+import threading
+from functools import cached_property
+from typing import Any, Callable, Dict, List, Optional
+
+from lab_inventory.pipeline.dag import IncompleteRun, Stage
+from lab_inventory.pipeline.paths import PipelinePaths
+
+logger = logging.getLogger(__name__)
+
+
+class PipelineContext:
+    """Paths and lazily created API clients shared by the stages of one run"""
+
+    def __init__(self, paths: PipelinePaths, open_bucket: Callable[[], Any],
+                 service_url: Optional[str] = None, jobs: int = 1,
+                 max_chunks: Optional[int] = None, labels_changed_since: Optional[int] = None,
+                 labels_first_slot: int = 0):
+        self.paths = paths
+        self._open_bucket = open_bucket
+        self.service_url = service_url
+        # Concurrent Vision / OpenAI requests in the ocr and organize stages, and label
+        # render processes
+        self.jobs = jobs
+        # Limit on the OpenAI chunks sent per run (None = all)
+        self.max_chunks = max_chunks
+        # Print only the labels new or changed since this ledger batch (None = all), from
+        # this position of the first sheet (lab_inventory.labels.start_slot)
+        self.labels_changed_since = labels_changed_since
+        self.labels_first_slot = labels_first_slot
+        self._vision_lock = threading.Lock()
+
+    @cached_property
+    def checkpoint(self):
+        from lab_inventory.pipeline.checkpoint import CheckpointStore
+        return CheckpointStore(self.paths.checkpoint_dir)
+
+    @cached_property
+    def vision_extractor(self):
+        from lab_inventory.pipeline.ocr import vision_text_extractor
+        return vision_text_extractor()
+
+    def extract_text(self, image_path: str) -> Optional[str]:
+        """Vision OCR of one photo (a TextExtractor); the client is created for the first one"""
+        with self._vision_lock:
+            extractor = self.vision_extractor
+        return extractor(image_path)
+
+    @cached_property
+    def bucket(self):
+        return self._open_bucket()
+
+
+def read_entries(path: str) -> List[str]:
+    from lab_inventory.pipeline.organize import split_entries
+    with open(path, "r") as f:
+        return split_entries(f.read())
+
+
+def build_stages(context: PipelineContext) -> List[Stage]:
+    paths = context.paths
+
+    def heic_photos() -> List[str]:
+        return [os.path.join(paths.photo_dir, filename)
+                for filename in sorted(os.listdir(paths.photo_dir))
+                if filename.lower().endswith(".heic")]
+
+    def ocr(_: Dict[str, Any]) -> List[str]:
+        from lab_inventory.pipeline.ocr import ocr_images
+        return ocr_images(heic_photos(), paths.converted_dir, paths.extracted_file,
+                          context.extract_text, checkpoint=context.checkpoint,
+                          workers=context.jobs)
+
+    def organize(_: Dict[str, Any]) -> List[str]:
+        from lab_inventory.pipeline.organize import CHUNK_SIZE, organize_new_entries
+        # The OpenAI client is only created if there are new entries to send
+        try:
+            organize_new_entries(None, paths.extracted_file, paths.organized_file, CHUNK_SIZE,
+                                 context.max_chunks, context.checkpoint, context.jobs)
+        except IncompleteRun as e:
+            # The entries organized so far still go to publish, labels and counts
+            raise IncompleteRun(str(e), read_entries(paths.organized_file)
+                                if os.path.exists(paths.organized_file) else [])
+        return read_entries(paths.organized_file)
+
+    def load_organized() -> List[str]:
+        return read_entries(paths.organized_file)
+
+    def publish(results: Dict[str, Any]) -> bool:
+        from lab_inventory.pipeline.publish import publish_inventory
+        return publish_inventory(context.bucket, paths.organized_file, paths.snapshot_file,
+                                 paths.embeddings_file, context.service_url,
+                                 entries=results["organize"])
+
+    def labels(results: Dict[str, Any]) -> str:
+        from lab_inventory.labels import labels_from_entries, print_labels
+        printed = print_labels(labels_from_entries(results["organize"]), paths.labels_file,
+                               paths.label_ledger_file, context.labels_changed_since,
+                               context.labels_first_slot, context.jobs)
+        if printed:
+            logger.info(f"Labels PDF saved as {paths.labels_file} ({len(printed)} labels)")
+        return paths.labels_file
+
+    def counts(results: Dict[str, Any]) -> Dict[str, str]:
+        from lab_inventory.pipeline.counts import image_files, missing_images, organized_images
+        all_files = image_files(paths.photo_dir)
+        processed = organized_images(results["organize"])
+        logger.info(f"Number of images in directory: {len(all_files)}")
+        logger.info(f"Number of images processed: {len(processed)}")
+        missing = missing_images(all_files, processed)
+        for name, relative_path in missing.items():
+            logger.info(f"Missing: {name} (Subfolder: {relative_path})")
+        if not missing:
+            logger.info("All files have been processed.")
+        return missing
+
+    def reorders(_: Dict[str, Any]) -> int:
+        from lab_inventory import reorders as reorder_queue
+        migrated = reorder_queue.migrate_legacy_file(context.bucket)
+        if migrated:
+            logger.info(f"Moved {migrated} request(s) from "
+                        f"'{reorder_queue.LEGACY_REORDER_FILE}' into the queue.")
+        requests = reorder_queue.list_requests(context.bucket)
+        logger.info(f"Queued reorder requests ({len(requests)}):")
+        for request in requests:
+            logger.info(request.to_line())
+        return len(requests)
+
+    return [
+        Stage("ocr", ocr, inputs=lambda: [paths.photo_dir, paths.extracted_file]),
+        Stage("organize", organize, after=("ocr",),
+              inputs=lambda: [paths.extracted_file, paths.organized_file],
+              load=load_organized),
+        Stage("publish", publish, after=("organize",), inputs=lambda: [paths.organized_file]),
+        Stage("labels", labels, after=("organize",),
+              inputs=lambda: [paths.organized_file, paths.labels_file]),
+        Stage("counts", counts, after=("organize",),
+              inputs=lambda: [paths.photo_dir, paths.organized_file]),
+        # The queue lives in the bucket, so there is no local input to compare
+        Stage("reorders", reorders),
+    ]
@@ -0,0 +1,278 @@
+"""
+Streaming photo pipeline: convert -> OCR -> LLM -> allocate, record by record.
+
+In the batch pipeline every stage finishes the whole batch before the next one starts, so
+the first new part is only organized after the last photo has been OCR'd. Here the stages
+are connected by bounded queues and each has its own pool of worker threads, so a photo
+moves on as soon as its stage is done with it:
+
+  convert   HEIC/AVIF -> JPEG with Pillow (CPU; Pillow releases the GIL while decoding)
+  ocr       Google Cloud Vision, one request per photo (network-bound, many workers)
+  llm       OpenAI field extraction over small batches of OCR entries (network-bound)
+  allocate  box location assignment and append to organized_texts.txt (one worker, since
+            locations are handed out sequentially)
+
+The bounded queues give backpressure: a slow stage makes the stages in front of it wait
+instead of piling up converted photos in memory. The OCR and organized output files are
+appended to as records complete, in the same format as the batch stages, so the batch and
+streaming pipelines can be mixed and an interrupted run loses no finished photo. With a
+CheckpointStore, OCR texts and extracted entries are also staged per photo until they are
+committed, so a photo that was read or extracted before a crash is not paid for again.
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from lab_inventory.pipeline.checkpoint import CheckpointStore, append_text_durable
+from lab_inventory.pipeline.ocr import (VISION_EXTENSIONS, TextExtractor, convert_to_jpeg,
+                                        format_ocr_entry, load_processed_images,
+                                        ocr_checkpoint_key, staged_text)
+from lab_inventory.pipeline.organize import (CHUNK_SIZE, LocationAllocator,
+                                             append_unique_entries, entry_checkpoint_key,
+                                             entry_image, extract_chunk, load_organized,
+                                             split_entries, stage_entries)
+
+logger = logging.getLogger(__name__)
+
+QUEUE_SIZE = 16
+CONVERT_WORKERS = min(4, os.cpu_count() or 1)
+OCR_WORKERS = 8
+LLM_WORKERS = 4
+# OCR entries per OpenAI request: larger batches cost fewer prompt tokens per photo, smaller
+# ones get photos through sooner
+LLM_BATCH_SIZE = 4
+# Seconds the LLM stage waits to fill a batch before sending a partial one
+LLM_BATCH_WAIT = 0.5
+
+_DONE = object()
+
+
+@dataclass
+class PhotoRecord:
+    """One photo on its way through the pipeline"""
+    name: str
+    path: str
+    ocr_path: Optional[str] = None
+    text: Optional[str] = None
+    entry: Optional[str] = None
+    location: Optional[str] = None
+    error: Optional[str] = None
+    started: float = field(default_factory=time.perf_counter)
+    finished: Optional[float] = None
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.location is not None
+
+    @property
+    def latency(self) -> Optional[float]:
+        return None if self.finished is None else self.finished - self.started
+
+
+@dataclass
+class StreamStage:
+    """A pipeline step; process() turns a batch of records into the records to pass on"""
+    name: str
+    process: Callable[[List[PhotoRecord]], Iterable[PhotoRecord]]
+    workers: int = 1
+    batch_size: int = 1
+    batch_wait: float = 0.0
+
+
+def _next_batch(inbox: "queue.Queue", stage: StreamStage) -> tuple:
+    """Up to batch_size records (waiting at most batch_wait for more), and whether the
+    input is exhausted"""
+    item = inbox.get()
+    if item is _DONE:
+        return [], True
+    batch = [item]
+    deadline = time.monotonic() + stage.batch_wait
+    while len(batch) < stage.batch_size:
+        try:
+            item = inbox.get(timeout=max(0.0, deadline - time.monotonic()))
+        except queue.Empty:
+            break
+        if item is _DONE:
+            inbox.put(_DONE)  # leave the marker for this stage's other workers
+            break
+        batch.append(item)
+    return batch, False
+
+
+def stream(records: Iterable[PhotoRecord], stages: List[StreamStage],
+           queue_size: int = QUEUE_SIZE) -> Iterator[PhotoRecord]:
+    """
+    Run records through the stages and yield each one in the calling thread as soon as it
+    leaves the last stage. A record whose stage raised is yielded straight away with its
+    error set; records a stage does not pass on are dropped.
+    """
+    queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+    output: "queue.Queue" = queue.Queue()
+    threads = []
+
+    def run_worker(index: int, stage: StreamStage, remaining: List[int], lock: threading.Lock):
+        inbox = queues[index]
+        outbox = queues[index + 1] if index + 1 < len(stages) else output
+        while True:
+            batch, exhausted = _next_batch(inbox, stage)
+            if exhausted:
+                inbox.put(_DONE)
+                with lock:
+                    remaining[0] -= 1
+                    last = remaining[0] == 0
+                if last:
+                    outbox.put(_DONE)
+                return
+            started = time.perf_counter()
+            try:
+                passed = list(stage.process(batch))
+            except Exception as e:
+                logger.warning(f"{stage.name} failed for {', '.join(r.name for r in batch)}: {e}")
+                for record in batch:
+                    record.error = f"{stage.name}: {e}"
+                    output.put(record)
+                continue
+            elapsed = time.perf_counter() - started
+            passed_ids = {id(record) for record in passed}
+            for record in batch:
+                record.timings[stage.name] = elapsed
+                if record.error is not None and id(record) not in passed_ids:
+                    output.put(record)
+            for record in passed:
+                outbox.put(record)
+
+    for index, stage in enumerate(stages):
+        remaining, lock = [stage.workers], threading.Lock()
+        for _ in range(stage.workers):
+            thread = threading.Thread(target=run_worker, args=(index, stage, remaining, lock),
+                                      name=f"{stage.name}-worker", daemon=True)
+            thread.start()
+            threads.append(thread)
+
+    def feed():
+        for record in records:
+            record.started = time.perf_counter()
+            queues[0].put(record)
+        queues[0].put(_DONE)
+
+    feeder = threading.Thread(target=feed, name="stream-feeder", daemon=True)
+    feeder.start()
+
+    while True:
+        record = output.get()
+        if record is _DONE:
+            break
+        record.finished = time.perf_counter()
+        yield record
+    feeder.join()
+    for thread in threads:
+        thread.join()
+
+
+class PhotoPipeline:
+    """The convert -> OCR -> LLM -> allocate pipeline over the pipeline's text files"""
+
+    def __init__(self, extract_text: TextExtractor, llm_client, converted_dir: str,
+                 extracted_file: str, organized_file: str,
+                 convert_workers: int = CONVERT_WORKERS, ocr_workers: int = OCR_WORKERS,
+                 llm_workers: int = LLM_WORKERS, llm_batch_size: int = LLM_BATCH_SIZE,
+                 llm_batch_wait: float = LLM_BATCH_WAIT, queue_size: int = QUEUE_SIZE,
+                 checkpoint: Optional[CheckpointStore] = None):
+        self.extract_text = extract_text
+        self.checkpoint = checkpoint
+        self.llm_client = llm_client
+        self.converted_dir = converted_dir
+        self.extracted_file = extracted_file
+        self.organized_file = organized_file
+        self.queue_size = queue_size
+        self.stages = [
+            StreamStage("convert", self._convert, convert_workers),
+            StreamStage("ocr", self._ocr, ocr_workers),
+            StreamStage("llm", self._llm, llm_workers, llm_batch_size, llm_batch_wait),
+            StreamStage("allocate", self._allocate, 1),
+        ]
+        self._write_lock = threading.Lock()
+        # Held while organized_texts.txt is appended to; hold it to read a consistent file
+        # (e.g. to publish) while the pipeline is running
+        self.organized_lock = threading.Lock()
+        self._existing_images, used_locations = load_organized(organized_file)
+        self._allocator = LocationAllocator(used_locations)
+
+    def _convert(self, records: List[PhotoRecord]) -> List[PhotoRecord]:
+        for record in records:
+            stem, extension = os.path.splitext(record.name)
+            if extension.lower() in VISION_EXTENSIONS:
+                record.ocr_path = record.path
+            else:
+                record.ocr_path = os.path.join(self.converted_dir, stem + ".jpg")
+                convert_to_jpeg(record.path, record.ocr_path)
+        return records
+
+    def _ocr(self, records: List[PhotoRecord]) -> List[PhotoRecord]:
+        passed = []
+        for record in records:
+            record.text = staged_text(self.checkpoint, record.name, self.extract_text,
+                                      lambda: record.ocr_path)
+            if not record.text:
+                record.error = "No text was found"
+                continue
+            with self._write_lock:
+                append_text_durable(self.extracted_file,
+                                    format_ocr_entry(record.name, record.text))
+            if self.checkpoint:
+                self.checkpoint.discard(ocr_checkpoint_key(record.name))
+            passed.append(record)
+        return passed
+
+    def _llm(self, records: List[PhotoRecord]) -> List[PhotoRecord]:
+        passed, pending = [], []
+        for record in records:
+            if self.checkpoint:
+                record.entry = self.checkpoint.get(entry_checkpoint_key(record.name))
+            (passed if record.entry is not None else pending).append(record)
+        # Split the batch so no request exceeds the batch pipeline's chunk size
+        batch, size = [], 0
+        for record in pending + [None]:
+            entry = None if record is None else format_ocr_entry(record.name, record.text)
+            if batch and (record is None or size + len(entry) > CHUNK_SIZE):
+                passed.extend(self._extract_batch(batch))
+                batch, size = [], 0
+            if record is not None:
+                batch.append(record)
+                size += len(entry)
+        return passed
+
+    def _extract_batch(self, records: List[PhotoRecord]) -> List[PhotoRecord]:
+        text = "\n\n".join(format_ocr_entry(r.name, r.text).strip() for r in records)
+        extracted = split_entries(extract_chunk(self.llm_client, text))
+        stage_entries(self.checkpoint, extracted)
+        entries = {entry_image(entry): entry for entry in extracted}
+        for record in records:
+            record.entry = entries.get(record.name)
+            if record.entry is None:
+                record.error = "The LLM returned no entry for this photo"
+        return [record for record in records if record.entry is not None]
+
+    def _allocate(self, records: List[PhotoRecord]) -> List[PhotoRecord]:
+        for record in records:
+            record.entry, record.location = self._allocator.locate_entry(record.entry)
+            with self.organized_lock:
+                append_unique_entries(self.organized_file, [record.entry], self._existing_images,
+                                      self.checkpoint)
+        return records
+
+    def run(self, photo_paths: Iterable[str]) -> Iterator[PhotoRecord]:
+        """Stream the photos that have no OCR entry yet; yields each finished or failed one"""
+        os.makedirs(self.converted_dir, exist_ok=True)
+        for path in (self.extracted_file, self.organized_file):
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        processed = load_processed_images(self.extracted_file)
+        records = (PhotoRecord(os.path.basename(path), path) for path in photo_paths
+                   if os.path.basename(path) not in processed)
+        return stream(records, self.stages, self.queue_size)
@@ -0,0 +1,297 @@
+"""
+Append-safe reorder request queue in Firebase Storage.
+
+Each request is its own small object under reorder_requests/, created with
+if_generation_match=0 so an upload can never replace an existing object. Submitting a
+request is one O(1) upload regardless of queue length, and concurrent submitters cannot
+overwrite each other. The request fields are also stored as custom metadata so a single
+prefix listing returns the whole queue without downloading each object.
+
+The queue length is kept in reorder_stats.json, updated on every submit and delete with a
+generation-conditioned read-modify-write, so the dashboard can show it without listing the queue.
+The counter is created (from a listing) before a request is written or deleted, so a listing
+that seeds it never already contains a change whose writer then counts it again.
+
+Only the standard google-cloud-storage client is used, so the queue works unchanged against
+a local emulator such as fake-gcs-server when STORAGE_EMULATOR_HOST is set.
+"""
+
+import hashlib
+import json
+import logging
+import random
+import re
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+try:
+    from google.api_core.exceptions import NotFound, PreconditionFailed
+except ImportError:  # Without google-cloud-storage the queue can only use a LocalBucket
+    from lab_inventory.local_storage import NotFound, PreconditionFailed
+
+logger = logging.getLogger(__name__)
+
+REORDER_PREFIX = "reorder_requests/"
+LEGACY_REORDER_FILE = "to_be_ordered.txt"
+REORDER_STATS_FILE = "reorder_stats.json"
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Line format written to to_be_ordered.txt before the per-object queue existed
+_LEGACY_LINE = re.compile(
+    r"^Date and Time: (?P<date_time>.*?), "
+    r"Manufacturer Part Number: (?P<manufacturer_pn>.*?), "
+    r"Description: (?P<description>.*), "
+    r"Requester Name: (?P<requester_name>.*)$")
+
+
+@dataclass
+class ReorderRequest:
+    """A single reorder request stored as one object in the queue"""
+    request_id: str
+    date_time: str
+    manufacturer_pn: str
+    description: str
+    requester_name: str
+    # Object generation as last read from storage (None for requests not read back yet)
+    generation: Optional[int] = None
+
+    @property
+    def blob_name(self) -> str:
+        return request_blob_name(self.request_id)
+
+    def fields(self) -> Dict[str, str]:
+        """The stored fields of the request"""
+        return {
+            "request_id": self.request_id,
+            "date_time": self.date_time,
+            "manufacturer_pn": self.manufacturer_pn,
+            "description": self.description,
+            "requester_name": self.requester_name,
+        }
+
+    def to_line(self) -> str:
+        """Render the request in the legacy to_be_ordered.txt line format"""
+        return (
+            f"Date and Time: {self.date_time}, "
+            f"Manufacturer Part Number: {self.manufacturer_pn}, "
+            f"Description: {self.description}, "
+            f"Requester Name: {self.requester_name}"
+        )
+
+
+def request_blob_name(request_id: str) -> str:
+    """Object name of a request in the queue"""
+    return f"{REORDER_PREFIX}{request_id}.json"
+
+
+def new_request_id(now: Optional[datetime] = None) -> str:
+    """Create a unique request ID that sorts by submission time"""
+    now = now or datetime.now()
+    return f"{now:%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:8]}"
+
+
+def _write_request(bucket, request: ReorderRequest) -> None:
+    """Create the request object; raises PreconditionFailed if it already exists"""
+    fields = request.fields()
+    blob = bucket.blob(request.blob_name)
+    blob.metadata = fields
+    blob.upload_from_string(json.dumps(fields), content_type="application/json",
+                            if_generation_match=0)
+    request.generation = blob.generation
+
+
+def submit_request(bucket, manufacturer_pn: str, description: str, requester_name: str,
+                   max_attempts: int = 3) -> ReorderRequest:
+    """Append a request to the queue with a single create-only upload"""
+    ensure_request_stats(bucket)
+    now = datetime.now()
+    for _ in range(max_attempts):
+        request = ReorderRequest(
+            request_id=new_request_id(now),
+            date_time=now.strftime(DATE_FORMAT),
+            manufacturer_pn=manufacturer_pn,
+            description=description,
+            requester_name=requester_name,
+        )
+        try:
+            _write_request(bucket, request)
+            adjust_request_count(bucket, 1)
+            return request
+        except PreconditionFailed:
+            # Only possible on an ID collision; pick a new ID and try again
+            logger.warning(f"Reorder request ID {request.request_id} already exists, retrying")
+    raise RuntimeError("Could not allocate a unique reorder request ID")
+
+
+def _request_from_blob(blob) -> Optional[ReorderRequest]:
+    """Build a request from a listed blob's metadata, downloading the body only if needed"""
+    fields = blob.metadata
+    if not fields:
+        try:
+            fields = json.loads(blob.download_as_text())
+        except (NotFound, ValueError) as e:
+            logger.warning(f"Skipping unreadable reorder request {blob.name}: {e}")
+            return None
+    request_id = blob.name[len(REORDER_PREFIX):].rsplit(".json", 1)[0]
+    return ReorderRequest(
+        request_id=request_id,
+        date_time=fields.get("date_time", ""),
+        manufacturer_pn=fields.get("manufacturer_pn", ""),
+        description=fields.get("description", ""),
+        requester_name=fields.get("requester_name", ""),
+        generation=blob.generation,
+    )
+
+
+def list_requests(bucket) -> List[ReorderRequest]:
+    """List all queued requests, oldest first"""
+    requests = []
+    for blob in bucket.list_blobs(prefix=REORDER_PREFIX):
+        if not blob.name.endswith(".json"):
+            continue
+        request = _request_from_blob(blob)
+        if request:
+            requests.append(request)
+    requests.sort(key=lambda r: r.request_id)
+    return requests
+
+
+def delete_requests(bucket, request_ids: Iterable[str],
+                    generations: Optional[Dict[str, int]] = None) -> int:
+    """
+    Delete the given requests by ID and return how many were removed.
+    Only the selected objects are touched. When 'generations' holds the generation a request had
+    when it was shown, the delete is conditioned on it, so a request that changed in the meantime
+    is left alone instead of being deleted unseen.
+    """
+    generations = generations or {}
+    ensure_request_stats(bucket)
+    deleted = 0
+    for request_id in request_ids:
+        try:
+            bucket.blob(request_blob_name(request_id)).delete(
+                if_generation_match=generations.get(request_id))
+            deleted += 1
+        except NotFound:
+            logger.info(f"Reorder request {request_id} was already deleted")
+        except PreconditionFailed:
+            logger.warning(f"Reorder request {request_id} changed since it was listed; not deleted")
+    if deleted:
+        adjust_request_count(bucket, -deleted)
+    return deleted
+
+
+def clear_requests(bucket) -> int:
+    """Delete every queued request and return how many were removed"""
+    requests = list_requests(bucket)
+    return delete_requests(bucket, [r.request_id for r in requests],
+                           {r.request_id: r.generation for r in requests})
+
+
+def migrate_legacy_file(bucket) -> int:
+    """
+    Move requests from the legacy to_be_ordered.txt blob into the per-object queue and empty it.
+    The reset is conditioned on the generation that was read, so a request appended to the
+    legacy file by an old client in the meantime is picked up on the next run instead of lost.
+    """
+    blob = bucket.get_blob(LEGACY_REORDER_FILE)
+    if blob is None or not blob.size:
+        return 0
+
+    ensure_request_stats(bucket)
+    migrated = 0
+    lines = blob.download_as_text(if_generation_match=blob.generation).splitlines()
+    for index, line in enumerate(lines):
+        match = _LEGACY_LINE.match(line.strip())
+        if not match:
+            continue
+        fields = match.groupdict()
+        try:
+            timestamp = datetime.strptime(fields["date_time"], DATE_FORMAT)
+        except ValueError:
+            timestamp = datetime.now()
+        # Derive the ID from the line so a repeated migration does not duplicate requests
+        line_hash = hashlib.md5(f"{index}:{line}".encode("utf-8")).hexdigest()[:8]
+        request = ReorderRequest(
+            request_id=f"{timestamp:%Y%m%dT%H%M%S%f}-{line_hash}", **fields)
+        try:
+            _write_request(bucket, request)
+            migrated += 1
+        except PreconditionFailed:
+            pass
+
+    try:
+        blob.upload_from_string("", content_type="text/plain",
+                                if_generation_match=blob.generation)
+    except PreconditionFailed:
+        logger.warning(f"{LEGACY_REORDER_FILE} changed during migration; it will be migrated again")
+    if migrated:
+        adjust_request_count(bucket, migrated)
+    return migrated
+
+
+def _write_stats(bucket, active_requests: int, if_generation_match: Optional[int]) -> None:
+    """Write the queue counters"""
+    stats = {
+        "active_requests": active_requests,
+        "updated_at": datetime.now().strftime(DATE_FORMAT),
+    }
+    bucket.blob(REORDER_STATS_FILE).upload_from_string(
+        json.dumps(stats), content_type="application/json",
+        if_generation_match=if_generation_match)
+
+
+def recount_requests(bucket) -> int:
+    """Reset the queue counters from a full listing and return the count"""
+    count = len(list_requests(bucket))
+    _write_stats(bucket, count, if_generation_match=None)
+    return count
+
+
+def ensure_request_stats(bucket) -> None:
+    """Create the queue counters from a listing if they do not exist yet"""
+    if bucket.get_blob(REORDER_STATS_FILE) is not None:
+        return
+    try:
+        _write_stats(bucket, len(list_requests(bucket)), if_generation_match=0)
+    except PreconditionFailed:
+        pass  # Created by another writer in the meantime
+    except Exception as e:
+        logger.warning(f"Could not create {REORDER_STATS_FILE}: {e}")
+
+
+def adjust_request_count(bucket, delta: int, max_attempts: int = 8) -> None:
+    """
+    Add 'delta' to the active request counter with optimistic concurrency: the write is
+    conditioned on the generation that was read and retried with jitter if another writer won.
+    The queue itself stays the source of truth, so a failed update only logs a warning and
+    recount_requests() repairs the counter.
+    """
+    for attempt in range(max_attempts):
+        try:
+            blob = bucket.get_blob(REORDER_STATS_FILE)
+            if blob is None:
+                # Removed since ensure_request_stats(): seed from the queue, which already
+                # includes this change
+                count = len(list_requests(bucket))
+                _write_stats(bucket, count, if_generation_match=0)
+                return
+            stats = json.loads(blob.download_as_text(if_generation_match=blob.generation))
+            count = max(0, int(stats.get("active_requests", 0)) + delta)
+            _write_stats(bucket, count, if_generation_match=blob.generation)
+            return
+        except (PreconditionFailed, NotFound):
+            time.sleep(random.uniform(0, 0.05 * 2 ** attempt))
+        except Exception as e:
+            logger.warning(f"Could not update {REORDER_STATS_FILE}: {e}")
+            return
+    logger.warning(f"Gave up updating {REORDER_STATS_FILE} after {max_attempts} attempts")
+
+
+def read_request_stats(bucket) -> Dict:
+    """Read the queue counters, rebuilding them from a listing if they do not exist yet"""
+    ensure_request_stats(bucket)
+    return json.loads(bucket.blob(REORDER_STATS_FILE).download_as_text())
@@ -0,0 +1,163 @@
+"""
+Semantic search over inventory descriptions with a local LSA embedding.
+
+The pipeline (05_02) embeds every snapshot row when the inventory is published: TF-IDF over
+the description, component type and category, reduced with a truncated SVD (latent semantic
+analysis) so terms that occur in similar descriptions land close together. The vocabulary,
+idf weights, SVD projection and L2-normalized row vectors are saved as one .npz file next
+to the snapshot.
+
+At query time the query is embedded with the same tokenizer and projection, and the cosine
+similarity to every row is a single matrix-vector product. Nothing is fetched from the
+network and no model is loaded.
+"""
+
+import math
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pyarrow as pa
+
+from lab_inventory.classify import classify_component
+from lab_inventory.index import tokenize
+from lab_inventory.snapshot import NOT_AVAILABLE
+
+SEMANTIC_FORMAT_VERSION = 1
+SEMANTIC_DIMENSIONS = 128
+# Keep the most frequent terms so the dense TF-IDF matrix stays small for large inventories
+SEMANTIC_MAX_VOCABULARY = 8192
+SEMANTIC_MIN_SCORE = 0.2
+# Snapshot columns embedded for each row
+SEMANTIC_FIELDS = ["description", "component_type", "category"]
+
+
+def document_text(row: Dict[str, Optional[str]]) -> str:
+    """Text embedded for one snapshot row"""
+    return " ".join(row[field] for field in SEMANTIC_FIELDS
+                    if row.get(field) and row[field] != NOT_AVAILABLE)
+
+
+def query_text(query: str) -> str:
+    """Expand a query with its category name, so "ldo" also matches rows classified as regulators"""
+    category = classify_component(query)
+    return f"{query} {category.name}" if category else query
+
+
+def mask_from_bits(bits: int, size: int) -> np.ndarray:
+    """Convert an index bitmap (bit i = row i) into a boolean row mask"""
+    data = np.frombuffer(bits.to_bytes((size + 7) // 8, "little"), dtype=np.uint8)
+    return np.unpackbits(data, bitorder="little")[:size].astype(bool)
+
+
+def _term_weights(tokens: List[str]) -> Dict[str, float]:
+    """Sublinear term frequency (1 + log tf)"""
+    counts: Dict[str, int] = {}
+    for token in tokens:
+        counts[token] = counts.get(token, 0) + 1
+    return {term: 1.0 + math.log(count) for term, count in counts.items()}
+
+
+def _truncated_svd(matrix: np.ndarray, dimensions: int, seed: int = 0) -> np.ndarray:
+    """
+    Top right singular vectors (terms x dimensions) by randomized SVD, so only thin
+    matrices are decomposed. The seed keeps published embeddings reproducible.
+    """
+    rng = np.random.default_rng(seed)
+    sketch = matrix @ rng.standard_normal((matrix.shape[1], dimensions + 10)).astype(np.float32)
+    for _ in range(2):  # power iterations sharpen the spectrum of short-text TF-IDF
+        sketch, _ = np.linalg.qr(sketch)
+        sketch = matrix @ (matrix.T @ sketch)
+    basis, _ = np.linalg.qr(sketch)
+    _, _, right = np.linalg.svd(basis.T @ matrix, full_matrices=False)
+    return right[:dimensions].T.astype(np.float32)
+
+
+class SemanticIndex:
+    """LSA embeddings of the snapshot rows, searched by cosine similarity"""
+
+    def __init__(self, vocabulary: List[str], idf: np.ndarray, projection: np.ndarray,
+                 vectors: np.ndarray, source_md5: str = ""):
+        self.vocabulary = {term: i for i, term in enumerate(vocabulary)}
+        self.idf = idf
+        self.projection = projection
+        self.vectors = vectors
+        self.source_md5 = source_md5
+
+    @property
+    def size(self) -> int:
+        return self.vectors.shape[0]
+
+    @classmethod
+    def build(cls, table: pa.Table, dimensions: int = SEMANTIC_DIMENSIONS) -> "SemanticIndex":
+        """Embed every snapshot row (called by the pipeline when the inventory is published)"""
+        documents = [_term_weights(tokenize(document_text(row)))
+                     for row in table.select(SEMANTIC_FIELDS).to_pylist()]
+
+        document_frequency: Dict[str, int] = {}
+        for weights in documents:
+            for term in weights:
+                document_frequency[term] = document_frequency.get(term, 0) + 1
+        vocabulary = sorted(document_frequency, key=lambda t: (-document_frequency[t], t))
+        vocabulary = sorted(vocabulary[:SEMANTIC_MAX_VOCABULARY])
+        columns = {term: i for i, term in enumerate(vocabulary)}
+        idf = np.array([math.log((1 + len(documents)) / (1 + document_frequency[t])) + 1
+                        for t in vocabulary], dtype=np.float32)
+
+        tfidf = np.zeros((len(documents), len(vocabulary)), dtype=np.float32)
+        for row, weights in enumerate(documents):
+            for term, weight in weights.items():
+                if term in columns:
+                    tfidf[row, columns[term]] = weight
+        tfidf *= idf
+        tfidf /= np.maximum(np.linalg.norm(tfidf, axis=1, keepdims=True), 1e-12)
+
+        dimensions = max(1, min(dimensions, *tfidf.shape))
+        projection = _truncated_svd(tfidf, dimensions)
+        vectors = tfidf @ projection
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+        source_md5 = (table.schema.metadata or {}).get(b"source-md5", b"").decode()
+        return cls(vocabulary, idf, projection, vectors.astype(np.float32), source_md5)
+
+    def save(self, path: str) -> None:
+        """Write the index as an uncompressed .npz (no pickled objects)"""
+        with open(path, "wb") as f:
+            np.savez(f,
+                     format_version=np.array(SEMANTIC_FORMAT_VERSION),
+                     vocabulary=np.array(sorted(self.vocabulary, key=self.vocabulary.get)),
+                     idf=self.idf,
+                     projection=self.projection,
+                     vectors=self.vectors,
+                     source_md5=np.array(self.source_md5))
+
+    @classmethod
+    def load(cls, path: str) -> "SemanticIndex":
+        with np.load(path, allow_pickle=False) as data:
+            if int(data["format_version"]) != SEMANTIC_FORMAT_VERSION:
+                raise ValueError(f"Unsupported semantic index format in {path}")
+            return cls(data["vocabulary"].tolist(), data["idf"], data["projection"],
+                       data["vectors"], str(data["source_md5"]))
+
+    def embed_query(self, query: str) -> Optional[np.ndarray]:
+        """Unit query vector, or None when no query term is in the vocabulary"""
+        vector = np.zeros(self.projection.shape[1], dtype=np.float32)
+        for term, weight in _term_weights(tokenize(query_text(query))).items():
+            column = self.vocabulary.get(term)
+            if column is not None:
+                vector += weight * self.idf[column] * self.projection[column]
+        length = float(np.linalg.norm(vector))
+        return vector / length if length else None
+
+    def search(self, query: str, bits: Optional[int] = None, k: int = 100,
+               min_score: float = SEMANTIC_MIN_SCORE) -> List[Tuple[int, float]]:
+        """Top 'k' (row, cosine similarity) pairs for a query, restricted to the rows in 'bits'"""
+        query_vector = self.embed_query(query) if self.size else None
+        if query_vector is None:
+            return []
+        scores = self.vectors @ query_vector
+        if bits is not None:
+            scores = np.where(mask_from_bits(bits, self.size), scores, -1.0)
+        k = min(k, self.size)
+        top = np.argpartition(-scores, k - 1)[:k] if k < self.size else np.arange(self.size)
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(row), float(scores[row])) for row in top if scores[row] >= min_score]
@@ -0,0 +1,233 @@
+"""
+Headless HTTP/JSON search service over the shared inventory catalog.
+
+Exposes the web app's searches to scripts and other lab tools:
+
+  GET  /health          snapshot generation and row count
+  GET  /search          one query: ?q=...&mode=ranked|semantic|prefix|field&limit=...
+                        (&part=...&value=... for field mode, &facet=category:LED repeatable)
+  POST /search/batch    {"queries": [{"q": ..., "mode": ..., "facets": {...}}, ...]}
+  POST /bom             {"lines": [{"mpn": ..., "quantity": ...}, ...]}
+  GET  /scan            the box of a scanned label code: ?code=INV1|C10|GRM188R61C475KAAJD
+  POST /refresh         reload now (the pipeline calls this after publishing)
+
+The catalog is held in memory and a background task polls the snapshot's generation, so a
+newly published inventory is served without a restart. Every response carries an ETag made
+from the snapshot generation and the request; sending it back in If-None-Match returns
+304 Not Modified until the inventory changes.
+
+Searches take milliseconds and are CPU-bound, so the handlers run them inline on the event
+loop; a thread pool would add overhead without adding throughput under the GIL.
+
+Usage:
+  python -m lab_inventory.service --local-dir 04_extracted_info
+  python -m lab_inventory.service --credentials key.json --bucket aharonilabinventory.appspot.com
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+from contextlib import asynccontextmanager
+from dataclasses import asdict
+from typing import Callable, Dict, List, Literal, Optional
+
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, Field
+
+from lab_inventory.bom import BomLine
+from lab_inventory.catalog import CatalogState, InventoryCatalog
+from lab_inventory.index import FACET_FIELDS
+from lab_inventory.label_codes import parse_label_code
+from lab_inventory.local_storage import open_bucket
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8000
+# Seconds between checks for a newly published snapshot
+REFRESH_INTERVAL = 30.0
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 1000
+MAX_BATCH_QUERIES = 100
+
+SearchMode = Literal["ranked", "semantic", "prefix", "field"]
+
+
+class SearchQuery(BaseModel):
+    """One search; 'q' is the query text, 'part'/'value' are used by field mode"""
+    q: str = ""
+    mode: SearchMode = "ranked"
+    part: str = ""
+    value: str = ""
+    facets: Dict[str, List[str]] = {}
+    limit: int = Field(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT)
+
+
+class BatchSearchRequest(BaseModel):
+    queries: List[SearchQuery]
+
+
+class BomRequestLine(BaseModel):
+    mpn: str
+    quantity: Optional[int] = None
+
+
+class BomRequest(BaseModel):
+    lines: List[BomRequestLine]
+
+
+def run_query(catalog: InventoryCatalog, query: SearchQuery,
+              state: Optional[CatalogState] = None) -> List[Dict]:
+    """Run one search against the catalog (at 'state', if given) and return its result rows"""
+    unknown = set(query.facets) - set(FACET_FIELDS)
+    if unknown:
+        raise HTTPException(400, f"Unknown facet(s): {', '.join(sorted(unknown))}")
+
+    if query.mode == "ranked":
+        pairs = catalog.rank(query.q, query.facets, query.limit, state)
+    elif query.mode == "semantic":
+        pairs = catalog.semantic_search(query.q, query.facets, query.limit, state)
+    elif query.mode == "prefix":
+        return catalog.prefix_search(query.q, query.facets, query.limit, state)
+    else:
+        return catalog.search(query.part or query.q, query.value, query.facets,
+                              state)[:query.limit]
+    return [dict(item, score=round(score, 4)) for item, score in pairs[:query.limit]]
+
+
+def _etag(generation: int, request_key) -> str:
+    digest = hashlib.md5(json.dumps(request_key, sort_keys=True).encode("utf-8")).hexdigest()
+    return f'"{generation}-{digest[:16]}"'
+
+
+def _respond(catalog: InventoryCatalog, request: Request, request_key,
+             build: Callable[[CatalogState], Dict]) -> Response:
+    """
+    Answer with 304 when the client already has this response for the current snapshot,
+    otherwise build the JSON body from that same snapshot and tag it.
+    """
+    state = catalog.state
+    if state is None:
+        raise HTTPException(503, "No inventory snapshot has been published")
+    etag = _etag(state.generation, request_key)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(dict(build(state), generation=state.generation), headers=headers)
+
+
+def _parse_facets(facets: List[str]) -> Dict[str, List[str]]:
+    """Turn repeated 'field:value' parameters into facet selections"""
+    selections: Dict[str, List[str]] = {}
+    for facet in facets:
+        field, separator, value = facet.partition(":")
+        if not separator:
+            raise HTTPException(400, f"Facet '{facet}' must look like field:value")
+        selections.setdefault(field, []).append(value)
+    return selections
+
+
+def create_app(catalog: InventoryCatalog, refresh_interval: float = REFRESH_INTERVAL) -> FastAPI:
+    """Build the service around a catalog; the snapshot is loaded on startup"""
+
+    async def poll_for_new_snapshot():
+        while True:
+            await asyncio.sleep(refresh_interval)
+            await asyncio.to_thread(catalog.refresh, True)
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        await asyncio.to_thread(catalog.refresh, True)
+        poller = asyncio.create_task(poll_for_new_snapshot())
+        try:
+            yield
+        finally:
+            poller.cancel()
+
+    app = FastAPI(title="Lab inventory search", lifespan=lifespan)
+
+    @app.get("/health")
+    async def health():
+        state = catalog.state
+        return {
+            "generation": state.generation if state else None,
+            "rows": state.index.size if state else 0,
+            "semantic": bool(state and state.semantic_index is not None),
+        }
+
+    @app.get("/search")
+    async def search(request: Request, q: str = "", mode: SearchMode = "ranked",
+                     part: str = "", value: str = "",
+                     limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+                     facet: List[str] = Query([])):
+        query = SearchQuery(q=q, mode=mode, part=part, value=value,
+                            facets=_parse_facets(facet), limit=limit)
+        return _respond(catalog, request, query.model_dump(),
+                        lambda state: {"results": run_query(catalog, query, state)})
+
+    @app.post("/search/batch")
+    async def search_batch(request: Request, batch: BatchSearchRequest):
+        if len(batch.queries) > MAX_BATCH_QUERIES:
+            raise HTTPException(400, f"At most {MAX_BATCH_QUERIES} queries per batch")
+        return _respond(catalog, request, batch.model_dump(),
+                        lambda state: {"results": [run_query(catalog, q, state)
+                                                   for q in batch.queries]})
+
+    @app.post("/bom")
+    async def bom(request: Request, bom_request: BomRequest):
+        lines = [BomLine(number, line.mpn, line.quantity)
+                 for number, line in enumerate(bom_request.lines, start=1)]
+
+        def build(state):
+            matches = catalog.resolve_bom(lines, state)
+            return {"lines": [dict(asdict(match.bom_line), **{
+                "match": match.match, "matched_pn": match.matched_pn,
+                "description": match.description, "locations": match.locations,
+                "entries": match.entries, "available": match.available,
+                "possible": match.possible,
+            }) for match in matches]}
+        return _respond(catalog, request, bom_request.model_dump(), build)
+
+    @app.get("/scan")
+    async def scan(request: Request, code: str):
+        try:
+            parse_label_code(code)
+        except ValueError as e:
+            raise HTTPException(400, str(e))
+
+        def build(state):
+            match = catalog.scan(code, state)
+            return {"location": match.code.location, "mpn": match.code.mpn,
+                    "relocated": match.relocated, "results": match.items}
+        return _respond(catalog, request, {"scan": code.strip()}, build)
+
+    @app.post("/refresh")
+    async def refresh():
+        state = await asyncio.to_thread(catalog.refresh, True)
+        return {"generation": state.generation if state else None}
+
+    return app
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Headless inventory search service")
+    parser.add_argument("--local-dir", help="serve the snapshot published in a local folder")
+    parser.add_argument("--credentials", help="Firebase service account JSON")
+    parser.add_argument("--bucket", default="aharonilabinventory.appspot.com",
+                        help="Firebase Storage bucket")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--refresh-interval", type=float, default=REFRESH_INTERVAL,
+                        help="seconds between checks for a new snapshot")
+    args = parser.parse_args(argv)
+
+    import uvicorn
+    logging.basicConfig(level=logging.INFO)
+    catalog = InventoryCatalog(open_bucket(args.local_dir, args.credentials, args.bucket))
+    uvicorn.run(create_app(catalog, args.refresh_interval), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Compact Arrow IPC snapshot of the organized inventory.
+
+The pipeline (05_02) parses organized_texts.txt once, adds normalized search keys and parsed
+numeric values, and publishes the result as an uncompressed Arrow IPC file. The web app
+memory-maps the downloaded file, so loading it costs I/O only and no text parsing.
+"""
+
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pyarrow as pa
+
+from lab_inventory.classify import classify_component
+
+SNAPSHOT_FORMAT_VERSION = "2"
+NOT_AVAILABLE = "Not available"
+
+# Organized entry field -> "Label:" line in organized_texts.txt
+FIELD_LABELS = {
+    "image": "Image",
+    "part_number": "Part number",
+    "manufacturer_pn": "Manufacturer Part number",
+    "company_made": "(?:Company Made|Fabricated Company)",
+    "description": "Description",
+    "footprint": "Footprint",
+    "component_type": "Component Type",
+    "location": "Location",
+}
+
+SNAPSHOT_SCHEMA = pa.schema([
+    ("image", pa.string()),
+    ("part_number", pa.string()),
+    ("manufacturer_pn", pa.string()),
+    ("company_made", pa.string()),
+    ("description", pa.string()),
+    ("footprint", pa.string()),
+    ("component_type", pa.string()),
+    ("location", pa.string()),
+    # Category assigned by lab_inventory.classify at index time (null if unknown)
+    ("category", pa.string()),
+    # Normalized search keys (see normalize_search_key)
+    ("norm_part_number", pa.string()),
+    ("norm_manufacturer_pn", pa.string()),
+    ("norm_description", pa.string()),
+    # Parsed location, e.g. "C10" -> ("C", 10)
+    ("location_prefix", pa.string()),
+    ("location_number", pa.int32()),
+    # Parsed numeric values in base SI units, null when not present in the description
+    ("capacitance_f", pa.float64()),
+    ("resistance_ohm", pa.float64()),
+    ("inductance_h", pa.float64()),
+    ("voltage_v", pa.float64()),
+    ("current_a", pa.float64()),
+])
+
+_FIELD_PATTERNS = {
+    field: re.compile(rf"^{label}:\s*(\S.*)$", re.IGNORECASE | re.MULTILINE)
+    for field, label in FIELD_LABELS.items()
+}
+
+_SI_PREFIXES = {"p": 1e-12, "n": 1e-9, "u": 1e-6, "µ": 1e-6, "μ": 1e-6,
+                "m": 1e-3, "": 1.0, "k": 1e3, "meg": 1e6}
+
+_NUMBER = r"(\d+(?:\.\d+)?)"
+_VALUE_PATTERNS = {
+    "capacitance_f": re.compile(_NUMBER + r"\s*([pnuµμm]?)F\b", re.IGNORECASE),
+    "resistance_ohm": re.compile(_NUMBER + r"\s*(k|m|meg)?\s*(?:OHMS?|Ω)", re.IGNORECASE),
+    "inductance_h": re.compile(_NUMBER + r"\s*([pnuµμm]?)H\b", re.IGNORECASE),
+    "voltage_v": re.compile(_NUMBER + r"\s*([mk]?)V\b", re.IGNORECASE),
+    "current_a": re.compile(_NUMBER + r"\s*([unµμm]?)A\b", re.IGNORECASE),
+}
+
+
+def normalize_search_key(text: str) -> str:
+    """Normalize text for search: lowercase with all whitespace removed"""
+    return re.sub(r'\s+', '', text.strip().lower()) if text else ""
+
+
+def parse_entry(block: str) -> Dict[str, str]:
+    """Parse one organized entry block into its raw fields"""
+    data = {}
+    for field, pattern in _FIELD_PATTERNS.items():
+        match = pattern.search(block)
+        data[field] = match.group(1).strip() if match else NOT_AVAILABLE
+    return data
+
+
+def parse_location(location: str) -> Tuple[Optional[str], Optional[int]]:
+    """Split a location such as 'C10' into ('C', 10)"""
+    match = re.match(r"^([A-Za-z]+)(\d+)$", location.strip())
+    if not match:
+        return None, None
+    return match.group(1).upper(), int(match.group(2))
+
+
+def parse_component_values(description: str) -> Dict[str, Optional[float]]:
+    """Extract the first capacitance, resistance, inductance, voltage and current in a description"""
+    values = {}
+    for column, pattern in _VALUE_PATTERNS.items():
+        match = pattern.search(description)
+        if match:
+            prefix = (match.group(2) or "").lower()
+            # A capital "M" on resistors means mega (Digi-Key writes "1M OHM")
+            if column == "resistance_ohm" and prefix == "m":
+                prefix = "meg"
+            values[column] = float(match.group(1)) * _SI_PREFIXES[prefix]
+        else:
+            values[column] = None
+    return values
+
+
+def build_snapshot_rows(blocks: Iterable[str]) -> List[Dict]:
+    """Parse organized entry blocks into snapshot rows"""
+    rows = []
+    for block in blocks:
+        if not block.strip():
+            continue
+        row = parse_entry(block)
+        row["norm_part_number"] = normalize_search_key(row["part_number"])
+        row["norm_manufacturer_pn"] = normalize_search_key(row["manufacturer_pn"])
+        row["norm_description"] = normalize_search_key(row["description"])
+        row["location_prefix"], row["location_number"] = parse_location(row["location"])
+        description = row["description"] if row["description"] != NOT_AVAILABLE else ""
+        component_type = row["component_type"] if row["component_type"] != NOT_AVAILABLE else ""
+        category = classify_component(component_type, description)
+        row["category"] = category.name if category else None
+        row.update(parse_component_values(description))
+        rows.append(row)
+    return rows
+
+
+def build_snapshot_table(blocks: Iterable[str], source_md5: str = "") -> pa.Table:
+    """Build the snapshot table from organized entry blocks"""
+    rows = build_snapshot_rows(blocks)
+    table = pa.Table.from_pylist(rows, schema=SNAPSHOT_SCHEMA)
+    # Keep the metadata deterministic so identical input produces identical bytes.
+    return table.replace_schema_metadata({
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "source-md5": source_md5,
+    })
+
+
+def write_snapshot(table: pa.Table, path: str) -> None:
+    """Write the snapshot as an uncompressed Arrow IPC file so readers can memory-map it"""
+    with pa.OSFile(path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+def read_snapshot(path: str) -> pa.Table:
+    """Memory-map a snapshot file; the returned table references the mapped pages without copying"""
+    with pa.memory_map(path, "r") as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+def summarize_snapshot(table: pa.Table, published_at: str) -> Dict:
+    """Precompute the dashboard metrics for a snapshot"""
+    locations = {location for location in table.column("location").to_pylist()
+                 if location != NOT_AVAILABLE}
+    category_counts = {}
+    for category in table.column("category").to_pylist():
+        if category:
+            category_counts[category] = category_counts.get(category, 0) + 1
+
+    metadata = table.schema.metadata or {}
+    return {
+        "total_components": table.num_rows,
+        "distinct_locations": len(locations),
+        "categories": len(category_counts) if category_counts else max(1, len(locations)),
+        "category_counts": category_counts,
+        "published_at": published_at,
+        "source-md5": metadata.get(b"source-md5", b"").decode(),
+    }
@@ -0,0 +1,132 @@
+"""
+Text measurement for label layout: cached glyph widths, prefix sums and binary search.
+
+ReportLab measures a string by summing the advance widths of its glyphs (in 1/1000 of the
+font size) and scaling by the font size. FontMetrics caches those per-glyph widths once per
+font, so every size of that font shares them, and turns a string into prefix sums of its
+widths. The width of any prefix or slice is then one subtraction, and the longest prefix
+(or run of words) that fits a width is a binary search over the sums, instead of
+re-measuring the whole string after every character or word is added or removed.
+Widths are computed the way ReportLab computes them, so the layout is the same as with
+stringWidth.
+"""
+
+from bisect import bisect_right
+from functools import lru_cache
+from itertools import accumulate
+from typing import List, Optional
+
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+# Font size at which glyph widths are cached (ReportLab's font units)
+UNITS_PER_EM = 1000
+
+
+class _GlyphWidths(dict):
+    """Advance width of each character of one font, measured on first use"""
+
+    def __init__(self, font_name: str):
+        super().__init__()
+        self.font_name = font_name
+
+    def __missing__(self, char: str) -> float:
+        # Rounding recovers the font's own width (e.g. 278 rather than 278.00000000000006),
+        # so sums of widths are exact like ReportLab's
+        width = round(stringWidth(char, self.font_name, UNITS_PER_EM), 9)
+        self[char] = width
+        return width
+
+
+class FontMetrics:
+    """Cached glyph widths of one font and the layout operations built on them"""
+
+    def __init__(self, font_name: str):
+        self.font_name = font_name
+        self._widths = _GlyphWidths(font_name)
+
+    def prefix_widths(self, text: str) -> List[float]:
+        """Widths in font units of text[:0], text[:1], ..., text[:len(text)]"""
+        return list(accumulate(map(self._widths.__getitem__, text), initial=0))
+
+    def width(self, text: str, font_size: float) -> float:
+        return sum(map(self._widths.__getitem__, text)) * 0.001 * font_size
+
+    def fit_size(self, text: str, initial_size: int, min_size: int,
+                 max_width: float) -> Optional[int]:
+        """The largest whole font size from initial_size down to min_size at which text
+        fits max_width, or None"""
+        units = sum(map(self._widths.__getitem__, text))
+        for size in range(initial_size, min_size - 1, -1):
+            if units * 0.001 * size <= max_width:
+                return size
+        return None
+
+    def truncate(self, text: str, font_size: float, max_width: float, ellipsis: str) -> str:
+        """text if it fits max_width, else its longest prefix that fits with the ellipsis
+        appended (just the ellipsis if no character fits)"""
+        prefix = self.prefix_widths(text)
+        if _fits(prefix[-1], font_size, max_width):
+            return text
+        ellipsis_units = sum(map(self._widths.__getitem__, ellipsis))
+
+        def fits(n: int) -> bool:
+            return _fits(prefix[n] + ellipsis_units, font_size, max_width)
+
+        # prefix is non-decreasing, so the prefixes that fit are text[:0] .. text[:n]
+        n = bisect_right(prefix, max_width / (0.001 * font_size) - ellipsis_units) - 1
+        n = min(max(n, 0), len(text))
+        # Settle float rounding at the boundary exactly as a full measurement would
+        while n > 0 and not fits(n):
+            n -= 1
+        while n < len(text) and fits(n + 1):
+            n += 1
+        return text[:n] + ellipsis
+
+    def wrap(self, text: str, font_size: float, max_width: float) -> List[str]:
+        """
+        Split text into lines of whole words, each as long as fits max_width; a word that
+        does not fit on its own gets a line of its own. Same lines as adding one word at a
+        time while the line fits (including the empty first line that gives a first word
+        too wide for max_width).
+        """
+        words = text.split()
+        if not words:
+            return []
+        space = self._widths[" "]
+        # ends[i] = width of words[:i] joined by spaces, plus one trailing space
+        ends = list(accumulate((sum(map(self._widths.__getitem__, word)) + space
+                                for word in words), initial=0))
+        lines = []
+        start = 0
+
+        def fits(end: int) -> bool:
+            return _fits(ends[end] - ends[start] - space, font_size, max_width)
+
+        while start < len(words):
+            # Longest run words[start:end] whose joined width fits
+            limit = max_width / (0.001 * font_size) + space + ends[start]
+            end = max(bisect_right(ends, limit, lo=start + 1) - 1, start)
+            # Settle float rounding at the boundary exactly as a full measurement would
+            while end > start and not fits(end):
+                end -= 1
+            while end < len(words) and fits(end + 1):
+                end += 1
+            if end == start:
+                # The word is wider than a line; it still gets a line of its own
+                if start == 0:
+                    lines.append("")
+                end = start + 1
+            lines.append(" ".join(words[start:end]))
+            start = end
+        return lines
+
+
+def _fits(units: float, font_size: float, max_width: float) -> bool:
+    # Same operation order as ReportLab's stringWidth
+    return units * 0.001 * font_size <= max_width
+
+
+@lru_cache(maxsize=None)
+def font_metrics(font_name: str) -> FontMetrics:
+    """The shared FontMetrics of a font"""
+    return FontMetrics(font_name)
@@ -0,0 +1,145 @@
+"""
+Concurrent uploads of component photos and documents to Firebase Storage.
+
+Files are uploaded by a bounded thread pool, so a batch takes roughly as long as its slowest
+file instead of the sum of all files. Files larger than RESUMABLE_THRESHOLD are sent as
+resumable uploads in CHUNK_SIZE chunks, so a dropped connection only resends the current
+chunk of a large PDF. Progress is reported as UploadProgress events that upload_files()
+yields in the calling thread, which lets a UI update its widgets without touching them from
+worker threads. Events carry the label of their PendingUpload; callers label uploads by
+their position in the batch, since two selected files can share a name.
+"""
+
+import io
+import logging
+import os
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import BinaryIO, Callable, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_PREFIX = "component_images/"
+MAX_UPLOAD_WORKERS = 8
+# Resumable uploads need chunks in multiples of 256 KiB
+CHUNK_SIZE = 16 * 256 * 1024
+RESUMABLE_THRESHOLD = 2 * CHUNK_SIZE
+
+
+@dataclass
+class PendingUpload:
+    """A file to upload and where it goes"""
+    label: str
+    object_name: str
+    fileobj: BinaryIO
+    size: int
+    content_type: Optional[str] = None
+
+
+@dataclass
+class UploadProgress:
+    """Progress of one file; the last event for a file has done=True"""
+    label: str
+    sent: int
+    total: int
+    done: bool = False
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.done and self.error is None
+
+
+def upload_object_name(uploader_name: str, file_name: str) -> str:
+    """Storage path of an uploaded file, grouped by uploader"""
+    return f"{UPLOAD_PREFIX}{uploader_name}/{file_name}"
+
+
+def unique_file_names(file_names: Iterable[str]) -> List[str]:
+    """
+    The given names in order, with a repeated name numbered like "a (2).jpg", so files of one
+    batch that end up with the same name (including a.png and a.jpg once both are re-encoded
+    as JPEG) do not overwrite each other in storage.
+    """
+    used = set()
+    unique = []
+    for file_name in file_names:
+        stem, extension = os.path.splitext(file_name)
+        candidate, number = file_name, 1
+        while candidate in used:
+            number += 1
+            candidate = f"{stem} ({number}){extension}"
+        used.add(candidate)
+        unique.append(candidate)
+    return unique
+
+
+class _ProgressReader(io.RawIOBase):
+    """File wrapper that reports how many bytes the storage client has read"""
+
+    def __init__(self, fileobj: BinaryIO, on_read: Callable[[int], None]):
+        self._fileobj = fileobj
+        self._on_read = on_read
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._fileobj.tell()
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        self._position = self._fileobj.seek(offset, whence)
+        return self._position
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._fileobj.read(size)
+        self._position += len(data)
+        self._on_read(self._position)
+        return data
+
+    def readinto(self, buffer) -> int:
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def _upload_one(bucket, upload: PendingUpload, events: "queue.Queue[UploadProgress]") -> None:
+    try:
+        blob = bucket.blob(upload.object_name)
+        if upload.size > RESUMABLE_THRESHOLD:
+            blob.chunk_size = CHUNK_SIZE
+        upload.fileobj.seek(0)
+        reader = _ProgressReader(
+            upload.fileobj,
+            lambda sent: events.put(UploadProgress(upload.label, min(sent, upload.size),
+                                                   upload.size)))
+        blob.upload_from_file(reader, size=upload.size, content_type=upload.content_type)
+        events.put(UploadProgress(upload.label, upload.size, upload.size, done=True))
+        logger.info(f"Uploaded {upload.object_name} ({upload.size} bytes)")
+    except Exception as e:
+        logger.error(f"Failed to upload {upload.object_name}: {e}")
+        events.put(UploadProgress(upload.label, 0, upload.size, done=True, error=str(e)))
+
+
+def upload_files(bucket, uploads: Iterable[PendingUpload],
+                 max_workers: int = MAX_UPLOAD_WORKERS) -> Iterator[UploadProgress]:
+    """
+    Upload files in parallel and yield progress events in the calling thread until every
+    file has finished or failed.
+    """
+    uploads = list(uploads)
+    events: "queue.Queue[UploadProgress]" = queue.Queue()
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(uploads)))) as pool:
+        for upload in uploads:
+            pool.submit(_upload_one, bucket, upload, events)
+        remaining = len(uploads)
+        while remaining:
+            event = events.get()
+            if event.done:
+                remaining -= 1
+            yield event
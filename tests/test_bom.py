@@ -0,0 +1,58 @@
+"""BOM check against the inventory (lab_inventory.bom)"""
+
+import pytest
+
+from lab_inventory.bom import (MATCH_EXACT, MATCH_FUZZY, MATCH_NONE, MATCH_NORMALIZED,
+                               BomLine, BomResolver, read_bom)
+from lab_inventory.snapshot import build_snapshot_table
+
+
+def entry(mpn: str, description: str, location: str) -> str:
+    return f"Image: {mpn}.jpg\nManufacturer Part number: {mpn}\nDescription: {description}\n" \
+           f"Location: {location}\n"
+
+
+@pytest.fixture(scope="module")
+def resolver():
+    return BomResolver(build_snapshot_table([
+        entry("STM32F405RGT6", "IC MCU 32BIT 1MB FLASH 64LQFP", "I1"),
+        entry("RC0603FR-0710KL", "RES 10K OHM 1% 0603", "R1"),
+        entry("RC0603FR-0710KL", "RES 10K OHM 1% 0603", "R7"),
+    ]))
+
+
+@pytest.mark.parametrize("mpn, match", [
+    ("rc0603fr-0710kl", MATCH_EXACT),
+    ("RC0603FR 0710KL", MATCH_NORMALIZED),
+])
+def test_exact_and_normalized_matches_are_in_stock(resolver, mpn, match):
+    result = resolver.resolve_line(BomLine(1, mpn))
+    assert result.match == match
+    assert result.available and not result.possible
+    assert result.locations == ["R1", "R7"]
+
+
+@pytest.mark.parametrize("mpn, matched_pn", [
+    # A different part one character away
+    ("STM32F407RGT6", "STM32F405RGT6"),
+    ("RC0603FR-0710RL", "RC0603FR-0710KL"),
+    # The longest inventory part number the BOM part number starts with
+    ("STM32F405RGT6TR", "STM32F405RGT6"),
+])
+def test_fuzzy_matches_are_only_possible_matches(resolver, mpn, matched_pn):
+    result = resolver.resolve_line(BomLine(1, mpn))
+    assert result.match == MATCH_FUZZY
+    assert result.matched_pn == matched_pn
+    assert result.possible
+    assert not result.available
+
+
+def test_unknown_part_is_missing(resolver):
+    result = resolver.resolve_line(BomLine(1, "LM1117IMP-3.3"))
+    assert result.match == MATCH_NONE
+    assert not result.available and not result.possible
+
+
+def test_read_bom_finds_the_header_below_a_title_block():
+    data = b"Board X BOM\n\nRef;Qty;Manufacturer Part Number\nR1;2;RC0603FR-0710KL\nC1;;\n"
+    assert read_bom(data, "board.csv") == [BomLine(4, "RC0603FR-0710KL", 2)]
@@ -0,0 +1,74 @@
+"""Durable writes (lab_inventory.pipeline.checkpoint)"""
+
+import os
+
+from lab_inventory.pipeline.checkpoint import (COMMITTED_SUFFIX, CheckpointStore,
+                                               append_text_durable, atomic_write_text)
+from lab_inventory.pipeline.ocr import (format_ocr_entry, load_processed_images,
+                                        ocr_checkpoint_key, ocr_images)
+
+from test_ingest import FlakyExtractor
+
+
+def test_append_keeps_existing_content(tmp_path):
+    path = tmp_path / "texts" / "extracted.txt"
+    append_text_durable(str(path), format_ocr_entry("a.jpg", "A"))
+    append_text_durable(str(path), format_ocr_entry("b.jpg", "B"))
+    assert path.read_text() == format_ocr_entry("a.jpg", "A") + format_ocr_entry("b.jpg", "B")
+    assert int((tmp_path / "texts" / f"extracted.txt{COMMITTED_SUFFIX}").read_text()) == \
+        os.path.getsize(path)
+
+
+def test_torn_append_is_discarded_and_committed_again(tmp_path):
+    photo_dir = tmp_path / "photos"
+    photo_dir.mkdir()
+    photos = []
+    for name in ("a.jpg", "b.jpg"):
+        (photo_dir / name).write_text(f"text of {name}")
+        photos.append(str(photo_dir / name))
+    output = str(tmp_path / "extracted.txt")
+    checkpoint = CheckpointStore(str(tmp_path / "checkpoints"))
+    append_text_durable(output, format_ocr_entry("a.jpg", "text of a.jpg"))
+    # A crash in the middle of committing b.jpg: its OCR text is staged, and only part of
+    # its entry reached the file
+    checkpoint.put(ocr_checkpoint_key("b.jpg"), "text of b.jpg")
+    with open(output, "a") as f:
+        f.write(format_ocr_entry("b.jpg", "text of b.jpg")[:12])
+
+    assert load_processed_images(output) == {"a.jpg"}
+    extractor = FlakyExtractor()
+    assert ocr_images(photos, str(tmp_path / "converted"), output, extractor,
+                      checkpoint=checkpoint) == ["b.jpg"]
+    # Recommitted from the checkpoint, after the last complete entry
+    assert extractor.calls == []
+    with open(output, "r") as f:
+        assert f.read() == (format_ocr_entry("a.jpg", "text of a.jpg")
+                            + format_ocr_entry("b.jpg", "text of b.jpg"))
+    assert checkpoint.get(ocr_checkpoint_key("b.jpg")) is None
+
+
+def test_rewrite_drops_the_committed_length(tmp_path):
+    path = tmp_path / "organized.txt"
+    append_text_durable(str(path), "short\n\n")
+    atomic_write_text(str(path), "a longer rewritten version\n\n")
+    append_text_durable(str(path), "next\n\n")
+    assert path.read_text() == "a longer rewritten version\n\nnext\n\n"
+
+
+def test_atomic_write_replaces_whole_file(tmp_path):
+    path = tmp_path / "data.json"
+    atomic_write_text(str(path), "a much longer first version")
+    atomic_write_text(str(path), "short")
+    assert path.read_text() == "short"
+    assert [p.name for p in tmp_path.iterdir()] == ["data.json"]
+
+
+def test_checkpoint_store(tmp_path):
+    store = CheckpointStore(str(tmp_path / "checkpoints"))
+    assert store.get("photo.jpg") is None
+    store.put("photo.jpg", "")
+    # An empty result is still a staged result
+    assert store.get("photo.jpg") == ""
+    store.discard("photo.jpg")
+    store.discard("photo.jpg")
+    assert store.get("photo.jpg") is None
@@ -0,0 +1,42 @@
+"""Component classifier (lab_inventory.classify) and the location prefixes it assigns"""
+
+import pytest
+
+from lab_inventory.classify import classify_component, location_prefix
+
+
+@pytest.mark.parametrize("component_type, description, prefix", [
+    # Shelved as in 04_extracted_info/organized_texts.txt
+    ("IC REG LDO", "IC REG LINEAR 3.3V 300MA SOT23-5", "I"),
+    ("Voltage Regulator", "", "I"),
+    ("IC MCU", "IC MCU 32BIT 2MB FLASH 144LQFP", "I"),
+    ("Connector", "CONN RCPT USB2.0 MICRO B SMD R/A", "C"),
+    ("Capacitor", "CAP CER 4.7UF 16V X5R 0603", "C"),
+    ("Fixed Inductor", "FIXED IND 2.2UH 1.5A", "F"),
+    ("MOSFET", "MOSFET N-CH 20V 750MA SOT-723", "M"),
+    ("TRANS NPN", "TRANS NPN 40V 0.2A SOT23", "T"),
+    ("Oscillator", "MEMS OSC XO 90.0000MHZ", "O"),
+    ("Sensor", "SENSOR REMOTE REC 38.0KHZ 40M", "S"),
+])
+def test_prefix_follows_the_existing_shelves(component_type, description, prefix):
+    assert location_prefix(component_type, description) == prefix
+
+
+def test_most_specific_category_wins():
+    assert classify_component("IC REG LINEAR").name == "Voltage Regulator"
+    assert classify_component("IC MCU").name == "Microcontroller"
+    assert classify_component("Phototransistor").name == "Transistor"
+
+
+def test_data_converters_are_not_regulators():
+    assert classify_component("ADC", "IC ADC 16BIT SIGMA-DELTA CONVERTER 16SSOP").name == "IC"
+    assert classify_component("Data Converter", "DAC 12BIT 8SOIC").name == "IC"
+    assert classify_component("DC DC Converter", "DC-DC CONVERTER 5V 2A").name == \
+        "Voltage Regulator"
+    assert classify_component("Buck Converter").name == "Voltage Regulator"
+
+
+def test_unclassified_types_use_their_first_letter():
+    assert classify_component("Battery holder") is None
+    assert location_prefix("Battery holder") == "B"
+    assert location_prefix("") == "X"
@@ -0,0 +1,52 @@
+"""Photo normalization before upload (lab_inventory.images)"""
+
+import io
+
+import pytest
+from PIL import Image
+
+from lab_inventory import images
+from lab_inventory.images import (ImageOptions, process_photo, process_photos,
+                                  thumbnail_object_name)
+
+
+def jpeg_with_exif(size=(3000, 2000)) -> bytes:
+    exif = Image.Exif()
+    exif[0x010F] = "PhoneMaker"
+    output = io.BytesIO()
+    Image.new("RGB", size, "red").save(output, format="JPEG", exif=exif)
+    return output.getvalue()
+
+
+@pytest.fixture
+def without_webp(monkeypatch):
+    check = images.features.check
+    monkeypatch.setattr(images.features, "check",
+                        lambda feature: feature != "webp" and check(feature))
+
+
+def test_photo_is_downsampled_without_exif():
+    photo = process_photo("IMG_1.JPG", jpeg_with_exif(), ImageOptions(max_dimension=1024))
+    image = Image.open(io.BytesIO(photo.data))
+    assert photo.name == "IMG_1.jpg"
+    assert max(image.size) == 1024
+    assert not image.getexif()
+
+
+@pytest.mark.skipif(not images.features.check("webp"), reason="Pillow built without WebP")
+def test_thumbnail_is_webp_when_available():
+    photo = process_photo("IMG_1.jpg", jpeg_with_exif())
+    assert Image.open(io.BytesIO(photo.thumbnail)).format == "WEBP"
+    assert photo.thumbnail_content_type == "image/webp"
+    assert thumbnail_object_name("ana", photo.name) == "component_thumbnails/ana/IMG_1.webp"
+
+
+def test_thumbnail_falls_back_to_jpeg_without_webp(without_webp):
+    [photo] = process_photos([("IMG_1.jpg", jpeg_with_exif())], ImageOptions(format="WEBP"))
+    assert photo is not None
+    assert photo.content_type == "image/jpeg"
+    thumbnail = Image.open(io.BytesIO(photo.thumbnail))
+    assert thumbnail.format == "JPEG"
+    assert max(thumbnail.size) == images.THUMBNAIL_SIZE
+    assert photo.thumbnail_content_type == "image/jpeg"
+    assert thumbnail_object_name("ana", photo.name) == "component_thumbnails/ana/IMG_1.jpg"
@@ -0,0 +1,159 @@
+"""Ingest worker (lab_inventory.pipeline.ingest) against a local folder standing in for the bucket"""
+
+import os
+import re
+from types import SimpleNamespace
+
+import pytest
+
+from lab_inventory.local_storage import LocalBucket
+from lab_inventory.pipeline import ingest
+from lab_inventory.pipeline.ingest import (MAX_ATTEMPTS, WATERMARK_LAG, IngestState,
+                                           IngestWorker, list_new_photos)
+from lab_inventory.pipeline.paths import PipelinePaths
+from lab_inventory.uploads import UPLOAD_PREFIX
+
+# A generation well after the epoch, in microseconds like GCS generations
+BASE_GENERATION = 1_700_000_000_000_000
+
+
+class FakeLLM:
+    """Stands in for the OpenAI client: one organized entry per "Image:" line of the chunk"""
+
+    def __init__(self):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, messages):
+        chunk = messages[-1]["content"]
+        entries = [f"Image: {name}\nManufacturer Part number: MPN-{name}\n"
+                   f"Component Type: Resistor\nDescription: RES 10K OHM"
+                   for name in re.findall(r"^Image: ([^<\n]+)$", chunk, re.MULTILINE)]
+        message = SimpleNamespace(content="\n\n".join(entries))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class FlakyExtractor:
+    """OCR that reads the photo's bytes as its text, failing for the names in 'failing'"""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.calls = []
+
+    def __call__(self, path):
+        self.calls.append(os.path.basename(path))
+        if any(name in path for name in self.failing):
+            raise RuntimeError("Vision API unavailable")
+        with open(path, "r") as f:
+            return f.read()
+
+
+def upload(bucket, name, generation, text="RES 10K"):
+    """Put a photo in the bucket with a given generation (a LocalBlob's mtime)"""
+    blob = bucket.blob(UPLOAD_PREFIX + name)
+    blob.upload_from_string(text)
+    os.utime(blob.path, ns=(generation * 1000, generation * 1000))
+    return bucket.get_blob(UPLOAD_PREFIX + name)
+
+
+@pytest.fixture
+def bucket(tmp_path):
+    return LocalBucket(str(tmp_path / "bucket"))
+
+
+@pytest.fixture
+def worker_factory(tmp_path, bucket):
+    def make(extractor):
+        paths = PipelinePaths.in_directory(str(tmp_path / "work"))
+        return IngestWorker(bucket, paths, extractor, FakeLLM())
+    return make
+
+
+def organized_images(worker):
+    with open(worker.paths.organized_file, "r") as f:
+        return re.findall(r"^Image: (.+)$", f.read(), re.MULTILINE)
+
+
+def test_watermark_skips_ingested_photos(bucket):
+    state = IngestState()
+    first = upload(bucket, "ann/a.jpg", BASE_GENERATION)
+    assert [blob.name for blob in list_new_photos(bucket, state)] == [first.name]
+
+    state.advance([first])
+    assert list_new_photos(bucket, state) == []
+    second = upload(bucket, "ann/b.jpg", BASE_GENERATION + 5)
+    assert [blob.name for blob in list_new_photos(bucket, state)] == [second.name]
+
+
+def test_late_upload_inside_the_window_is_picked_up(bucket):
+    state = IngestState()
+    state.advance([upload(bucket, "ann/new.jpg", BASE_GENERATION + WATERMARK_LAG)])
+    # Started before the newest photo but finished after the last pass
+    late = upload(bucket, "bob/late.jpg", BASE_GENERATION + WATERMARK_LAG // 2)
+    upload(bucket, "bob/old.jpg", BASE_GENERATION - 1)
+    assert [blob.name for blob in list_new_photos(bucket, state)] == [late.name]
+
+
+def test_state_round_trips(tmp_path, bucket):
+    state = IngestState()
+    ok, failed = upload(bucket, "a.jpg", BASE_GENERATION), upload(bucket, "b.jpg", BASE_GENERATION)
+    state.advance([ok, failed], [failed])
+    path = str(tmp_path / "state.json")
+    state.save(path)
+    assert IngestState.load(path) == state
+
+
+def test_worker_ingests_new_uploads_once(bucket, worker_factory):
+    upload(bucket, "ann/a.jpg", BASE_GENERATION)
+    upload(bucket, "bob/b.jpg", BASE_GENERATION + 1)
+    extractor = FlakyExtractor()
+    worker = worker_factory(extractor)
+
+    assert len(worker.run_once()) == 2
+    # Photos finish in any order (the stages run in parallel)
+    assert sorted(organized_images(worker)) == ["ann__a.jpg", "bob__b.jpg"]
+    assert worker.run_once() == []
+    assert sorted(extractor.calls) == ["ann__a.jpg", "bob__b.jpg"]
+
+
+def test_failed_ocr_is_retried_on_the_next_pass(bucket, worker_factory):
+    upload(bucket, "ann/a.jpg", BASE_GENERATION)
+    upload(bucket, "ann/b.jpg", BASE_GENERATION + 1)
+    extractor = FlakyExtractor(failing={"ann__a.jpg"})
+    worker = worker_factory(extractor)
+
+    worker.run_once()
+    assert organized_images(worker) == ["ann__b.jpg"]
+    state = IngestState.load(worker.paths.ingest_state_file)
+    assert list(state.retry) == [UPLOAD_PREFIX + "ann/a.jpg"]
+
+    # The failed photo is older than the watermark, but is still listed
+    extractor.failing.clear()
+    assert [blob.name for blob in list_new_photos(bucket, state)] == [UPLOAD_PREFIX + "ann/a.jpg"]
+    worker.run_once()
+    assert organized_images(worker) == ["ann__b.jpg", "ann__a.jpg"]
+    assert IngestState.load(worker.paths.ingest_state_file).retry == {}
+    assert worker.run_once() == []
+
+
+def test_retry_stops_after_max_attempts(bucket, worker_factory, monkeypatch):
+    monkeypatch.setattr(ingest, "MAX_ATTEMPTS", 2)
+    upload(bucket, "ann/broken.jpg", BASE_GENERATION)
+    extractor = FlakyExtractor(failing={"broken"})
+    worker = worker_factory(extractor)
+
+    for _ in range(3):
+        worker.run_once()
+    assert extractor.calls == ["ann__broken.jpg"] * 2
+    state = IngestState.load(worker.paths.ingest_state_file)
+    assert state.retry == {}
+    assert list_new_photos(bucket, state) == []
+
+
+def test_reuploaded_photo_resets_its_attempts(bucket):
+    state = IngestState()
+    blob = upload(bucket, "ann/a.jpg", BASE_GENERATION)
+    for _ in range(MAX_ATTEMPTS - 1):
+        state.advance([blob], [blob])
+    blob = upload(bucket, "ann/a.jpg", BASE_GENERATION + 10)
+    state.advance([blob], [blob])
+    assert state.retry[blob.name] == [blob.generation, 1]
@@ -0,0 +1,42 @@
+"""Storage box label printing (lab_inventory.labels)"""
+
+import pytest
+
+from lab_inventory import labels
+from lab_inventory.label_ledger import LATEST_BATCH, LabelLedger
+
+LABELS = [
+    ("C1", "MFG/PN: GRM188R61C475KAAJD", "CAP CER 4.7UF 16V X5R 0603"),
+    ("C2", "MFG/PN: CL10A106KP8NNNC", "CAP CER 10UF 10V X5R 0603"),
+    ("R1", "MFG/PN: RC0603FR-0710KL", "RES 10K OHM 1% 0603"),
+]
+
+
+@pytest.fixture
+def rendered(monkeypatch):
+    """The labels and header of each render_labels call, instead of a PDF"""
+    calls = []
+    monkeypatch.setattr(labels, "render_labels",
+                        lambda labels, output_pdf, jobs=1, first_slot=0, header=None:
+                        calls.append((labels, header)))
+    return calls
+
+
+def test_reprint_header_counts_all_locations(tmp_path, rendered):
+    ledger_file = str(tmp_path / "printed_labels.json")
+    labels.print_labels(LABELS, str(tmp_path / "labels.pdf"), ledger_file)
+    moved = LABELS[:2] + [("R2",) + LABELS[2][1:]]
+    printed = labels.print_labels(moved, str(tmp_path / "labels.pdf"), ledger_file,
+                                  changed_since=LATEST_BATCH)
+
+    assert printed == [moved[2]]
+    assert rendered[1] == ([moved[2]], "Total distinct locations assigned: 3")
+    assert LabelLedger.load(ledger_file).latest == 2
+
+
+def test_nothing_changed_prints_nothing(tmp_path, rendered):
+    ledger_file = str(tmp_path / "printed_labels.json")
+    labels.print_labels(LABELS, str(tmp_path / "labels.pdf"), ledger_file)
+    assert labels.print_labels(LABELS, str(tmp_path / "labels.pdf"), ledger_file,
+                               changed_since=LATEST_BATCH) == []
+    assert len(rendered) == 1
@@ -0,0 +1,125 @@
+"""In-process pipeline runner (lab_inventory.pipeline.dag) and its ocr / organize stages"""
+
+import os
+import re
+
+import pytest
+
+from lab_inventory.pipeline import organize
+from lab_inventory.pipeline.dag import (INCOMPLETE, RAN, SKIPPED, IncompleteRun, PipelineRunner,
+                                        Stage)
+from lab_inventory.pipeline.ocr import format_ocr_entry, ocr_images
+from lab_inventory.pipeline.paths import PipelinePaths
+from lab_inventory.pipeline.stages import PipelineContext, build_stages
+
+from test_ingest import FakeLLM, FlakyExtractor
+
+
+class FailingLLM(FakeLLM):
+    """OpenAI stand-in whose requests fail for chunks mentioning one of 'failing'"""
+
+    def __init__(self, failing=()):
+        super().__init__()
+        self.failing = set(failing)
+
+    def create(self, model, messages):
+        if any(name in messages[-1]["content"] for name in self.failing):
+            raise RuntimeError("OpenAI API unavailable")
+        return super().create(model, messages)
+
+
+@pytest.fixture
+def paths(tmp_path):
+    paths = PipelinePaths.in_directory(str(tmp_path))
+    os.makedirs(paths.photo_dir)
+    os.makedirs(os.path.dirname(paths.extracted_file))
+    return paths
+
+
+def statuses(reports):
+    return {report.name: report.status for report in reports}
+
+
+def organized_images(paths):
+    with open(paths.organized_file, "r") as f:
+        return re.findall(r"^Image: (.+)$", f.read(), re.MULTILINE)
+
+
+def test_incomplete_stage_passes_its_result_on_and_runs_again(tmp_path):
+    source = tmp_path / "source.txt"
+    source.write_text("input")
+    attempts, received = [], []
+
+    def flaky(_):
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise IncompleteRun("1 of 2 items failed", ["first"])
+        return ["first", "second"]
+
+    runner = PipelineRunner([
+        Stage("produce", flaky, inputs=lambda: [str(source)]),
+        Stage("consume", lambda results: received.append(results["produce"]), after=("produce",)),
+    ], state_file=str(tmp_path / "state.json"))
+
+    assert statuses(runner.run()) == {"produce": INCOMPLETE, "consume": RAN}
+    assert statuses(runner.run()) == {"produce": RAN, "consume": RAN}
+    assert statuses(runner.run())["produce"] == SKIPPED
+    assert received[:2] == [["first"], ["first", "second"]]
+
+
+def test_organize_failure_is_retried_on_the_next_run(paths, monkeypatch):
+    with open(paths.extracted_file, "w") as f:
+        f.writelines(format_ocr_entry(f"{name}.jpg", "RES 10K OHM") for name in "abcd")
+    # One entry per chunk, so the second request fails after the first was organized
+    monkeypatch.setattr(organize, "CHUNK_SIZE", 1)
+    llm = FailingLLM(failing={"b.jpg"})
+    monkeypatch.setattr(organize, "openai_client", lambda: llm)
+    runner = PipelineRunner(build_stages(PipelineContext(paths, open_bucket=None)),
+                            paths.run_state_file)
+
+    reports = runner.run(["organize"])
+    assert statuses(reports) == {"organize": INCOMPLETE}
+    assert "chunks" in reports[0].error
+    assert organized_images(paths) == ["a.jpg"]
+
+    llm.failing.clear()
+    assert statuses(runner.run(["organize"])) == {"organize": RAN}
+    assert organized_images(paths) == ["a.jpg", "b.jpg", "c.jpg", "d.jpg"]
+    assert statuses(runner.run(["organize"])) == {"organize": SKIPPED}
+
+
+def test_max_chunks_leaves_organize_incomplete(paths, monkeypatch):
+    with open(paths.extracted_file, "w") as f:
+        f.writelines(format_ocr_entry(f"{name}.jpg", "RES 10K OHM") for name in "ab")
+    monkeypatch.setattr(organize, "CHUNK_SIZE", 1)
+    monkeypatch.setattr(organize, "openai_client", FakeLLM)
+    runner = PipelineRunner(build_stages(PipelineContext(paths, open_bucket=None, max_chunks=1)),
+                            paths.run_state_file)
+
+    assert statuses(runner.run(["organize"])) == {"organize": INCOMPLETE}
+    assert statuses(runner.run(["organize"])) == {"organize": RAN}
+    assert organized_images(paths) == ["a.jpg", "b.jpg"]
+
+
+def test_failed_photo_is_left_for_the_next_run(paths):
+    photos = []
+    for name in ("a.jpg", "b.jpg"):
+        photos.append(os.path.join(paths.photo_dir, name))
+        with open(photos[-1], "w") as f:
+            f.write(f"text of {name}")
+    extractor = FlakyExtractor(failing={"a.jpg"})
+
+    with pytest.raises(IncompleteRun) as incomplete:
+        ocr_images(photos, paths.converted_dir, paths.extracted_file, extractor)
+    assert incomplete.value.result == ["b.jpg"]
+
+    extractor.failing.clear()
+    assert ocr_images(photos, paths.converted_dir, paths.extracted_file, extractor) == ["a.jpg"]
+    assert extractor.calls == ["a.jpg", "b.jpg", "a.jpg"]
+
+
+def test_ocr_without_new_photos_does_not_need_vision(paths):
+    # google-cloud-vision is only imported once a photo has to be read
+    runner = PipelineRunner(build_stages(PipelineContext(paths, open_bucket=None)),
+                            paths.run_state_file)
+    assert statuses(runner.run(["ocr"])) == {"ocr": RAN}
@@ -0,0 +1,102 @@
+"""Reorder request queue (lab_inventory.reorders) against a local folder standing in for the bucket"""
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from lab_inventory import reorders
+from lab_inventory.local_storage import LocalBucket, NotFound, PreconditionFailed
+
+
+@pytest.fixture
+def bucket(tmp_path):
+    return LocalBucket(str(tmp_path))
+
+
+def active_requests(bucket):
+    return json.loads(bucket.blob(reorders.REORDER_STATS_FILE).download_as_text())["active_requests"]
+
+
+def submit(bucket, index):
+    return reorders.submit_request(bucket, f"MPN-{index}", "RES 10K OHM", f"user {index}")
+
+
+def test_create_only_upload_fails_on_existing_object(bucket):
+    blob = bucket.blob("reorder_requests/a.json")
+    blob.upload_from_string("{}", if_generation_match=0)
+    with pytest.raises(PreconditionFailed):
+        bucket.blob("reorder_requests/a.json").upload_from_string("{}", if_generation_match=0)
+
+
+def test_conditional_writes_and_reads_need_the_current_generation(bucket):
+    blob = bucket.blob("stats.json")
+    blob.upload_from_string("1")
+    stale = bucket.get_blob("stats.json")
+    blob.upload_from_string("2", if_generation_match=stale.generation)
+    # The snapshot taken before the rewrite no longer matches, like a GCS blob
+    assert blob.generation > stale.generation
+    with pytest.raises(PreconditionFailed):
+        stale.upload_from_string("3", if_generation_match=stale.generation)
+    with pytest.raises(PreconditionFailed):
+        stale.download_as_text(if_generation_match=stale.generation)
+    assert bucket.blob("stats.json").download_as_text(if_generation_match=blob.generation) == "2"
+    with pytest.raises(NotFound):
+        bucket.blob("missing.json").download_as_text()
+
+
+def test_delete(bucket):
+    blob = bucket.blob("reorder_requests/a.json")
+    blob.metadata = {"request_id": "a"}
+    blob.upload_from_string("{}")
+    with pytest.raises(PreconditionFailed):
+        bucket.blob(blob.name).delete(if_generation_match=blob.generation + 1)
+    bucket.blob(blob.name).delete(if_generation_match=blob.generation)
+    assert bucket.get_blob(blob.name) is None
+    assert list(bucket.list_blobs()) == []
+    with pytest.raises(NotFound):
+        bucket.blob(blob.name).delete()
+
+
+def test_concurrent_submits_are_all_kept_and_counted(bucket):
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        submitted = list(pool.map(lambda i: submit(bucket, i), range(24)))
+
+    listed = reorders.list_requests(bucket)
+    assert sorted(r.request_id for r in listed) == sorted(r.request_id for r in submitted)
+    assert {r.manufacturer_pn for r in listed} == {f"MPN-{i}" for i in range(24)}
+    assert active_requests(bucket) == 24
+
+
+def test_concurrent_deletes_remove_each_request_once(bucket):
+    request_ids = [submit(bucket, i).request_id for i in range(10)]
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        deleted = list(pool.map(lambda _: reorders.delete_requests(bucket, request_ids), range(4)))
+
+    assert sum(deleted) == 10
+    assert reorders.list_requests(bucket) == []
+    assert active_requests(bucket) == 0
+
+
+def test_submits_and_deletes_race(bucket):
+    first = [submit(bucket, i).request_id for i in range(10)]
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        submits = [pool.submit(submit, bucket, i) for i in range(10, 20)]
+        deletes = [pool.submit(reorders.delete_requests, bucket, [request_id])
+                   for request_id in first]
+        kept = {future.result().request_id for future in submits}
+        assert sum(future.result() for future in deletes) == 10
+
+    assert {r.request_id for r in reorders.list_requests(bucket)} == kept
+    assert active_requests(bucket) == 10
+
+
+def test_delete_leaves_a_request_that_changed_since_it_was_listed(bucket):
+    request = submit(bucket, 1)
+    listed = {r.request_id: r.generation for r in reorders.list_requests(bucket)}
+    # Rewritten (e.g. edited by another client) after the dashboard listed it
+    bucket.blob(request.blob_name).upload_from_string("{}")
+
+    assert reorders.delete_requests(bucket, [request.request_id], listed) == 0
+    assert [r.request_id for r in reorders.list_requests(bucket)] == [request.request_id]
+    assert active_requests(bucket) == 1
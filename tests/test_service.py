@@ -0,0 +1,72 @@
+"""Headless search service (lab_inventory.service) against a snapshot in a local folder"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from lab_inventory.catalog import SNAPSHOT_BLOB, CatalogState, InventoryCatalog
+from lab_inventory.local_storage import LocalBucket
+from lab_inventory.service import create_app
+from lab_inventory.snapshot import build_snapshot_table, write_snapshot
+
+
+def entry(mpn: str, description: str, location: str) -> str:
+    return (f"Image: {mpn}.jpg\nManufacturer Part number: {mpn}\n"
+            f"Description: {description}\nComponent Type: Resistor\nLocation: {location}\n")
+
+
+def snapshot_state(generation: int, *entries: str) -> CatalogState:
+    return CatalogState(generation, build_snapshot_table(entries))
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    write_snapshot(build_snapshot_table([entry("RC0603FR-0710KL", "RES 10K OHM 1% 0603", "R1")]),
+                   str(tmp_path / SNAPSHOT_BLOB))
+    return InventoryCatalog(LocalBucket(str(tmp_path)), cache_dir=str(tmp_path / "cache"))
+
+
+@pytest.fixture
+def client(catalog):
+    with TestClient(create_app(catalog, refresh_interval=3600)) as client:
+        yield client
+
+
+def test_search_is_tagged_with_the_snapshot_generation(client, catalog):
+    response = client.get("/search", params={"q": "10k"})
+    assert response.status_code == 200
+    assert [row["manufacturer_pn"] for row in response.json()["results"]] == ["RC0603FR-0710KL"]
+    assert response.json()["generation"] == catalog.state.generation
+    assert response.headers["ETag"].startswith(f'"{catalog.state.generation}-')
+
+    cached = client.get("/search", params={"q": "10k"},
+                        headers={"If-None-Match": response.headers["ETag"]})
+    assert cached.status_code == 304
+
+
+def test_body_comes_from_the_tagged_snapshot(client, catalog, monkeypatch):
+    old = snapshot_state(1, entry("OLD-1", "RES 10K OHM", "R1"))
+    new = snapshot_state(2, entry("NEW-1", "RES 10K OHM", "R2"))
+    catalog._state = old
+    rank = catalog.rank
+
+    def rank_during_publish(*args, **kwargs):
+        # A new snapshot is loaded after the ETag was computed but before the body is built
+        catalog._state = new
+        return rank(*args, **kwargs)
+
+    monkeypatch.setattr(catalog, "rank", rank_during_publish)
+    response = client.get("/search", params={"q": "10k"})
+    assert response.headers["ETag"].startswith('"1-')
+    assert response.json()["generation"] == 1
+    assert [row["manufacturer_pn"] for row in response.json()["results"]] == ["OLD-1"]
+
+
+def test_scan_and_bom(client):
+    scan = client.get("/scan", params={"code": "INV1|R1|RC0603FR-0710KL"})
+    assert scan.status_code == 200
+    assert scan.json()["location"] == "R1"
+    assert client.get("/scan", params={"code": "not a label"}).status_code == 400
+
+    bom = client.post("/bom", json={"lines": [{"mpn": "RC0603FR-0710KL", "quantity": 2}]})
+    assert bom.status_code == 200
+    assert bom.json()["lines"][0]["locations"]
@@ -0,0 +1,46 @@
+"""Concurrent uploads (lab_inventory.uploads)"""
+
+import io
+import threading
+
+from lab_inventory.uploads import PendingUpload, unique_file_names, upload_files, upload_object_name
+
+
+class RecordingBucket:
+    """Bucket stand-in that keeps uploaded bytes by object name"""
+
+    def __init__(self):
+        self.objects = {}
+        self._lock = threading.Lock()
+
+    def blob(self, name):
+        bucket = self
+
+        class Blob:
+            def upload_from_file(self, fileobj, size=None, content_type=None):
+                data = fileobj.read(size)
+                with bucket._lock:
+                    bucket.objects[name] = data
+
+        return Blob()
+
+
+def test_repeated_names_are_numbered():
+    assert unique_file_names(["a.jpg", "b.pdf", "a.jpg", "a.jpg"]) == \
+        ["a.jpg", "b.pdf", "a (2).jpg", "a (3).jpg"]
+    # A numbered name that is already in the batch is skipped
+    assert unique_file_names(["a (2).jpg", "a.jpg", "a.jpg"]) == ["a (2).jpg", "a.jpg", "a (3).jpg"]
+
+
+def test_same_name_uploads_are_reported_and_stored_separately():
+    bucket = RecordingBucket()
+    contents = [b"first photo", b"second photo"]
+    names = unique_file_names(["a.jpg", "a.jpg"])
+    uploads = [PendingUpload(label=str(index), object_name=upload_object_name("tester", name),
+                             fileobj=io.BytesIO(data), size=len(data))
+               for index, (name, data) in enumerate(zip(names, contents))]
+
+    done = {event.label: event.ok for event in upload_files(bucket, uploads) if event.done}
+    assert done == {"0": True, "1": True}
+    assert bucket.objects == {"component_images/tester/a.jpg": b"first photo",
+                              "component_images/tester/a (2).jpg": b"second photo"}